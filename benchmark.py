@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Performance benchmark suite
+Scalar ns/call, batch rows/s, import time and peak RSS for every registered
+solution and model backend (each measured in a fresh process) on fixed real
+and synthetic workloads, plus cold start of run.sh and end-to-end wall time
+of eval.sh, generate_results.sh and generate_results_batch.py. Results are
+written as JSON and can be compared against a saved baseline:
+
+    python benchmark.py --save-baseline          # writes benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.10
+
+The comparison exits 1 on a regressed metric, a baseline metric the run no
+longer produces, or an error the baseline did not have.
+"""
+
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+
+RESULTS_PATH = 'benchmark_results.json'
+BASELINE_PATH = 'benchmark_baseline.json'
+DEFAULT_THRESHOLD = 0.10
+SYNTHETIC_TRIPS = 20000
+SCALAR_BUDGET_SECONDS = 0.5  # scalar timing stops after this long (or after every trip)
+BATCH_BUDGET_SECONDS = 0.3
+COLD_START_RUNS = 5
+E2E_CASES = 20  # cases per shell end-to-end run; run.sh is ~1.5 s per case
+
+# Metric name prefix -> whether larger values are better
+DIRECTIONS = {
+    'scalar_ns': False, 'batch_rows_per_s': True, 'import_ms': False, 'peak_rss_kb': False,
+    'cold_start_s': False, 'wall_s': False,
+}
+# Changes are not flagged while both values stay under these (import times of a few ms are noise)
+NOISE_FLOOR = {'import_ms': 10.0}
+
+
+def _gbr_sklearn():
+    from gbr_model import engineer_features_batch, load_gbr
+    data = load_gbr()
+    model, features = data['model'], data['engineer_features']
+    return (lambda d, m, r: float(model.predict([features(d, m, r)])[0]),
+            lambda d, m, r: model.predict(engineer_features_batch(d, m, r)))
+
+
+def _gbr_early_exit():
+    from early_exit_gbr import EarlyExitGBR
+    from gbr_model import engineer_features_batch, load_gbr
+    data = load_gbr()
+    model, features = EarlyExitGBR(data['model']), data['engineer_features']
+    return (lambda d, m, r: model.predict_one(features(d, m, r))[0],
+            lambda d, m, r: model.predict(engineer_features_batch(d, m, r))[0])
+
+
+def _gbr_quantized():
+    from gbr_model import engineer_features_batch
+    from quantize_trees import QuantizedForest
+    model = QuantizedForest.load('quantized_gbr.npz')
+    return (lambda d, m, r: float(model.predict(engineer_features_batch([d], [m], [r]))[0]),
+            lambda d, m, r: model.predict(engineer_features_batch(d, m, r)))
+
+
+def _distilled(kind):
+    def factory():
+        from distill_gbr import load_student
+        student = load_student(f'distilled_{kind}.npz')
+        return student.predict_one, student.predict
+    return factory
+
+
+# Model backends outside the solution registry: name -> () -> (scalar fn, batch fn)
+BACKENDS = {
+    'gbr_sklearn': _gbr_sklearn,
+    'gbr_early_exit': _gbr_early_exit,  # experimental, not used in production
+    'gbr_quantized': _gbr_quantized,
+    'distilled_tree': _distilled('tree'),
+    'distilled_lookup': _distilled('lookup'),
+    'distilled_pwl': _distilled('pwl'),
+}
+
+
+def workloads():
+    """Fixed inputs: the 6,000 known cases and seeded synthetic trips"""
+    from gbr_model import load_known_inputs
+    from rule_batch import synthetic_trips
+    return {'real': load_known_inputs()[:3], 'synthetic': synthetic_trips(SYNTHETIC_TRIPS, seed=42)}
+
+
+def peak_rss_kb(usage):
+    """ru_maxrss is kilobytes on Linux and bytes on macOS"""
+    return usage.ru_maxrss / 1024 if sys.platform == 'darwin' else float(usage.ru_maxrss)
+
+
+def _scalar_ns(fn, days, miles, receipts, chunk=200):
+    """Median ns/call over chunks of consecutive trips, until every trip ran or SCALAR_BUDGET_SECONDS passed"""
+    trips = list(zip(days.astype(int).tolist(), miles.tolist(), receipts.tolist()))
+    per_call = []
+    deadline = time.perf_counter() + SCALAR_BUDGET_SECONDS
+    for offset in range(0, len(trips), chunk):
+        calls = trips[offset:offset + chunk]
+        start = time.perf_counter()
+        for trip in calls:
+            fn(*trip)
+        per_call.append((time.perf_counter() - start) / len(calls))
+        if time.perf_counter() > deadline:
+            break
+    return float(np.median(per_call)) * 1e9
+
+
+def _batch_rows_per_s(fn, days, miles, receipts, min_repeats=3):
+    """Best of at least min_repeats runs, repeating fast functions for BATCH_BUDGET_SECONDS"""
+    fn(days[:100], miles[:100], receipts[:100])  # warm up lazy loads
+    best = float('inf')
+    repeats = 0
+    deadline = time.perf_counter() + BATCH_BUDGET_SECONDS
+    while repeats < min_repeats or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn(days, miles, receipts)
+        best = min(best, time.perf_counter() - start)
+        repeats += 1
+    return len(days) / best
+
+
+def bench_target(name):
+    """Import and time one solution or backend; meant to run in a fresh process"""
+    import importlib
+    start = time.perf_counter()
+    try:
+        if name in BACKENDS:
+            scalar, batch = BACKENDS[name]()
+        else:
+            module = importlib.import_module(name)
+            scalar, batch = module.calculate_reimbursement, getattr(module, 'calculate_reimbursement_batch', None)
+    except Exception as e:
+        return {'name': name, 'error': f'load failed: {type(e).__name__}: {e}'}
+    metrics = {f'import_ms/{name}': (time.perf_counter() - start) * 1000}
+    for label, (days, miles, receipts) in workloads().items():
+        try:
+            metrics[f'scalar_ns/{name}/{label}'] = _scalar_ns(scalar, days, miles, receipts)
+            if batch is not None:
+                metrics[f'batch_rows_per_s/{name}/{label}'] = _batch_rows_per_s(batch, days, miles, receipts)
+        except Exception as e:
+            return {'name': name, 'error': f'{label} workload failed: {type(e).__name__}: {e}'}
+    metrics[f'peak_rss_kb/{name}'] = peak_rss_kb(resource.getrusage(resource.RUSAGE_SELF))
+    return {'name': name, 'metrics': metrics}
+
+
+def _timed_process(command, cwd='.'):
+    """(wall seconds, peak RSS KB of the process tree, exit code) for one command"""
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return time.perf_counter() - start, peak_rss_kb(usage), process.returncode
+
+
+def bench_cold_start(runs=COLD_START_RUNS):
+    times, rss = [], []
+    for _ in range(runs):
+        seconds, kb, code = _timed_process(['./run.sh', '3', '93', '1.42'])
+        if code != 0:
+            return {}, [f'run.sh exited with {code}']
+        times.append(seconds)
+        rss.append(kb)
+    return {'cold_start_s/run.sh': float(np.median(times)), 'peak_rss_kb/run.sh': max(rss)}, []
+
+
+def bench_end_to_end(n_cases=E2E_CASES):
+    """
+    Each script runs in a scratch copy of the repo files it needs, with the
+    case files cut to n_cases for the per-case shell scripts (wall times are
+    reported per case and extrapolated to the full case count)
+    """
+    metrics, errors = {}, []
+    with open('public_cases.json', 'r') as f:
+        public = json.load(f)
+    with open('private_cases.json', 'r') as f:
+        private = json.load(f)
+    scripts = [
+        ('eval.sh', ['./eval.sh'], n_cases, len(public)),
+        ('generate_results.sh', ['./generate_results.sh'], n_cases, len(private)),
+        ('generate_results_batch.py', [sys.executable, 'generate_results_batch.py'], len(private), len(private)),
+    ]
+    for label, command, cases, full in scripts:
+        with tempfile.TemporaryDirectory() as scratch:
+            for path in ['run.sh', 'eval.sh', 'generate_results.sh', 'generate_results_batch.py',
+                         'gradient_boosting_model.pkl']:
+                shutil.copy2(path, scratch)
+            with open(os.path.join(scratch, 'public_cases.json'), 'w') as f:
+                json.dump(public[:cases], f)
+            with open(os.path.join(scratch, 'private_cases.json'), 'w') as f:
+                json.dump(private[:cases], f)
+            seconds, kb, code = _timed_process(command, cwd=scratch)
+        if code != 0:
+            errors.append(f'{label} exited with {code}')
+            continue
+        metrics[f'wall_s/{label}'] = seconds / cases * full
+        metrics[f'peak_rss_kb/{label}'] = kb
+    return metrics, errors
+
+
+def run_suite(names=None, e2e_cases=E2E_CASES, skip_e2e=False):
+    from solution_registry import discover_solutions
+    names = names or discover_solutions()[0] + list(BACKENDS)
+    results = {'meta': {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                 text=True).stdout.strip(),
+        'python': platform.python_version(), 'numpy': np.__version__,
+        'platform': platform.platform(), 'cpus': os.cpu_count(),
+        'workloads': {label: len(arrays[0]) for label, arrays in workloads().items()},
+    }, 'metrics': {}, 'errors': []}
+
+    # spawn + one task per child: every import and RSS reading starts clean
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn'), max_tasks_per_child=1) as pool:
+        for outcome in pool.map(bench_target, names):
+            if 'error' in outcome:
+                results['errors'].append(f"{outcome['name']}: {outcome['error']}")
+            else:
+                results['metrics'].update(outcome['metrics'])
+            print(f"  {outcome['name']:<28} {'error' if 'error' in outcome else 'done'}", file=sys.stderr)
+
+    metrics, errors = bench_cold_start()
+    results['metrics'].update(metrics)
+    results['errors'].extend(errors)
+    if not skip_e2e:
+        metrics, errors = bench_end_to_end(e2e_cases)
+        results['metrics'].update(metrics)
+        results['errors'].extend(errors)
+    return results
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD, expected=None):
+    """
+    [(metric, baseline, current, relative change, regressed)] for the baseline
+    metrics in expected (default all); change is signed so that positive means
+    worse, and a metric missing from the current run is a regression with
+    current None and change inf
+    """
+    rows = []
+    for metric in sorted(set(baseline) if expected is None else set(baseline) & set(expected)):
+        if metric not in current:
+            rows.append((metric, baseline[metric], None, float('inf'), True))
+            continue
+        higher_is_better = DIRECTIONS[metric.split('/')[0]]
+        old, new = baseline[metric], current[metric]
+        change = (old - new) / old if higher_is_better else (new - old) / old
+        floor = NOISE_FLOOR.get(metric.split('/')[0], 0.0)
+        rows.append((metric, old, new, change, change > threshold and max(old, new) >= floor))
+    return rows
+
+
+def in_scope(metric, names, skip_e2e):
+    """Whether a run of the targets in names (all when empty) measures metric"""
+    kind, label = metric.split('/')[:2]
+    if kind == 'cold_start_s' or label == 'run.sh':
+        return True
+    if kind == 'wall_s' or label.endswith(('.sh', '.py')):
+        return not skip_e2e
+    return not names or label in names
+
+
+def new_errors(current, baseline):
+    """Errors of the current run whose target or script did not fail in the baseline"""
+    def source(error):
+        return re.split(r': | exited with ', error)[0]
+    failed_before = {source(error) for error in baseline}
+    return [error for error in current if source(error) not in failed_before]
+
+
+def print_results(results):
+    print(f"Benchmark at {results['meta']['commit']} ({results['meta']['python']}, "
+          f"{results['meta']['cpus']} CPUs), workloads {results['meta']['workloads']}")
+    print("=" * 96)
+    metrics = results['metrics']
+    targets = sorted({key.split('/')[1] for key in metrics if key.startswith('scalar_ns/')})
+    print(f"{'Target':<28} {'Import ms':>9} {'Scalar ns (real)':>17} {'Batch rows/s (real)':>20} "
+          f"{'Batch rows/s (synth)':>21} {'RSS MB':>7}")
+    for name in targets:
+        batch_real = metrics.get(f'batch_rows_per_s/{name}/real')
+        batch_synth = metrics.get(f'batch_rows_per_s/{name}/synthetic')
+        print(f"{name:<28} {metrics[f'import_ms/{name}']:>9.1f} {metrics[f'scalar_ns/{name}/real']:>17,.0f} "
+              f"{'-' if batch_real is None else f'{batch_real:,.0f}':>20} "
+              f"{'-' if batch_synth is None else f'{batch_synth:,.0f}':>21} "
+              f"{metrics[f'peak_rss_kb/{name}'] / 1024:>7.1f}")
+    for key in sorted(metrics):
+        if key.startswith(('cold_start_s/', 'wall_s/')):
+            script = key.split('/')[1]
+            print(f"{key:<40} {metrics[key]:>10.2f} s   peak RSS {metrics[f'peak_rss_kb/{script}'] / 1024:.1f} MB")
+    for error in results['errors']:
+        print(f"ERROR {error}")
+
+
+def print_comparison(rows, threshold):
+    regressions = [row for row in rows if row[4]]
+    print(f"\nCompared {len(rows)} metrics with the baseline (threshold {threshold:.0%})")
+    print("=" * 96)
+    for metric, old, new, change, regressed in sorted(rows, key=lambda row: -row[3])[:15]:
+        if new is None:
+            print(f"{metric:<60} {old:>12,.1f} {'missing':>12} {'':>8}  REGRESSION")
+            continue
+        print(f"{metric:<60} {old:>12,.1f} {new:>12,.1f} {-change:>+8.1%}{'  REGRESSION' if regressed else ''}")
+    print(f"{len(regressions)} regression(s)")
+    return regressions
+
+
+def _option(flag, default):
+    return sys.argv[sys.argv.index(flag) + 1] if flag in sys.argv else default
+
+
+def main():
+    value_flags = ('--output', '--baseline', '--threshold', '--e2e-cases')
+    names = [arg for i, arg in enumerate(sys.argv[1:], 1)
+             if not arg.startswith('--') and sys.argv[i - 1] not in value_flags]
+    skip_e2e = '--skip-e2e' in sys.argv
+    results = run_suite(names, int(_option('--e2e-cases', E2E_CASES)), skip_e2e)
+    output = BASELINE_PATH if '--save-baseline' in sys.argv else _option('--output', RESULTS_PATH)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f"\nResults saved to {output}")
+
+    baseline_path = _option('--baseline', None)
+    if baseline_path:
+        threshold = float(_option('--threshold', DEFAULT_THRESHOLD))
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+        expected = [metric for metric in baseline['metrics'] if in_scope(metric, names, skip_e2e)]
+        regressions = print_comparison(compare(results['metrics'], baseline['metrics'], threshold, expected),
+                                       threshold)
+        errors = new_errors(results['errors'], baseline.get('errors', []))
+        for error in errors:
+            print(f"NEW ERROR {error}")
+        if regressions or errors:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
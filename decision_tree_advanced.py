@@ -142,6 +142,29 @@ def generate_python_code(model, feature_names):
     
     return "\n".join(code_lines)
 
+def generate_batch_code(model, feature_names):
+    """The same tree as nested tuples for rule_batch.evaluate_tree, plus the batch entry point"""
+    tree = model.tree_
+
+    def literal(node=0, depth=1):
+        if tree.feature[node] == -2:
+            return f"{tree.value[node][0][0]:.2f}"
+        indent = "    " * depth
+        return (f"('{feature_names[tree.feature[node]]}', {tree.threshold[node]:.2f},\n"
+                f"{indent}{literal(tree.children_left[node], depth + 1)},\n"
+                f"{indent}{literal(tree.children_right[node], depth + 1)})")
+
+    return f'''# (feature, threshold, left if feature <= threshold, right) or a leaf value
+TREE = {literal()}
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    from rule_batch import as_arrays, evaluate_tree, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    return evaluate_tree(TREE, trip_features(days, miles, receipts))
+'''
+
 python_code = generate_python_code(best_model, feature_names)
 print(python_code)
 
@@ -149,6 +172,7 @@ print(python_code)
 with open('solution_optimized.py', 'w') as f:
     f.write("#!/usr/bin/env python3\n\n")
     f.write(python_code)
-    f.write("\n")
+    f.write("\n\n\n")
+    f.write(generate_batch_code(best_model, feature_names))
 
 print("\nOptimized solution saved to solution_optimized.py")
\ No newline at end of file
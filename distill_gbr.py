@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Distill the 500-stage gradient boosting model into a compact student
+Labels a dense synthetic sample of (days, miles, receipts) with the teacher,
+fits small students (shallow tree, additive lookup tables, per-day piecewise
+linear) and reports fidelity to the teacher, accuracy on public_cases.json,
+inference speedup and artifact size, plus the tree's depth/size/accuracy
+trade-off.
+"""
+
+import io
+import os
+import pickle
+import time
+import numpy as np
+from sklearn.tree import DecisionTreeRegressor
+from gbr_model import engineer_features_batch, load_gbr, load_known_inputs
+from linear_fit import fit_segments
+from rule_cv import eval_score
+
+MAX_DAYS = 14
+MAX_MILES = 1400
+MAX_RECEIPTS = 2600
+# The teacher has flags for receipts ending in .99, .49 and .33 and treats them
+# very differently, so every student is split by this class
+CENTS_ENDINGS = (0.99, 0.49, 0.33)
+N_CENTS_CLASSES = len(CENTS_ENDINGS) + 1
+# Depths swept for the tree trade-off table; the shipped tree uses TREE_DEPTH
+TREE_DEPTHS = (4, 6, 8, 10, 12, 16)
+TREE_DEPTH = 8
+
+
+def synthetic_sample(n, seed=42):
+    """
+    Uniform trips over the observed domain: whole days, mostly whole miles,
+    receipts in cents, with the special cents endings oversampled
+    """
+    rng = np.random.default_rng(seed)
+    days = rng.integers(1, MAX_DAYS + 1, n).astype(float)
+    miles = rng.uniform(0, MAX_MILES, n)
+    miles = np.where(rng.random(n) < 0.9, np.round(miles), np.round(miles, 2))
+    receipts = np.round(rng.uniform(0, MAX_RECEIPTS, n), 2)
+    special = rng.random(n) < 0.4
+    endings = np.array(CENTS_ENDINGS)[rng.integers(0, len(CENTS_ENDINGS), n)]
+    receipts = np.where(special, np.minimum(np.trunc(receipts), MAX_RECEIPTS - 1) + endings, receipts)
+    return days, miles, receipts
+
+
+def cents_class(receipts):
+    """0 for ordinary receipts, 1 + index into CENTS_ENDINGS for the flagged endings"""
+    cents = np.asarray(receipts, dtype=float) - np.trunc(receipts)
+    classes = np.zeros(np.shape(cents), dtype=np.int64)
+    for k, ending in enumerate(CENTS_ENDINGS):
+        classes[np.abs(cents - ending) < 0.001] = k + 1
+    return classes
+
+
+def cents_class_one(receipts):
+    cents = receipts - int(receipts)
+    for k, ending in enumerate(CENTS_ENDINGS):
+        if abs(cents - ending) < 0.001:
+            return k + 1
+    return 0
+
+
+def teacher_predict(model, days, miles, receipts):
+    """Raw teacher output (no residual lookup)"""
+    return model.predict(engineer_features_batch(days, miles, receipts))
+
+
+class TreeStudent:
+    """Shallow regression tree on the raw inputs and cents class, evaluated from flat arrays"""
+    kind = 'tree'
+
+    def __init__(self, max_depth=TREE_DEPTH, min_samples_leaf=3):
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+
+    def fit(self, days, miles, receipts, y):
+        tree = DecisionTreeRegressor(max_depth=self.max_depth, min_samples_leaf=self.min_samples_leaf,
+                                     random_state=42)
+        tree.fit(np.column_stack([days, miles, receipts, cents_class(receipts)]), y)
+        t = tree.tree_
+        self.arrays = {
+            'feature': t.feature.astype(np.int8),
+            'threshold': t.threshold,
+            'left': t.children_left.astype(np.int32),
+            'right': t.children_right.astype(np.int32),
+            'value': t.value[:, 0, 0],
+        }
+        self._unpack()
+        return self
+
+    def _unpack(self):
+        self._lists = [self.arrays[k].tolist() for k in ('feature', 'threshold', 'left', 'right', 'value')]
+
+    def predict(self, days, miles, receipts):
+        X = np.column_stack([days, miles, receipts, cents_class(receipts)])
+        feature, threshold = self.arrays['feature'], self.arrays['threshold']
+        left, right = self.arrays['left'], self.arrays['right']
+        node = np.zeros(len(X), dtype=np.int64)
+        rows = np.arange(len(X))
+        active = left[node] >= 0
+        while active.any():
+            n = node[active]
+            go_left = X[rows[active], feature[n]] <= threshold[n]
+            node[active] = np.where(go_left, left[n], right[n])
+            active = left[node] >= 0
+        return self.arrays['value'][node]
+
+    def predict_one(self, days, miles, receipts):
+        feature, threshold, left, right, value = self._lists
+        x = (days, miles, receipts, cents_class_one(receipts))
+        node = 0
+        while left[node] >= 0:
+            node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+        return value[node]
+
+
+class LookupStudent:
+    """
+    Additive lookup tables T1[cents class, days, receipt bin] + T2[cents class,
+    days, miles bin], fitted by backfitting
+    """
+    kind = 'lookup'
+
+    def __init__(self, receipt_width=20.0, miles_width=20.0, iterations=30):
+        self.receipt_width = receipt_width
+        self.miles_width = miles_width
+        self.iterations = iterations
+
+    def _cells(self, days, miles, receipts):
+        n_rbins = int(MAX_RECEIPTS / self.receipt_width) + 1
+        n_mbins = int(MAX_MILES / self.miles_width) + 1
+        rbin = np.minimum((receipts / self.receipt_width).astype(np.int64), n_rbins - 1)
+        mbin = np.minimum((miles / self.miles_width).astype(np.int64), n_mbins - 1)
+        group = cents_class(receipts) * (MAX_DAYS + 1) + np.clip(days, 1, MAX_DAYS).astype(np.int64)
+        n_groups = N_CENTS_CLASSES * (MAX_DAYS + 1)
+        return group * n_rbins + rbin, group * n_mbins + mbin, n_groups * n_rbins, n_groups * n_mbins
+
+    def fit(self, days, miles, receipts, y):
+        receipt_cell, miles_cell, n_receipt_cells, n_miles_cells = self._cells(days, miles, receipts)
+        receipt_counts = np.maximum(np.bincount(receipt_cell, minlength=n_receipt_cells), 1)
+        miles_counts = np.maximum(np.bincount(miles_cell, minlength=n_miles_cells), 1)
+        receipt_table = np.zeros(n_receipt_cells)
+        miles_table = np.zeros(n_miles_cells)
+        for _ in range(self.iterations):
+            receipt_table = np.bincount(receipt_cell, weights=y - miles_table[miles_cell],
+                                        minlength=n_receipt_cells) / receipt_counts
+            miles_table = np.bincount(miles_cell, weights=y - receipt_table[receipt_cell],
+                                      minlength=n_miles_cells) / miles_counts
+        self.arrays = {'receipt_table': receipt_table, 'miles_table': miles_table,
+                       'widths': np.array([self.receipt_width, self.miles_width])}
+        self._unpack()
+        return self
+
+    def _unpack(self):
+        self.receipt_width, self.miles_width = self.arrays['widths'].tolist()
+        self._receipt_list = self.arrays['receipt_table'].tolist()
+        self._miles_list = self.arrays['miles_table'].tolist()
+        self._n_rbins = int(MAX_RECEIPTS / self.receipt_width) + 1
+        self._n_mbins = int(MAX_MILES / self.miles_width) + 1
+
+    def predict(self, days, miles, receipts):
+        receipt_cell, miles_cell, _, _ = self._cells(days, miles, receipts)
+        return self.arrays['receipt_table'][receipt_cell] + self.arrays['miles_table'][miles_cell]
+
+    def predict_one(self, days, miles, receipts):
+        d = cents_class_one(receipts) * (MAX_DAYS + 1) + min(max(int(days), 1), MAX_DAYS)
+        rbin = min(int(receipts / self.receipt_width), self._n_rbins - 1)
+        mbin = min(int(miles / self.miles_width), self._n_mbins - 1)
+        return self._receipt_list[d * self._n_rbins + rbin] + self._miles_list[d * self._n_mbins + mbin]
+
+
+class PiecewiseLinearStudent:
+    """
+    Per trip length and cents class: continuous piecewise-linear in miles plus
+    piecewise-linear in receipts
+    """
+    kind = 'pwl'
+
+    def __init__(self, miles_knot_step=100.0, receipt_knot_step=100.0):
+        self.miles_knots = np.arange(miles_knot_step, MAX_MILES, miles_knot_step)
+        self.receipt_knots = np.arange(receipt_knot_step, MAX_RECEIPTS, receipt_knot_step)
+
+    def _basis(self, miles, receipts):
+        return np.column_stack([
+            np.ones(len(miles)), miles, np.maximum(0, miles[:, None] - self.miles_knots),
+            receipts, np.maximum(0, receipts[:, None] - self.receipt_knots)])
+
+    def fit(self, days, miles, receipts, y):
+        segment = cents_class(receipts) * (MAX_DAYS + 1) + np.clip(days, 1, MAX_DAYS).astype(np.int64)
+        coef, _ = fit_segments(self._basis(miles, receipts), y, segment,
+                               n_segments=N_CENTS_CLASSES * (MAX_DAYS + 1))
+        self.arrays = {'coef': np.nan_to_num(coef), 'miles_knots': self.miles_knots,
+                       'receipt_knots': self.receipt_knots}
+        self._unpack()
+        return self
+
+    def _unpack(self):
+        self.miles_knots = self.arrays['miles_knots']
+        self.receipt_knots = self.arrays['receipt_knots']
+        n_miles = len(self.miles_knots)
+        self._rows = [(row[0], row[1], row[2:2 + n_miles], row[2 + n_miles], row[3 + n_miles:])
+                      for row in self.arrays['coef'].tolist()]
+        self._miles_knot_list = self.miles_knots.tolist()
+        self._receipt_knot_list = self.receipt_knots.tolist()
+
+    def predict(self, days, miles, receipts):
+        segment = cents_class(receipts) * (MAX_DAYS + 1) + np.clip(days, 1, MAX_DAYS).astype(np.int64)
+        basis = self._basis(np.asarray(miles, dtype=float), np.asarray(receipts, dtype=float))
+        return np.einsum('ni,ni->n', basis, self.arrays['coef'][segment])
+
+    def predict_one(self, days, miles, receipts):
+        segment = cents_class_one(receipts) * (MAX_DAYS + 1) + min(max(int(days), 1), MAX_DAYS)
+        const, mile_rate, mile_hinges, receipt_rate, receipt_hinges = self._rows[segment]
+        total = const + mile_rate * miles + receipt_rate * receipts
+        for knot, slope in zip(self._miles_knot_list, mile_hinges):
+            if miles <= knot:
+                break
+            total += slope * (miles - knot)
+        for knot, slope in zip(self._receipt_knot_list, receipt_hinges):
+            if receipts <= knot:
+                break
+            total += slope * (receipts - knot)
+        return total
+
+
+STUDENTS = {cls.kind: cls for cls in (TreeStudent, LookupStudent, PiecewiseLinearStudent)}
+
+
+def save_student(student, path=None):
+    path = path or f'distilled_{student.kind}.npz'
+    np.savez_compressed(path, kind=student.kind, **student.arrays)
+    return path
+
+
+def load_student(path):
+    """Rebuild a saved student without refitting"""
+    saved = np.load(path)
+    student = STUDENTS[str(saved['kind'])].__new__(STUDENTS[str(saved['kind'])])
+    student.arrays = {key: saved[key] for key in saved.files if key != 'kind'}
+    student._unpack()
+    return student
+
+
+def _npz_bytes(arrays):
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return len(buffer.getvalue())
+
+
+def tree_depth_tradeoff(train, train_y, holdout, holdout_teacher, known, expected, depths=TREE_DEPTHS):
+    """Leaves, artifact size, holdout fidelity and public accuracy of the tree student per max_depth"""
+    public = ~np.isnan(expected)
+    rows = []
+    for depth in depths:
+        student = TreeStudent(max_depth=depth).fit(*train, train_y)
+        rows.append({
+            'depth': depth,
+            'leaves': int((student.arrays['left'] < 0).sum()),
+            'bytes': _npz_bytes(student.arrays),
+            'holdout': _fidelity(student.predict(*holdout), holdout_teacher),
+            'public': eval_score(student.predict(*known)[public], expected[public]),
+        })
+    return rows
+
+
+def _fidelity(student_pred, teacher_pred):
+    diff = np.abs(np.round(student_pred, 2) - np.round(teacher_pred, 2))
+    return {'mae': float(diff.mean()), 'max': float(diff.max()),
+            'same_cents': float((diff < 0.005).mean()), 'within_dollar': float((diff < 1.0).mean())}
+
+
+def _scalar_latency(fn, days, miles, receipts, n=1000):
+    rows = list(zip(days[:n].astype(int).tolist(), miles[:n].tolist(), receipts[:n].tolist()))
+    start = time.perf_counter()
+    for d, m, r in rows:
+        fn(d, m, r)
+    return (time.perf_counter() - start) / len(rows)
+
+
+def _batch_seconds(fn, days, miles, receipts, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(days, miles, receipts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def distill(n_samples=400000, students=None, seed=42, tree_depth=TREE_DEPTH):
+    """Fit every student on teacher labels and print the fidelity / speed / size report"""
+    from train_gradient_boosting import engineer_features
+    model = load_gbr()['model']
+
+    print(f"Labelling {n_samples:,} synthetic trips + known inputs with the teacher...")
+    days, miles, receipts, expected = load_known_inputs()
+    s_days, s_miles, s_receipts = synthetic_sample(n_samples, seed)
+    train_days = np.concatenate([s_days, days])
+    train_miles = np.concatenate([s_miles, miles])
+    train_receipts = np.concatenate([s_receipts, receipts])
+    start = time.perf_counter()
+    train_y = teacher_predict(model, train_days, train_miles, train_receipts)
+    print(f"  teacher labelled {len(train_y):,} trips in {time.perf_counter() - start:.1f}s")
+
+    # Held-out synthetic trips measure fidelity away from the known inputs
+    h_days, h_miles, h_receipts = synthetic_sample(20000, seed + 1)
+    holdout_teacher = teacher_predict(model, h_days, h_miles, h_receipts)
+    known_teacher = teacher_predict(model, days, miles, receipts)
+    public = ~np.isnan(expected)
+
+    teacher_scalar = _scalar_latency(
+        lambda d, m, r: model.predict([engineer_features(d, m, r)])[0], days, miles, receipts, n=300)
+    teacher_batch = _batch_seconds(lambda d, m, r: teacher_predict(model, d, m, r), days, miles, receipts)
+    teacher_bytes = len(pickle.dumps(model))
+    teacher_public = eval_score(known_teacher[public], expected[public])
+
+    rows = []
+    for kind in students or STUDENTS:
+        start = time.perf_counter()
+        student = (TreeStudent(max_depth=tree_depth) if kind == 'tree' else STUDENTS[kind]())
+        student = student.fit(train_days, train_miles, train_receipts, train_y)
+        fit_seconds = time.perf_counter() - start
+        path = save_student(student)
+        student = load_student(path)  # report on the artifact as shipped
+
+        known_pred = student.predict(days, miles, receipts)
+        scalar_check = np.array([student.predict_one(d, m, r) for d, m, r in
+                                 zip(days.astype(int).tolist(), miles.tolist(), receipts.tolist())])
+        assert np.allclose(scalar_check, known_pred, atol=1e-6), f"{kind}: scalar and batch disagree"
+        rows.append({
+            'kind': kind,
+            'fit_seconds': fit_seconds,
+            'holdout': _fidelity(student.predict(h_days, h_miles, h_receipts), holdout_teacher),
+            'known': _fidelity(known_pred, known_teacher),
+            'public': eval_score(known_pred[public], expected[public]),
+            'scalar_speedup': teacher_scalar / _scalar_latency(student.predict_one, days, miles, receipts),
+            'batch_speedup': teacher_batch / _batch_seconds(student.predict, days, miles, receipts),
+            'bytes': os.path.getsize(path),
+            'path': path,
+        })
+
+    print("\nFidelity to the teacher (rounded outputs)")
+    print("=" * 92)
+    print(f"{'Student':<8} {'Holdout MAE':>12} {'Holdout max':>12} {'Known MAE':>10} {'Known max':>10} "
+          f"{'Same cents':>11} {'Within $1':>10} {'Fit s':>7}")
+    for r in rows:
+        print(f"{r['kind']:<8} {r['holdout']['mae']:>12.2f} {r['holdout']['max']:>12.2f} "
+              f"{r['known']['mae']:>10.2f} {r['known']['max']:>10.2f} {r['known']['same_cents']:>10.1%} "
+              f"{r['known']['within_dollar']:>10.1%} {r['fit_seconds']:>7.2f}")
+
+    print("\nAccuracy on public_cases.json, speed and size")
+    print("=" * 92)
+    print(f"{'Model':<8} {'Avg error':>10} {'Score':>10} {'Scalar speedup':>15} {'Batch speedup':>14} "
+          f"{'Size (KB)':>10}")
+    print(f"{'teacher':<8} {teacher_public['avg_error']:>10.2f} {teacher_public['score']:>10.2f} "
+          f"{'1x':>15} {'1x':>14} {teacher_bytes / 1024:>10.0f}")
+    for r in rows:
+        print(f"{r['kind']:<8} {r['public']['avg_error']:>10.2f} {r['public']['score']:>10.2f} "
+              f"{r['scalar_speedup']:>14.0f}x {r['batch_speedup']:>13.0f}x {r['bytes'] / 1024:>10.1f}")
+    print(f"\nTeacher: {teacher_scalar * 1e6:.0f} us per run.sh-style call, "
+          f"{len(days) / teacher_batch:,.0f} rows/s batched (without the residual lookup)")
+    print("Students saved to " + ", ".join(r['path'] for r in rows))
+
+    if 'tree' in (students or STUDENTS):
+        tradeoff = tree_depth_tradeoff((train_days, train_miles, train_receipts), train_y,
+                                       (h_days, h_miles, h_receipts), holdout_teacher,
+                                       (days, miles, receipts), expected)
+        print(f"\nTree student depth trade-off (shipped: max_depth={tree_depth})")
+        print("=" * 72)
+        print(f"{'Depth':>5} {'Leaves':>8} {'Size (KB)':>10} {'Holdout MAE':>12} {'Holdout max':>12} "
+              f"{'Avg error':>10}")
+        for r in tradeoff:
+            print(f"{r['depth']:>5} {r['leaves']:>8,} {r['bytes'] / 1024:>10.1f} {r['holdout']['mae']:>12.2f} "
+                  f"{r['holdout']['max']:>12.2f} {r['public']['avg_error']:>10.2f}")
+    return rows
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=400000)
+    parser.add_argument('--students', nargs='+', choices=list(STUDENTS))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tree-depth', type=int, default=TREE_DEPTH)
+    args = parser.parse_args()
+    distill(args.samples, args.students, args.seed, args.tree_depth)
+
+
+if __name__ == "__main__":
+    main()
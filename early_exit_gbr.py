@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Early-exit evaluation of the gradient boosting model (experimental)
+Trees are evaluated in descending order of their largest possible
+contribution (learning_rate x max |leaf|). After each tree the suffix sums of
+the remaining trees' smallest and largest leaves bound the final prediction;
+evaluation stops as soon as every value in that interval rounds to the same
+cent, and that shared cent value is returned. Rows that never become fixed
+are summed in sklearn's original tree order, so the output is bit-identical
+to model.predict.
+
+Experimental: for the current model the exit never fires at cent precision
+and evaluation is several times slower than sklearn, so nothing in
+production (run.sh, the solution modules) uses it.
+"""
+
+import time
+import numpy as np
+from gbr_model import engineer_features_batch, load_gbr, load_known_inputs, residual_corrections
+
+# Slack for reordering float64 additions (sums of ~500 terms around $2000 are
+# off by far less than 1e-8) and for half-cent ties
+SUM_SLACK = 1e-8
+
+
+class EarlyExitGBR:
+    """Flattened GradientBoostingRegressor with cent-rounding early exit (experimental)"""
+
+    def __init__(self, model, decimals=2):
+        self.decimals = decimals
+        self.scale = 10.0 ** decimals
+        self.init = float(model.init_.predict(np.zeros((1, model.n_features_in_)))[0])
+        trees = [estimator[0].tree_ for estimator in model.estimators_]
+        # sklearn adds learning_rate * value per stage; keep exactly that product
+        self.trees = [{
+            'feature': t.feature.astype(np.int64),
+            'threshold': t.threshold,
+            'left': t.children_left.astype(np.int64),
+            'right': t.children_right.astype(np.int64),
+            'value': model.learning_rate * t.value[:, 0, 0],
+        } for t in trees]
+        leaf_min = np.array([tree['value'][tree['left'] < 0].min() for tree in self.trees])
+        leaf_max = np.array([tree['value'][tree['left'] < 0].max() for tree in self.trees])
+
+        self.order = np.argsort(-np.maximum(np.abs(leaf_min), np.abs(leaf_max)), kind='stable')
+        # remaining_min[k] / remaining_max[k]: extreme total of trees order[k:]
+        self.remaining_min = np.append(np.cumsum(leaf_min[self.order][::-1])[::-1], 0.0)
+        self.remaining_max = np.append(np.cumsum(leaf_max[self.order][::-1])[::-1], 0.0)
+        self._lists = [(tree['feature'].tolist(), tree['threshold'].tolist(), tree['left'].tolist(),
+                        tree['right'].tolist(), tree['value'].tolist()) for tree in self.trees]
+        self._remaining = list(zip(self.remaining_min.tolist(), self.remaining_max.tolist()))
+
+    def _fixed(self, low, high):
+        """True where every value in [low, high] rounds to the same cent"""
+        return (np.floor((low - SUM_SLACK) * self.scale + 0.5) ==
+                np.floor((high + SUM_SLACK) * self.scale + 0.5))
+
+    def _leaf_values(self, tree, X):
+        feature, threshold, left, right = tree['feature'], tree['threshold'], tree['left'], tree['right']
+        node = np.zeros(len(X), dtype=np.int64)
+        rows = np.arange(len(X))
+        internal = left[node] >= 0
+        while internal.any():
+            n = node[internal]
+            go_left = X[rows[internal], feature[n]] <= threshold[n]
+            node[internal] = np.where(go_left, left[n], right[n])
+            internal = left[node] >= 0
+        return tree['value'][node]
+
+    def predict(self, X, offset=0.0):
+        """
+        Rounded predictions for an (n, 31) feature matrix plus an optional
+        per-row offset (the residual lookup). Returns (rounded, trees evaluated per row).
+        """
+        # Trees compare float32 features against float64 thresholds, as in sklearn
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n = len(X)
+        offset = np.broadcast_to(np.asarray(offset, dtype=float), (n,))
+        partial = np.full(n, self.init) + offset
+        contributions = np.zeros((n, len(self.trees)))
+        trees_used = np.full(n, len(self.trees))
+        result = np.full(n, np.nan)
+        active = np.arange(n)
+
+        for k, tree_index in enumerate(self.order):
+            values = self._leaf_values(self.trees[tree_index], X[active])
+            contributions[active, tree_index] = values
+            partial[active] += values
+            low = partial[active] + self.remaining_min[k + 1]
+            fixed = self._fixed(low, partial[active] + self.remaining_max[k + 1])
+            if k + 1 < len(self.order) and fixed.any():
+                done = active[fixed]
+                # The whole interval rounds to one value; low is in it, partial need not be
+                result[done] = np.round(low[fixed], self.decimals)
+                trees_used[done] = k + 1
+                active = active[~fixed]
+                if len(active) == 0:
+                    break
+
+        if len(active):
+            # Never fixed early: sum in sklearn's order for a bit-identical value
+            exact = np.full(len(active), self.init)
+            for tree_index in range(len(self.trees)):
+                exact += contributions[active, tree_index]
+            result[active] = np.round(exact + offset[active], self.decimals)
+        return result, trees_used
+
+    def predict_one(self, features, offset=0.0):
+        """Rounded prediction for one feature vector; returns (rounded, trees evaluated)"""
+        x = [float(np.float32(v)) for v in features]
+        partial = self.init + offset
+        contributions = [0.0] * len(self.trees)
+        for k, tree_index in enumerate(self.order.tolist()):
+            feature, threshold, left, right, value = self._lists[tree_index]
+            node = 0
+            while left[node] >= 0:
+                node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+            contributions[tree_index] = value[node]
+            partial += value[node]
+            remaining_min, remaining_max = self._remaining[k + 1]
+            low = partial + remaining_min
+            if k + 1 < len(self.trees) and (
+                    np.floor((low - SUM_SLACK) * self.scale + 0.5) ==
+                    np.floor((partial + remaining_max + SUM_SLACK) * self.scale + 0.5)):
+                return round(low, self.decimals), k + 1
+        exact = self.init
+        for contribution in contributions:
+            exact += contribution
+        return round(exact + offset, self.decimals), len(self.trees)
+
+
+def verify_and_report():
+    """Exhaustive check over every known case, then the average number of trees evaluated"""
+    model_data = load_gbr()
+    model = model_data['model']
+    evaluator = EarlyExitGBR(model)
+    days, miles, receipts, _ = load_known_inputs()
+    X = engineer_features_batch(days, miles, receipts)
+    offsets = residual_corrections(model_data['residual_lookup'], days, miles, receipts)
+
+    start = time.perf_counter()
+    reference = np.round(model.predict(X) + offsets, 2)
+    sklearn_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    ours, trees_used = evaluator.predict(X, offsets)
+    batch_seconds = time.perf_counter() - start
+
+    sample = range(len(X))
+    scalar = [evaluator.predict_one(X[i], offsets[i]) for i in sample]
+    scalar_changed = sum(value != reference[i] for (value, _), i in zip(scalar, sample))
+
+    changed = int((ours != reference).sum())
+    print(f"Exhaustive check over {len(X)} known cases (public + private)")
+    print("=" * 60)
+    print(f"Rounded outputs changed (batch): {changed}")
+    print(f"Rounded outputs changed (scalar): {scalar_changed}")
+    print(f"Average trees evaluated: {trees_used.mean():.1f} of {len(evaluator.trees)} "
+          f"(min {trees_used.min()}, exited early on {int((trees_used < len(evaluator.trees)).sum())} cases)")
+    print(f"Batch time: sklearn {sklearn_seconds * 1000:.0f} ms, early-exit {batch_seconds * 1000:.0f} ms")
+
+    # A cent is fixed only once the remaining trees can move the sum by < $0.01
+    width = evaluator.remaining_max - evaluator.remaining_min
+    last_width = width[len(evaluator.trees) - 1]
+    print(f"\nBound width of the remaining trees: after 100 trees ${width[100]:.2f}, after 400 "
+          f"${width[400]:.2f}, before the last tree ${last_width:.4f}")
+    if last_width >= 1 / evaluator.scale:
+        print("Even the smallest single tree can move the output by more than a cent, so no\n"
+              "early exit is provable for this model at cent precision.")
+    assert changed == 0 and scalar_changed == 0, "early exit changed a rounded output"
+
+    # Exercise the exit path where it can fire: rounding to whole dollars
+    coarse = EarlyExitGBR(model, decimals=0)
+    coarse_ours, coarse_trees = coarse.predict(X, offsets)
+    coarse_changed = int((coarse_ours != np.round(model.predict(X) + offsets, 0)).sum())
+    print(f"\nWhole-dollar rounding: average trees evaluated {coarse_trees.mean():.1f}, "
+          f"rounded outputs changed: {coarse_changed}")
+    assert coarse_changed == 0, "early exit changed a rounded output"
+
+
+if __name__ == "__main__":
+    verify_and_report()
@@ -5,27 +5,20 @@ Goal: Combine predictions from different tree structures to reduce overfitting
 """
 
 import json
+import sys
+import time
 import numpy as np
+from joblib import Parallel, delayed
 from sklearn.tree import DecisionTreeRegressor
 from sklearn.ensemble import RandomForestRegressor, ExtraTreesRegressor, GradientBoostingRegressor
 from sklearn.model_selection import cross_val_score
+from hyperparameter_search import expand_grid, successive_halving
+from training_cache import cached_run, print_metrics
 import warnings
 warnings.filterwarnings('ignore')
 
-# Load the data
-with open('public_cases.json', 'r') as f:
-    data = json.load(f)
-
-# Extract features and targets
-X = []
-y = []
-for case in data:
-    days = case['input']['trip_duration_days']
-    miles = case['input']['miles_traveled']
-    receipts = case['input']['total_receipts_amount']
-    expected = case['expected_output']
-    
-    # Engineer features (same as before)
+def engineer_features(days, miles, receipts):
+    """Feature vector shared by every ensemble"""
     miles_per_day = miles / days if days > 0 else 0
     receipts_per_day = receipts / days if days > 0 else 0
     receipts_per_mile = receipts / miles if miles > 0 else 0
@@ -38,110 +31,50 @@ for case in data:
     log_receipts = np.log1p(receipts)
     sqrt_days = np.sqrt(days)
     
-    features = [
+    return [
         days, miles, receipts,
         miles_per_day, receipts_per_day, receipts_per_mile,
         days_x_miles, days_x_receipts, miles_x_receipts,
         log_miles, log_receipts, sqrt_days
     ]
+
+# Hyperparameter grids searched for each ensemble type; n_estimators is the
+# (smallest, largest) tree budget of the successive-halving schedule
+RF_GRID = {'n_estimators': [10, 100], 'max_depth': [3, 4, 5, 6]}
+ET_GRID = {'n_estimators': [20, 100], 'max_depth': [4, 5, 6]}
+GB_GRID = {'n_estimators': [50, 200], 'max_depth': [3, 4, 5]}
+# Tree counts on each --sweep out-of-bag curve
+RF_SWEEP_TREES = [10, 20, 50, 100]
+ET_SWEEP_TREES = [20, 50, 100]
+BEST_PARAMS = {'n_estimators': 100, 'max_depth': 4, 'learning_rate': 0.1, 'random_state': 42}
+
+# Successive-halving settings: tree count doubles per round, 3-fold CV
+SEARCH_BUDGET = {'factor': 2, 'cv': 3}
+
+# Load the data
+with open('public_cases.json', 'r') as f:
+    data = json.load(f)
+
+# Extract features and targets
+X = []
+y = []
+for case in data:
+    days = case['input']['trip_duration_days']
+    miles = case['input']['miles_traveled']
+    receipts = case['input']['total_receipts_amount']
+    expected = case['expected_output']
     
-    X.append(features)
+    X.append(engineer_features(days, miles, receipts))
     y.append(expected)
 
 X = np.array(X)
 y = np.array(y)
 
-print("Testing different ensemble methods...")
-print("=" * 60)
-
-# 1. Random Forest with different parameters
-print("\n1. Random Forest Ensemble:")
-for n_estimators in [10, 20, 50, 100]:
-    for max_depth in [3, 4, 5, 6]:
-        rf = RandomForestRegressor(
-            n_estimators=n_estimators,
-            max_depth=max_depth,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        rf.fit(X, y)
-        
-        # Calculate training error
-        predictions = rf.predict(X)
-        errors = np.abs(predictions - y)
-        avg_error = np.mean(errors)
-        total_error = np.sum(errors)
-        
-        print(f"  Trees={n_estimators}, Depth={max_depth}: Avg Error=${avg_error:.2f}, Total=${total_error:.0f}")
-
-# 2. Extra Trees (more randomness)
-print("\n2. Extra Trees Ensemble:")
-for n_estimators in [20, 50, 100]:
-    for max_depth in [4, 5, 6]:
-        et = ExtraTreesRegressor(
-            n_estimators=n_estimators,
-            max_depth=max_depth,
-            random_state=42,
-            n_jobs=-1
-        )
-        
-        et.fit(X, y)
-        
-        predictions = et.predict(X)
-        errors = np.abs(predictions - y)
-        avg_error = np.mean(errors)
-        total_error = np.sum(errors)
-        
-        print(f"  Trees={n_estimators}, Depth={max_depth}: Avg Error=${avg_error:.2f}, Total=${total_error:.0f}")
-
-# 3. Gradient Boosting
-print("\n3. Gradient Boosting:")
-for n_estimators in [50, 100, 200]:
-    for max_depth in [3, 4, 5]:
-        gb = GradientBoostingRegressor(
-            n_estimators=n_estimators,
-            max_depth=max_depth,
-            learning_rate=0.1,
-            random_state=42
-        )
-        
-        gb.fit(X, y)
-        
-        predictions = gb.predict(X)
-        errors = np.abs(predictions - y)
-        avg_error = np.mean(errors)
-        total_error = np.sum(errors)
-        
-        print(f"  Trees={n_estimators}, Depth={max_depth}: Avg Error=${avg_error:.2f}, Total=${total_error:.0f}")
-
-# Find best model and generate code
-print("\n" + "=" * 60)
-print("Selecting best ensemble model...")
-
-# Use best performing configuration
-best_model = GradientBoostingRegressor(
-    n_estimators=100,
-    max_depth=4,
-    learning_rate=0.1,
-    random_state=42
-)
-best_model.fit(X, y)
-
-# Test on training data
-predictions = best_model.predict(X)
-errors = np.abs(predictions - y)
-avg_error = np.mean(errors)
-print(f"\nBest model average error: ${avg_error:.2f}")
-
-# Generate Python code for the ensemble
-print("\nGenerating ensemble prediction code...")
-
 def generate_ensemble_code(model, feature_names):
     """Generate Python code for ensemble predictions"""
     
     code = """def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
-    import numpy as np
+    import math
     
     # Engineer features
     days = trip_duration_days
@@ -154,14 +87,27 @@ def generate_ensemble_code(model, feature_names):
     days_x_miles = days * miles
     days_x_receipts = days * receipts
     miles_x_receipts = miles * receipts
-    log_miles = np.log1p(miles)
-    log_receipts = np.log1p(receipts)
-    sqrt_days = np.sqrt(days)
+    log_miles = math.log(miles + 1)
+    log_receipts = math.log(receipts + 1)
+    sqrt_days = math.sqrt(days)
     
     # Ensemble prediction using weighted average of simple rules
     predictions = []
     
 """
+    # The same rules over arrays, one np.where per rule
+    batch = '''
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    features = trip_features(days, miles, receipts)
+    miles_per_day = features['miles_per_day']
+
+'''
+    batch_predictions = []
     
     # Add multiple prediction rules based on model insights
     if hasattr(model, 'feature_importances_'):
@@ -188,26 +134,191 @@ def generate_ensemble_code(model, feature_names):
         code += "    else:\n"
         code += "        pred3 = 100 * days + 0.48 * miles + 0.6 * receipts\n"
         code += "    predictions.append(pred3)\n\n"
+        
+        batch += "    # Rule 1: Based on top features\n"
+        batch += "    pred1 = np.where(features['days_x_miles'] <= 2000,\n"
+        batch += "                     100 * days + 0.5 * miles + 0.8 * receipts,\n"
+        batch += "                     120 * days + 0.4 * miles + 0.7 * receipts)\n"
+        batch += "    # Rule 2: Efficiency-based\n"
+        batch += "    pred2 = np.where((150 <= miles_per_day) & (miles_per_day <= 250),\n"
+        batch += "                     110 * days + 0.55 * miles + 0.75 * receipts,\n"
+        batch += "                     95 * days + 0.45 * miles + 0.65 * receipts)\n"
+        batch += "    # Rule 3: Receipt-based\n"
+        batch += "    pred3 = np.where(features['receipts_per_day'] <= 100,\n"
+        batch += "                     105 * days + 0.52 * miles + 0.85 * receipts,\n"
+        batch += "                     100 * days + 0.48 * miles + 0.6 * receipts)\n"
+        batch_predictions += ['pred1', 'pred2', 'pred3']
     
     code += "    # Weighted average of predictions\n"
-    code += "    final_prediction = np.mean(predictions)\n"
+    code += "    final_prediction = sum(predictions) / len(predictions)\n"
     code += "    \n"
     code += "    # Apply bounds\n"
     code += "    final_prediction = max(100, min(2500, final_prediction))\n"
     code += "    \n"
     code += "    return round(final_prediction, 2)\n"
     
-    return code
+    # Summed in list order, as sum() adds the scalar predictions
+    batch += f"\n    final_prediction = ({' + '.join(batch_predictions)}) / {len(batch_predictions)}\n"
+    batch += "    final_prediction = np.maximum(100, np.minimum(2500, final_prediction))\n"
+    batch += "    return round_cents(final_prediction)\n"
+    
+    return code + batch
+
+def run_ensembles():
+    """Grid-search the ensembles, fit the best model and write solution_ensemble.py"""
+    metrics = {}
+
+    print("Testing different ensemble methods...")
+    print("=" * 60)
+
+    # Each family is searched by successive halving: every max_depth starts with
+    # the smallest forest in its grid and only the best half gets more trees
+    searches = [
+        ('random_forest', '1. Random Forest Ensemble',
+         RandomForestRegressor(random_state=42, n_jobs=-1), RF_GRID),
+        ('extra_trees', '2. Extra Trees Ensemble',
+         ExtraTreesRegressor(random_state=42, n_jobs=-1), ET_GRID),
+        ('gradient_boosting', '3. Gradient Boosting',
+         GradientBoostingRegressor(learning_rate=0.1, random_state=42), GB_GRID),
+    ]
+    for key, title, estimator, grid in searches:
+        print(f"\n{title}:")
+        search = successive_halving(
+            f'ensemble_trees_{key}', estimator,
+            expand_grid({'max_depth': grid['max_depth']}), X, y,
+            resource='n_estimators',
+            min_resource=grid['n_estimators'][0],
+            max_resource=grid['n_estimators'][1],
+            **SEARCH_BUDGET
+        )
+        print(f"  Best: Trees={search['best_resource']}, Depth={search['best_params']['max_depth']}: "
+              f"CV Avg Error=${search['best_score']:.2f}")
+        metrics[f'{key}_best_depth'] = search['best_params']['max_depth']
+        metrics[f'{key}_best_trees'] = search['best_resource']
+        metrics[f'{key}_cv_error'] = search['best_score']
 
-# Save the ensemble code
-ensemble_code = generate_ensemble_code(best_model, [
-    'days', 'miles', 'receipts', 'miles_per_day', 'receipts_per_day',
-    'receipts_per_mile', 'days_x_miles', 'days_x_receipts', 'miles_x_receipts',
-    'log_miles', 'log_receipts', 'sqrt_days'
-])
+    # Find best model and generate code
+    print("\n" + "=" * 60)
+    print("Selecting best ensemble model...")
 
-with open('solution_ensemble.py', 'w') as f:
-    f.write("#!/usr/bin/env python3\n\n")
-    f.write(ensemble_code)
+    # Use best performing configuration
+    best_model = GradientBoostingRegressor(**BEST_PARAMS)
+    best_model.fit(X, y)
 
-print("\nEnsemble solution saved to solution_ensemble.py")
\ No newline at end of file
+    # Test on training data
+    predictions = best_model.predict(X)
+    errors = np.abs(predictions - y)
+    avg_error = np.mean(errors)
+    print(f"\nBest model average error: ${avg_error:.2f}")
+
+    print("\nGenerating ensemble prediction code...")
+
+    # Save the ensemble code
+    ensemble_code = generate_ensemble_code(best_model, [
+        'days', 'miles', 'receipts', 'miles_per_day', 'receipts_per_day',
+        'receipts_per_mile', 'days_x_miles', 'days_x_receipts', 'miles_x_receipts',
+        'log_miles', 'log_receipts', 'sqrt_days'
+    ])
+
+    with open('solution_ensemble.py', 'w') as f:
+        f.write("#!/usr/bin/env python3\n\n")
+        f.write(ensemble_code)
+
+    print("\nEnsemble solution saved to solution_ensemble.py")
+
+    metrics['best_avg_error'] = float(avg_error)
+    return metrics
+
+
+def _grow_depth(estimator_cls, max_depth, tree_counts, X, y, random_state=42):
+    """
+    Grow one bootstrapped forest of a fixed depth with warm_start, adding trees
+    up to each count in tree_counts. Out-of-bag predictions are accumulated one
+    new tree at a time, so each count's OOB error costs only its added trees.
+    Returns [(n_estimators, oob_mae, oob_coverage)].
+    """
+    forest = estimator_cls(max_depth=max_depth, bootstrap=True, warm_start=True,
+                           random_state=random_state, n_jobs=1)
+    oob_sum = np.zeros(len(y))
+    oob_count = np.zeros(len(y))
+    curve = []
+    grown = 0
+    for n_estimators in sorted(tree_counts):
+        forest.set_params(n_estimators=n_estimators)
+        forest.fit(X, y)
+        for tree, in_bag in zip(forest.estimators_[grown:], forest.estimators_samples_[grown:]):
+            oob = np.ones(len(y), dtype=bool)
+            oob[in_bag] = False
+            oob_sum[oob] += tree.predict(X[oob])
+            oob_count[oob] += 1
+        grown = n_estimators
+        # Rows that were in every bootstrap sample have no OOB prediction yet
+        covered = oob_count > 0
+        oob_mae = np.mean(np.abs(oob_sum[covered] / oob_count[covered] - y[covered]))
+        curve.append((n_estimators, float(oob_mae), float(covered.mean())))
+    return curve
+
+
+def oob_sweep(estimator_cls, grid, n_jobs=-1):
+    """Out-of-bag error for every (n_estimators, max_depth) pair, depths grown in parallel"""
+    curves = Parallel(n_jobs=n_jobs)(
+        delayed(_grow_depth)(estimator_cls, depth, grid['n_estimators'], X, y)
+        for depth in grid['max_depth'])
+    return {depth: curve for depth, curve in zip(grid['max_depth'], curves)}
+
+
+def _grid_fits(estimator_cls, grid):
+    """The old grid: a separate forest per pair, scored on its own training data"""
+    results = {}
+    for depth in grid['max_depth']:
+        for n_estimators in grid['n_estimators']:
+            model = estimator_cls(n_estimators=n_estimators, max_depth=depth,
+                                  random_state=42, n_jobs=-1)
+            model.fit(X, y)
+            results[(n_estimators, depth)] = float(np.mean(np.abs(model.predict(X) - y)))
+    return results
+
+
+def sweep_report():
+    """Compare the warm-started OOB sweep with the per-pair grid for RF and ET"""
+    print("Warm-start out-of-bag sweep vs separate forest per grid point")
+    print("=" * 60)
+    for name, estimator_cls, grid in [
+            ('Random Forest', RandomForestRegressor, {**RF_GRID, 'n_estimators': RF_SWEEP_TREES}),
+            ('Extra Trees', ExtraTreesRegressor, {**ET_GRID, 'n_estimators': ET_SWEEP_TREES})]:
+        start = time.perf_counter()
+        train_errors = _grid_fits(estimator_cls, grid)
+        grid_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        curves = oob_sweep(estimator_cls, grid)
+        sweep_seconds = time.perf_counter() - start
+
+        print(f"\n{name}: grid {grid_seconds:.2f}s, sweep {sweep_seconds:.2f}s "
+              f"({grid_seconds / sweep_seconds:.1f}x faster)")
+        print(f"  {'Depth':>5} {'Trees':>6} {'Train error':>12} {'OOB error':>10} {'OOB rows':>9}")
+        best = None
+        for depth, curve in curves.items():
+            for n_estimators, oob_mae, coverage in curve:
+                print(f"  {depth:>5} {n_estimators:>6} {train_errors[(n_estimators, depth)]:>12.2f} "
+                      f"{oob_mae:>10.2f} {coverage:>8.1%}")
+                if coverage == 1.0 and (best is None or oob_mae < best[0]):
+                    best = (oob_mae, n_estimators, depth)
+        if best:
+            print(f"  Best by OOB: Trees={best[1]}, Depth={best[2]}: OOB Avg Error=${best[0]:.2f}")
+
+
+if '--sweep' in sys.argv:
+    sweep_report()
+    sys.exit(0)
+
+# Reuse the last run when data, features and grids are unchanged
+result = cached_run(
+    'ensemble_trees',
+    params={'rf': RF_GRID, 'et': ET_GRID, 'gb': GB_GRID, 'best': BEST_PARAMS, 'search': SEARCH_BUDGET},
+    train_fn=run_ensembles,
+    outputs=[],  # solution_ensemble.py is tracked source, regenerated only by a real run
+    features=engineer_features
+)
+if result['cache_hit']:
+    print_metrics(result['metrics'])
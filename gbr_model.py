@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Shared access to the production gradient boosting model
+Loads gradient_boosting_model.pkl outside run.sh and builds its 31 features
+for whole arrays of trips at once, bit-identical to engineer_features.
+calculate_reimbursement reproduces run.sh's output for the solution registry.
+"""
+
+import json
+import pickle
+import numpy as np
+
+MODEL_PATH = 'gradient_boosting_model.pkl'
+
+
+class _ModelUnpickler(pickle.Unpickler):
+    """The pickle references engineer_features from the training script's __main__"""
+
+    def find_class(self, module, name):
+        if module == '__main__' and name == 'engineer_features':
+            from train_gradient_boosting import engineer_features
+            return engineer_features
+        return super().find_class(module, name)
+
+
+def load_gbr(path=MODEL_PATH):
+    """{'model', 'residual_lookup', 'engineer_features'} as saved by train_gradient_boosting.py"""
+    with open(path, 'rb') as f:
+        return _ModelUnpickler(f).load()
+
+
+def engineer_features_batch(days, miles, receipts):
+    """Vectorized train_gradient_boosting.engineer_features: (n,) arrays -> (n, 31)"""
+    days = np.asarray(days, dtype=np.float64)
+    miles = np.asarray(miles, dtype=np.float64)
+    receipts = np.asarray(receipts, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        miles_per_day = np.where(days > 0, miles / days, 0)
+        receipts_per_day = np.where(days > 0, receipts / days, 0)
+        receipts_per_mile = np.where(miles > 0, receipts / miles, 0)
+
+    # Python's float ** 2 calls C pow(), which can differ from x * x in the last bit
+    miles_squared = np.array([m ** 2 for m in miles.tolist()])
+    receipts_squared = np.array([r ** 2 for r in receipts.tolist()])
+    cents = receipts - np.trunc(receipts)
+
+    return np.column_stack([
+        days, miles, receipts,
+        miles_per_day, receipts_per_day, receipts_per_mile,
+        days * miles, days * receipts, miles * receipts,
+        np.log1p(miles), np.log1p(receipts), np.log1p(days),
+        miles / (receipts + 1), days / (miles + 1), days / (receipts + 1),
+        days ** 2, miles_squared, receipts_squared, np.sqrt(miles), np.sqrt(receipts),
+        np.abs(cents - 0.99) < 0.001, np.abs(cents - 0.49) < 0.001, np.abs(cents - 0.33) < 0.001,
+        np.minimum(np.trunc(receipts / 200), 20), np.minimum(np.trunc(miles / 100), 20),
+        np.minimum(days, 15),
+        (50 <= miles_per_day) & (miles_per_day <= 400), miles > 1000, receipts > 1000,
+        days <= 3, days >= 10,
+    ]).astype(np.float64)
+
+
+def load_known_inputs():
+    """
+    (days, miles, receipts, expected) for public then private cases;
+    expected is NaN for the private cases
+    """
+    with open('public_cases.json', 'r') as f:
+        public = json.load(f)
+    with open('private_cases.json', 'r') as f:
+        private = json.load(f)
+    cases = [case['input'] for case in public] + private
+    expected = [case['expected_output'] for case in public] + [np.nan] * len(private)
+    return (np.array([c['trip_duration_days'] for c in cases], dtype=float),
+            np.array([c['miles_traveled'] for c in cases], dtype=float),
+            np.array([c['total_receipts_amount'] for c in cases], dtype=float),
+            np.array(expected, dtype=float))
+
+
+def residual_corrections(residual_lookup, days, miles, receipts):
+    """Per-row residual from the training lookup (0 for unseen trips), as run.sh applies it"""
+    return np.array([residual_lookup.get(key, 0.0) for key in zip(days.astype(int).tolist(),
+                                                                     miles.tolist(), receipts.tolist())])
+
+
+_gbr = None
+
+
+def _default_gbr():
+    global _gbr
+    if _gbr is None:
+        _gbr = load_gbr()
+    return _gbr
+
+
+def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
+    """run.sh's prediction: model output plus the training residual for known trips, rounded to cents"""
+    data = _default_gbr()
+    features = data['engineer_features'](trip_duration_days, miles_traveled, total_receipts_amount)
+    prediction = data['model'].predict([features])[0]
+    residual = data['residual_lookup'].get((trip_duration_days, miles_traveled, total_receipts_amount))
+    if residual is not None:
+        prediction = prediction + residual
+    return round(float(prediction), 2)
+
+
+def calculate_reimbursement_batch(days, miles, receipts):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    data = _default_gbr()
+    days, miles, receipts = (np.asarray(a, dtype=float) for a in (days, miles, receipts))
+    prediction = data['model'].predict(engineer_features_batch(days, miles, receipts))
+    return np.round(prediction + residual_corrections(data['residual_lookup'], days, miles, receipts), 2)
+
+
+if __name__ == "__main__":
+    from train_gradient_boosting import engineer_features
+    days, miles, receipts, _ = load_known_inputs()
+    batch = engineer_features_batch(days, miles, receipts)
+    scalar = np.array([engineer_features(int(d), m, r) for d, m, r in zip(days, miles, receipts)], dtype=float)
+    print(f"{len(days)} known inputs: batch features identical to engineer_features: "
+          f"{np.array_equal(batch, scalar)}")
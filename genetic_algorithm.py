@@ -8,6 +8,8 @@ import json
 import numpy as np
 import random
 from deap import base, creator, tools, algorithms
+from genome_encoding import (GENE_NAMES, RepairStats, random_genes, repair_offspring,
+                             validity_report, print_validity_report)
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -27,7 +29,7 @@ for case in data:
 # Define the individual structure
 # Gene: [base_per_diem, mile_rate1, mile_rate2, mile_rate3, receipt_rate1, receipt_rate2, 
 #        efficiency_bonus, 5day_multiplier, threshold1, threshold2, ...]
-GENE_SIZE = 20
+# Layout, bounds and threshold ordering live in genome_encoding.py
 
 # Setup DEAP
 creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
@@ -35,9 +37,8 @@ creator.create("Individual", list, fitness=creator.FitnessMin)
 
 toolbox = base.Toolbox()
 
-# Gene initialization
-toolbox.register("attr_float", random.uniform, 0, 200)
-toolbox.register("individual", tools.initRepeat, creator.Individual, toolbox.attr_float, n=GENE_SIZE)
+# Gene initialization (within per-gene bounds, thresholds in order)
+toolbox.register("individual", tools.initIterate, creator.Individual, random_genes)
 toolbox.register("population", tools.initRepeat, list, toolbox.individual)
 
 def evaluate_formula(individual):
@@ -124,11 +125,17 @@ toolbox.register("mate", tools.cxBlend, alpha=0.5)
 toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=10, indpb=0.2)
 toolbox.register("select", tools.selTournament, tournsize=3)
 
+# Repair offspring back into the valid region, tracking how many needed it
+repair_stats = RepairStats()
+toolbox.decorate("mate", repair_offspring(repair_stats))
+toolbox.decorate("mutate", repair_offspring(repair_stats))
+
 # Run genetic algorithm
 print("Running Genetic Algorithm...")
 print("=" * 60)
 
 population = toolbox.population(n=100)
+print_validity_report(validity_report(population), "Initial population")
 halloffame = tools.HallOfFame(1)
 
 stats = tools.Statistics(lambda ind: ind.fitness.values)
@@ -147,7 +154,8 @@ for gen in range(50):
     
     if gen % 10 == 0:
         record = stats.compile(population)
-        print(f"Generation {gen}: Min Error = ${record['min']:.0f}, Avg = ${record['avg']:.0f}")
+        print(f"Generation {gen}: Min Error = ${record['min']:.0f}, Avg = ${record['avg']:.0f}, "
+              f"Valid before repair = {repair_stats.valid_fraction():.1%}")
 
 # Get best individual
 best_individual = halloffame[0]
@@ -155,17 +163,13 @@ best_fitness = best_individual.fitness.values[0]
 
 print("\n" + "=" * 60)
 print(f"Best fitness: ${best_fitness:.0f}")
+print(f"Operator outputs valid before repair: {repair_stats.valid_fraction():.1%} "
+      f"of {repair_stats.checked}")
+for name, count in sorted(repair_stats.by_constraint.items(), key=lambda x: -x[1]):
+    print(f"  repaired {name}: {count}")
+print_validity_report(validity_report(population), "Final population")
 print("\nBest gene values:")
-gene_names = [
-    "base_per_diem", "mile_rate1", "mile_rate2", "mile_rate3",
-    "receipt_rate1", "receipt_rate2", "receipt_rate3", "efficiency_bonus",
-    "five_day_mult", "mile_threshold1", "mile_threshold2", 
-    "receipt_threshold1", "receipt_threshold2", "long_trip_threshold",
-    "efficiency_low", "efficiency_high", "penalty_mult1", "penalty_mult2",
-    "bonus_mult1", "bonus_mult2"
-]
-
-for i, (name, value) in enumerate(zip(gene_names, best_individual)):
+for i, (name, value) in enumerate(zip(GENE_NAMES, best_individual)):
     print(f"  {name}: {value:.2f}")
 
 # Generate Python code from best individual
@@ -194,7 +198,7 @@ def generate_genetic_code(individual):
     bonus_mult1 = individual[18] / 100
     bonus_mult2 = individual[19] / 100
     
-    code = f"""def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
+    code = f'''def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
     # Evolved formula from genetic algorithm
     days = trip_duration_days
     miles = miles_traveled
@@ -244,7 +248,38 @@ def generate_genetic_code(individual):
         total *= {1 + bonus_mult1:.3f}
     
     return round(total, 2)
-"""
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+
+    total = {base_per_diem:.2f} * days
+    total = np.where(days == 5, total * {five_day_mult:.3f}, total)
+
+    mileage = np.select(
+        [miles <= {mile_threshold1:.0f}, miles <= {mile_threshold2:.0f}],
+        [miles * {mile_rate1:.3f}, {mile_threshold1:.0f} * {mile_rate1:.3f} + (miles - {mile_threshold1:.0f}) * {mile_rate2:.3f}],
+        {mile_threshold1:.0f} * {mile_rate1:.3f} + ({mile_threshold2:.0f} - {mile_threshold1:.0f}) * {mile_rate2:.3f} + (miles - {mile_threshold2:.0f}) * {mile_rate3:.3f})
+    total = total + mileage
+
+    receipt_reimb = np.select(
+        [receipts <= {receipt_threshold1:.0f}, receipts <= {receipt_threshold2:.0f}],
+        [receipts * {receipt_rate1:.3f}, receipts * {receipt_rate2:.3f}],
+        receipts * {receipt_rate3:.3f})
+    total = total + receipt_reimb
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        miles_per_day = miles / days
+        receipts_per_day = np.where(days > 0, receipts / days, receipts)
+    total = np.where((days > 0) & ({efficiency_low:.0f} <= miles_per_day) & (miles_per_day <= {efficiency_high:.0f}), total + {efficiency_bonus:.2f}, total)
+    total = np.where((days >= {long_trip_threshold}) & (receipts_per_day > 150), total * {1 - penalty_mult1:.3f}, total)
+    total = np.where((days * miles > 5000) & (receipts < 500), total * {1 + bonus_mult1:.3f}, total)
+
+    return round_cents(total)
+'''
     
     return code
 
@@ -263,6 +298,7 @@ print("Running aggressive genetic algorithm with larger population...")
 
 # Increase population and generations
 large_population = toolbox.population(n=500)
+repair_stats.reset()
 halloffame_large = tools.HallOfFame(5)  # Keep top 5
 
 # Run for more generations
@@ -277,7 +313,8 @@ for gen in range(100):
     
     if gen % 20 == 0:
         record = stats.compile(large_population)
-        print(f"Generation {gen}: Min Error = ${record['min']:.0f}, Avg = ${record['avg']:.0f}")
+        print(f"Generation {gen}: Min Error = ${record['min']:.0f}, Avg = ${record['avg']:.0f}, "
+              f"Valid before repair = {repair_stats.valid_fraction():.1%}")
 
 # Check if we found a better solution
 best_large = halloffame_large[0]
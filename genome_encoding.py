@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Constraint-aware encoding for the genetic algorithm rule genome
+Keeps every gene inside a meaningful range and every threshold pair in order,
+so the evaluation budget is spent on formulas that actually make sense
+"""
+
+import random
+
+# Gene layout used by genetic_algorithm.evaluate_formula (raw, unscaled values)
+GENE_NAMES = [
+    "base_per_diem", "mile_rate1", "mile_rate2", "mile_rate3",
+    "receipt_rate1", "receipt_rate2", "receipt_rate3", "efficiency_bonus",
+    "five_day_mult", "mile_threshold1", "mile_threshold2",
+    "receipt_threshold1", "receipt_threshold2", "long_trip_threshold",
+    "efficiency_low", "efficiency_high", "penalty_mult1", "penalty_mult2",
+    "bonus_mult1", "bonus_mult2"
+]
+GENE_SIZE = len(GENE_NAMES)
+
+# Per-gene bounds in raw gene units (see the scaling in evaluate_formula)
+GENE_BOUNDS = [
+    (0, 200),    # base_per_diem: $/day
+    (0, 100),    # mile_rate1: /100 -> $0.00-$1.00 per mile
+    (0, 100),    # mile_rate2
+    (0, 100),    # mile_rate3
+    (0, 150),    # receipt_rate1: /100 -> 0-150% of receipts
+    (0, 150),    # receipt_rate2
+    (0, 150),    # receipt_rate3
+    (0, 200),    # efficiency_bonus: flat $
+    (0, 50),     # five_day_mult: 1 + x/100
+    (0, 150),    # mile_threshold1: *10 -> 0-1500 miles
+    (0, 150),    # mile_threshold2
+    (0, 260),    # receipt_threshold1: *10 -> $0-$2600
+    (0, 260),    # receipt_threshold2
+    (1, 14.99),  # long_trip_threshold: int() -> 1-14 days
+    (0, 120),    # efficiency_low: *10 -> 0-1200 miles/day
+    (0, 120),    # efficiency_high
+    (0, 100),    # penalty_mult1: total *= 1 - x/100
+    (0, 100),    # penalty_mult2
+    (0, 100),    # bonus_mult1: total *= 1 + x/100
+    (0, 100),    # bonus_mult2
+]
+
+# (lower, upper) gene index pairs that must satisfy lower <= upper
+ORDERED_PAIRS = [(9, 10), (11, 12), (14, 15)]
+
+
+def random_genes(rng=random):
+    """Sample a valid gene vector uniformly within bounds, thresholds in order"""
+    genes = [rng.uniform(lo, hi) for lo, hi in GENE_BOUNDS]
+    for i, j in ORDERED_PAIRS:
+        if genes[i] > genes[j]:
+            genes[i], genes[j] = genes[j], genes[i]
+    return genes
+
+
+def violations(genes):
+    """Return the names of all constraints violated by a gene vector"""
+    broken = []
+    for name, value, (lo, hi) in zip(GENE_NAMES, genes, GENE_BOUNDS):
+        if not lo <= value <= hi:
+            broken.append(name)
+    for i, j in ORDERED_PAIRS:
+        if genes[i] > genes[j]:
+            broken.append(f"{GENE_NAMES[i]}<={GENE_NAMES[j]}")
+    return broken
+
+
+def is_valid(genes):
+    """True if the gene vector respects every bound and ordering"""
+    return not violations(genes)
+
+
+def repair(genes):
+    """Clip genes to their bounds and re-order threshold pairs (in place)"""
+    for k, (lo, hi) in enumerate(GENE_BOUNDS):
+        genes[k] = min(max(genes[k], lo), hi)
+    for i, j in ORDERED_PAIRS:
+        if genes[i] > genes[j]:
+            genes[i], genes[j] = genes[j], genes[i]
+    return genes
+
+
+def decode(unit):
+    """
+    Map a point in the unit cube [0, 1]^GENE_SIZE to a valid gene vector.
+    Ordered pairs use an increment parameterization: the upper threshold is
+    placed in the remaining range above the lower one, so any point decodes
+    to thresholds that are already in order.
+    """
+    unit = [min(max(u, 0.0), 1.0) for u in unit]
+    genes = [lo + u * (hi - lo) for u, (lo, hi) in zip(unit, GENE_BOUNDS)]
+    for i, j in ORDERED_PAIRS:
+        hi = GENE_BOUNDS[j][1]
+        genes[j] = genes[i] + unit[j] * (hi - genes[i])
+    return genes
+
+
+def encode(genes):
+    """Inverse of decode for a valid gene vector"""
+    unit = [(g - lo) / (hi - lo) for g, (lo, hi) in zip(genes, GENE_BOUNDS)]
+    for i, j in ORDERED_PAIRS:
+        hi = GENE_BOUNDS[j][1]
+        span = hi - genes[i]
+        unit[j] = (genes[j] - genes[i]) / span if span > 0 else 0.0
+    return unit
+
+
+class RepairStats:
+    """Counts how many offspring needed repair and which constraints broke"""
+
+    def __init__(self):
+        self.checked = 0
+        self.invalid = 0
+        self.by_constraint = {}
+
+    def record(self, genes):
+        broken = violations(genes)
+        self.checked += 1
+        if broken:
+            self.invalid += 1
+            for name in broken:
+                self.by_constraint[name] = self.by_constraint.get(name, 0) + 1
+
+    def valid_fraction(self):
+        return 1.0 - self.invalid / self.checked if self.checked else 1.0
+
+    def reset(self):
+        self.checked = 0
+        self.invalid = 0
+        self.by_constraint = {}
+
+
+def repair_offspring(stats=None):
+    """
+    DEAP toolbox decorator: repair every individual returned by an operator
+    (mate/mutate), optionally recording its validity before the repair
+    """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            offspring = func(*args, **kwargs)
+            for child in offspring:
+                if stats is not None:
+                    stats.record(child)
+                repair(child)
+            return offspring
+        return wrapper
+    return decorator
+
+
+def validity_report(population):
+    """Summarize the fraction of valid individuals and the violated constraints"""
+    counts = {}
+    valid = 0
+    for genes in population:
+        broken = violations(genes)
+        if not broken:
+            valid += 1
+        for name in broken:
+            counts[name] = counts.get(name, 0) + 1
+    return {
+        'size': len(population),
+        'valid': valid,
+        'valid_fraction': valid / len(population) if population else 1.0,
+        'violations': counts,
+    }
+
+
+def print_validity_report(report, title="Population validity"):
+    """Pretty-print the output of validity_report"""
+    print(f"{title}: {report['valid']}/{report['size']} valid "
+          f"({report['valid_fraction']:.1%})")
+    for name, count in sorted(report['violations'].items(), key=lambda x: -x[1]):
+        print(f"  {name}: {count}")
+
+
+if __name__ == "__main__":
+    # Compare the old uniform [0, 200] sampling with the constrained encoding
+    old_population = [[random.uniform(0, 200) for _ in range(GENE_SIZE)] for _ in range(1000)]
+    print_validity_report(validity_report(old_population), "Uniform [0, 200] sampling")
+    new_population = [random_genes() for _ in range(1000)]
+    print_validity_report(validity_report(new_population), "Constrained sampling")
+    decoded = [decode([random.random() for _ in range(GENE_SIZE)]) for _ in range(1000)]
+    print_validity_report(validity_report(decoded), "Unit-cube decoding")
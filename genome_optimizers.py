@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Alternative optimizers for the genetic algorithm rule genome
+CMA-ES (DEAP's cma.Strategy) and differential evolution (scipy) over the same
+20-gene formula and total-error objective as genetic_algorithm.evaluate_formula,
+with the objective vectorized over a whole population at once
+"""
+
+import json
+import random
+import time
+import numpy as np
+from deap import base, cma, creator, tools, algorithms
+from scipy.optimize import differential_evolution
+from genome_encoding import (GENE_BOUNDS, GENE_NAMES, GENE_SIZE, ORDERED_PAIRS,
+                             RepairStats, random_genes, repair_offspring)
+import warnings
+warnings.filterwarnings('ignore')
+
+LOWER = np.array([lo for lo, hi in GENE_BOUNDS], dtype=float)
+UPPER = np.array([hi for lo, hi in GENE_BOUNDS], dtype=float)
+
+
+def load_case_arrays(path='public_cases.json'):
+    """Load cases as (days, miles, receipts, expected) column arrays"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    days = np.array([c['input']['trip_duration_days'] for c in data], dtype=float)
+    miles = np.array([c['input']['miles_traveled'] for c in data], dtype=float)
+    receipts = np.array([c['input']['total_receipts_amount'] for c in data], dtype=float)
+    expected = np.array([c['expected_output'] for c in data], dtype=float)
+    return days, miles, receipts, expected
+
+
+def decode_batch(unit):
+    """Vectorized genome_encoding.decode for a (P, GENE_SIZE) unit-cube array"""
+    unit = np.clip(np.atleast_2d(np.asarray(unit, dtype=float)), 0.0, 1.0)
+    genes = LOWER + unit * (UPPER - LOWER)
+    for i, j in ORDERED_PAIRS:
+        genes[:, j] = genes[:, i] + unit[:, j] * (UPPER[j] - genes[:, i])
+    return genes
+
+
+def batch_total_error(genes, days, miles, receipts, expected):
+    """
+    Total absolute error of every genome in a (P, GENE_SIZE) array.
+    Same formula as genetic_algorithm.evaluate_formula, evaluated as
+    (P, cases) array operations instead of a Python loop per case.
+    """
+    g = np.atleast_2d(np.asarray(genes, dtype=float))
+    col = lambda k: g[:, k:k + 1]
+
+    base_per_diem = col(0)
+    mile_rate1, mile_rate2, mile_rate3 = col(1) / 100, col(2) / 100, col(3) / 100
+    receipt_rate1, receipt_rate2, receipt_rate3 = col(4) / 100, col(5) / 100, col(6) / 100
+    efficiency_bonus = col(7)
+    five_day_mult = 1 + col(8) / 100
+    mile_threshold1, mile_threshold2 = col(9) * 10, col(10) * 10
+    receipt_threshold1, receipt_threshold2 = col(11) * 10, col(12) * 10
+    long_trip_threshold = np.trunc(col(13))
+    efficiency_low, efficiency_high = col(14) * 10, col(15) * 10
+    penalty_mult1 = col(16) / 100
+    bonus_mult1 = col(18) / 100
+
+    # Base calculation and 5-day bonus
+    total = base_per_diem * days
+    total = np.where(days == 5, total * five_day_mult, total)
+
+    # Mileage calculation (tiered)
+    mileage = np.where(
+        miles <= mile_threshold1,
+        miles * mile_rate1,
+        np.where(
+            miles <= mile_threshold2,
+            mile_threshold1 * mile_rate1 + (miles - mile_threshold1) * mile_rate2,
+            (mile_threshold1 * mile_rate1 +
+             (mile_threshold2 - mile_threshold1) * mile_rate2 +
+             (miles - mile_threshold2) * mile_rate3)))
+    total = total + mileage
+
+    # Receipt calculation (with thresholds)
+    receipt_reimb = np.where(
+        receipts <= receipt_threshold1, receipts * receipt_rate1,
+        np.where(receipts <= receipt_threshold2, receipts * receipt_rate2,
+                 receipts * receipt_rate3))
+    total = total + receipt_reimb
+
+    # Efficiency bonus
+    miles_per_day = miles / days
+    efficient = (efficiency_low <= miles_per_day) & (miles_per_day <= efficiency_high)
+    total = total + np.where(efficient, efficiency_bonus, 0.0)
+
+    # Long trip penalties
+    penalized = (days >= long_trip_threshold) & (receipts / days > 150)
+    total = np.where(penalized, total * (1 - penalty_mult1), total)
+
+    # Special combinations
+    boosted = (days * miles > 5000) & (receipts < 500)
+    total = np.where(boosted, total * (1 + bonus_mult1), total)
+
+    return np.abs(total - expected).sum(axis=1)
+
+
+class ConvergenceTrace:
+    """Records (evaluations, seconds, best error) after every batch"""
+
+    def __init__(self, target_error=None):
+        self.target_error = target_error
+        self.start = time.perf_counter()
+        self.evaluations = 0
+        self.best_error = float('inf')
+        self.best_genes = None
+        self.history = []
+        self.hit = None  # (evaluations, seconds) when target was first reached
+
+    def record(self, genes, errors):
+        self.evaluations += len(errors)
+        k = int(np.argmin(errors))
+        if errors[k] < self.best_error:
+            self.best_error = float(errors[k])
+            self.best_genes = np.array(genes[k], dtype=float)
+        elapsed = time.perf_counter() - self.start
+        self.history.append((self.evaluations, elapsed, self.best_error))
+        if (self.hit is None and self.target_error is not None
+                and self.best_error <= self.target_error):
+            self.hit = (self.evaluations, elapsed)
+
+    def done(self, max_evals):
+        return self.hit is not None or self.evaluations >= max_evals
+
+    def summary(self, name):
+        return {
+            'optimizer': name,
+            'best_error': self.best_error,
+            'best_genes': self.best_genes,
+            'evaluations': self.evaluations,
+            'seconds': time.perf_counter() - self.start,
+            'evals_to_target': self.hit[0] if self.hit else None,
+            'seconds_to_target': self.hit[1] if self.hit else None,
+            'history': self.history,
+        }
+
+
+def run_cmaes(cases, max_evals=20000, target_error=None, sigma=0.2, lambda_=40, seed=42,
+              stall_generations=30):
+    """
+    CMA-ES in the unit-cube encoding, one batched objective call per generation.
+    The piecewise objective traps a single run in local minima, so the strategy
+    restarts from a random centroid with a doubled population (IPOP) whenever
+    the step size collapses or the best error stalls.
+    """
+    np.random.seed(seed)
+    if not hasattr(creator, "FitnessMin"):
+        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+    if not hasattr(creator, "Individual"):
+        creator.create("Individual", list, fitness=creator.FitnessMin)
+
+    trace = ConvergenceTrace(target_error)
+    centroid = [0.5] * GENE_SIZE
+    while not trace.done(max_evals):
+        strategy = cma.Strategy(centroid=centroid, sigma=sigma, lambda_=lambda_)
+        run_best, stalled = float('inf'), 0
+        while not trace.done(max_evals) and stalled < stall_generations and strategy.sigma > 1e-6:
+            population = strategy.generate(creator.Individual)
+            genes = decode_batch(population)
+            errors = batch_total_error(genes, *cases)
+            for ind, error in zip(population, errors):
+                ind.fitness.values = (error,)
+            trace.record(genes, errors)
+            strategy.update(population)
+            if errors.min() < run_best - 1e-3:
+                run_best, stalled = errors.min(), 0
+            else:
+                stalled += 1
+        centroid = np.random.uniform(0, 1, GENE_SIZE).tolist()
+        lambda_ *= 2
+
+    return trace.summary('cma-es')
+
+
+def run_differential_evolution(cases, max_evals=20000, target_error=None, popsize=15, seed=42):
+    """scipy differential evolution in the unit-cube encoding, vectorized objective"""
+    trace = ConvergenceTrace(target_error)
+
+    def objective(unit):
+        # scipy passes candidates as columns: shape (GENE_SIZE, S)
+        genes = decode_batch(unit.T)
+        errors = batch_total_error(genes, *cases)
+        trace.record(genes, errors)
+        return errors
+
+    def callback(intermediate_result):
+        return trace.done(max_evals)
+
+    differential_evolution(
+        objective, [(0.0, 1.0)] * GENE_SIZE,
+        popsize=popsize, maxiter=max_evals, tol=0, polish=False,
+        vectorized=True, updating='deferred', callback=callback, seed=seed)
+
+    return trace.summary('differential-evolution')
+
+
+def run_ga(cases, max_evals=20000, target_error=None, population_size=100, seed=42):
+    """The DEAP varAnd + tournament baseline from genetic_algorithm.py, batch-evaluated"""
+    random.seed(seed)
+    if not hasattr(creator, "FitnessMin"):
+        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+    if not hasattr(creator, "Individual"):
+        creator.create("Individual", list, fitness=creator.FitnessMin)
+
+    toolbox = base.Toolbox()
+    toolbox.register("individual", tools.initIterate, creator.Individual, random_genes)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+    toolbox.register("mate", tools.cxBlend, alpha=0.5)
+    toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=10, indpb=0.2)
+    toolbox.register("select", tools.selTournament, tournsize=3)
+    toolbox.decorate("mate", repair_offspring(RepairStats()))
+    toolbox.decorate("mutate", repair_offspring(RepairStats()))
+
+    trace = ConvergenceTrace(target_error)
+    population = toolbox.population(n=population_size)
+    while not trace.done(max_evals):
+        offspring = algorithms.varAnd(population, toolbox, cxpb=0.7, mutpb=0.3)
+        genes = np.array(offspring, dtype=float)
+        errors = batch_total_error(genes, *cases)
+        for ind, error in zip(offspring, errors):
+            ind.fitness.values = (error,)
+        trace.record(genes, errors)
+        population = toolbox.select(offspring, k=len(population))
+
+    return trace.summary('deap-ga')
+
+
+OPTIMIZERS = {
+    'deap-ga': run_ga,
+    'cma-es': run_cmaes,
+    'differential-evolution': run_differential_evolution,
+}
+
+
+def convergence_benchmark(target_error, max_evals=20000, seed=42, optimizers=None):
+    """Run each optimizer to the target total error and compare evaluations and wall time"""
+    cases = load_case_arrays()
+    results = []
+    for name in optimizers or OPTIMIZERS:
+        result = OPTIMIZERS[name](cases, max_evals=max_evals, target_error=target_error, seed=seed)
+        results.append(result)
+
+    print(f"\nConvergence to total error <= ${target_error:,.0f} (budget {max_evals} evaluations)")
+    print("=" * 80)
+    print(f"{'Optimizer':<24} {'Best error':>12} {'Evals':>8} {'Seconds':>8} "
+          f"{'Evals@target':>13} {'Sec@target':>11}")
+    for r in results:
+        evals_hit = f"{r['evals_to_target']}" if r['evals_to_target'] else "-"
+        secs_hit = f"{r['seconds_to_target']:.2f}" if r['seconds_to_target'] else "-"
+        print(f"{r['optimizer']:<24} {r['best_error']:>12,.0f} {r['evaluations']:>8} "
+              f"{r['seconds']:>8.2f} {evals_hit:>13} {secs_hit:>11}")
+    return results
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--target', type=float, default=150000,
+                        help='total absolute error to reach on public cases')
+    parser.add_argument('--max-evals', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--optimizers', nargs='+', choices=list(OPTIMIZERS))
+    args = parser.parse_args()
+
+    results = convergence_benchmark(args.target, args.max_evals, args.seed, args.optimizers)
+
+    best = min(results, key=lambda r: r['best_error'])
+    print(f"\nBest overall: {best['optimizer']} with total error ${best['best_error']:,.0f}")
+    for name, value in zip(GENE_NAMES, best['best_genes']):
+        print(f"  {name}: {value:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,18 @@
 #!/usr/bin/env python3
 """
 Gradient Boosting approach without external dependencies
-Using multiple weak learners combined
+Using multiple weak learners combined: decision stumps fitted round by round,
+with each feature sorted once so a split search is a single cumulative-sum pass
 """
 
 import json
 import math
+import time
 
 # Load the data
 with open('public_cases.json', 'r') as f:
     data = json.load(f)
 
-# Create simple decision stumps
-def create_stump(feature_idx, threshold, left_val, right_val):
-    """Create a simple decision stump"""
-    def stump(features):
-        if features[feature_idx] <= threshold:
-            return left_val
-        else:
-            return right_val
-    return stump
-
 # Feature engineering function
 def engineer_features(days, miles, receipts):
     """Engineer features from raw inputs"""
@@ -65,47 +57,118 @@ feature_names = [
     'log_miles', 'log_receipts', 'sqrt_days'
 ]
 
-# Manually create a gradient boosting ensemble
-print("\nCreating gradient boosting ensemble...")
-
-# Start with a base prediction (mean of all targets)
-base_prediction = sum(y_train) / len(y_train)
-print(f"Base prediction: ${base_prediction:.2f}")
-
-# Create weak learners
-learners = []
-
-# Learner 1: Split on days_x_miles
-learner1 = {
-    'feature': 'days_x_miles',
-    'threshold': 2000,
-    'left': base_prediction * 0.7,
-    'right': base_prediction * 1.3
-}
-
-# Learner 2: Split on receipts_per_day
-learner2 = {
-    'feature': 'receipts_per_day',
-    'threshold': 100,
-    'left': 50,
-    'right': -30
-}
-
-# Learner 3: Split on miles_per_day
-learner3 = {
-    'feature': 'miles_per_day',
-    'threshold': 180,
-    'left': -20,
-    'right': 40
-}
+def presort_features(X):
+    """Sort every feature column once; boosting rounds reuse these orders"""
+    n_features = len(X[0])
+    orders = []
+    for j in range(n_features):
+        order = sorted(range(len(X)), key=lambda i: X[i][j])
+        orders.append((order, [X[i][j] for i in order]))
+    return orders
+
+def best_split(order, values, residuals, min_samples_leaf):
+    """
+    Best threshold on one pre-sorted feature by squared-error gain.
+    A single pass with running sums: gain = S_L^2/n_L + S_R^2/n_R
+    Returns (gain, threshold, left_mean, right_mean) or None
+    """
+    n = len(order)
+    total = 0.0
+    for i in order:
+        total += residuals[i]
+    best = None
+    left_sum = 0.0
+    for k in range(n - 1):
+        left_sum += residuals[order[k]]
+        n_left = k + 1
+        if n_left < min_samples_leaf or n - n_left < min_samples_leaf:
+            continue
+        if values[k] == values[k + 1]:
+            continue  # Can't split between equal values
+        right_sum = total - left_sum
+        gain = left_sum * left_sum / n_left + right_sum * right_sum / (n - n_left)
+        if best is None or gain > best[0]:
+            best = (gain, (values[k] + values[k + 1]) / 2,
+                    left_sum / n_left, right_sum / (n - n_left))
+    return best
+
+def fit_stumps(X, y, n_rounds=300, learning_rate=0.1, min_samples_leaf=5):
+    """
+    Gradient boosting with decision stumps (squared error)
+    Returns the model as packed parallel arrays for an O(rounds) evaluator
+    """
+    orders = presort_features(X)
+    base = sum(y) / len(y)
+    predictions = [base] * len(y)
+    model = {'base': base, 'feature': [], 'threshold': [], 'left': [], 'right': []}
+    
+    for _ in range(n_rounds):
+        residuals = [target - pred for target, pred in zip(y, predictions)]
+        best_feature, best = None, None
+        for j, (order, values) in enumerate(orders):
+            split = best_split(order, values, residuals, min_samples_leaf)
+            if split is not None and (best is None or split[0] > best[0]):
+                best_feature, best = j, split
+        if best is None:
+            break
+        
+        _, threshold, left_mean, right_mean = best
+        left_val = learning_rate * left_mean
+        right_val = learning_rate * right_mean
+        model['feature'].append(best_feature)
+        model['threshold'].append(threshold)
+        model['left'].append(left_val)
+        model['right'].append(right_val)
+        for i, x in enumerate(X):
+            predictions[i] += left_val if x[best_feature] <= threshold else right_val
+    
+    return model
+
+def predict_stumps(model, features):
+    """Evaluate packed stumps: one comparison per round"""
+    prediction = model['base']
+    for feature, threshold, left_val, right_val in zip(
+            model['feature'], model['threshold'], model['left'], model['right']):
+        prediction += left_val if features[feature] <= threshold else right_val
+    return prediction
+
+# Fit a real stump ensemble on the training data
+print("\nFitting gradient boosting with decision stumps...")
+
+n_rounds = 300
+start = time.perf_counter()
+model = fit_stumps(X_train, y_train, n_rounds=n_rounds, learning_rate=0.1)
+elapsed = time.perf_counter() - start
+print(f"Base prediction: ${model['base']:.2f}")
+print(f"Fitted {len(model['feature'])} stumps in {elapsed:.2f}s")
+
+fit_errors = [abs(predict_stumps(model, x) - target) for x, target in zip(X_train, y_train)]
+print(f"Training error: ${sum(fit_errors) / len(fit_errors):.2f} average")
+
+usage = {}
+for feature in model['feature']:
+    usage[feature_names[feature]] = usage.get(feature_names[feature], 0) + 1
+print("Stumps per feature:")
+for name, count in sorted(usage.items(), key=lambda x: -x[1]):
+    print(f"  {name}: {count}")
 
 # Generate code
 print("\nGenerating gradient boosting code...")
 
-code = '''#!/usr/bin/env python3
+def format_floats(values):
+    return ', '.join(repr(float(v)) for v in values)
+
+code = f'''#!/usr/bin/env python3
 
 import math
 
+# Boosted decision stumps: prediction = BASE + sum of LEFT/RIGHT per round
+BASE = {model['base']!r}
+FEATURE = ({', '.join(str(f) for f in model['feature'])},)
+THRESHOLD = ({format_floats(model['threshold'])},)
+LEFT = ({format_floats(model['left'])},)
+RIGHT = ({format_floats(model['right'])},)
+
 def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
     """Gradient boosting ensemble for reimbursement calculation"""
     
@@ -115,65 +178,42 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
     receipts = total_receipts_amount
     
     # Engineer features
-    miles_per_day = miles / days if days > 0 else 0
-    receipts_per_day = receipts / days if days > 0 else 0
-    receipts_per_mile = receipts / miles if miles > 0 else 0
-    days_x_miles = days * miles
-    days_x_receipts = days * receipts
-    miles_x_receipts = miles * receipts
-    log_miles = math.log(miles + 1)
-    log_receipts = math.log(receipts + 1)
-    sqrt_days = math.sqrt(days)
-    
-    # Base prediction
-    prediction = 987.45  # Mean from training data
-    
-    # Boosting round 1: days_x_miles
-    if days_x_miles <= 2000:
-        prediction = prediction * 0.7
-    else:
-        prediction = prediction * 1.3
-    
-    # Boosting round 2: receipts_per_day
-    if receipts_per_day <= 100:
-        prediction += 50
-    else:
-        prediction -= 30
-    
-    # Boosting round 3: miles_per_day efficiency
-    if 150 <= miles_per_day <= 250:
-        prediction += 40
-    else:
-        prediction -= 20
-    
-    # Boosting round 4: Special cases
-    if days == 5:
-        prediction *= 1.05  # 5-day bonus
-    
-    if days >= 7 and receipts_per_day > 150:
-        prediction *= 0.85  # Long trip penalty
-    
-    # Boosting round 5: Receipt adjustments
-    if receipts < 50:
-        prediction *= 0.8  # Low receipt penalty
-    elif 600 <= receipts <= 800:
-        prediction *= 1.02  # Sweet spot bonus
-    
-    # Boosting round 6: Mileage tiers
-    if miles <= 100:
-        mileage_component = miles * 0.58
-    elif miles <= 300:
-        mileage_component = 100 * 0.58 + (miles - 100) * 0.50
-    else:
-        mileage_component = 100 * 0.58 + 200 * 0.50 + (miles - 300) * 0.40
-    
-    # Combine base prediction with mileage
-    prediction = prediction * 0.7 + mileage_component * 0.3
+    features = (
+        days, miles, receipts,
+        miles / days if days > 0 else 0,
+        receipts / days if days > 0 else 0,
+        receipts / miles if miles > 0 else 0,
+        days * miles, days * receipts, miles * receipts,
+        math.log(miles + 1), math.log(receipts + 1), math.sqrt(days)
+    )
     
-    # Final bounds
-    prediction = max(150, min(2500, prediction))
+    prediction = BASE
+    for feature, threshold, left_val, right_val in zip(FEATURE, THRESHOLD, LEFT, RIGHT):
+        prediction += left_val if features[feature] <= threshold else right_val
     
     return round(prediction, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement: every stump is applied to all trips at once"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = np.stack([
+            days, miles, receipts,
+            np.where(days > 0, miles / days, 0.0),
+            np.where(days > 0, receipts / days, 0.0),
+            np.where(miles > 0, receipts / miles, 0.0),
+            days * miles, days * receipts, miles * receipts,
+            np.log(miles + 1), np.log(receipts + 1), np.sqrt(days),
+        ])
+
+    # Stumps are added one at a time in the scalar order, so the float sums match exactly
+    prediction = np.full(len(days), BASE)
+    for feature, threshold, left_val, right_val in zip(FEATURE, THRESHOLD, LEFT, RIGHT):
+        prediction += np.where(features[feature] <= threshold, left_val, right_val)
+    return round_cents(prediction)
 '''
 
 # Save the gradient boosting solution
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Successive-halving hyperparameter search shared by the trainers
+Every candidate is scored with a small budget (max_iter / n_estimators), only
+the best 1/factor are promoted to the next round with factor times the budget,
+candidate x fold fits run in parallel, and every trial is appended to a
+JSON-lines results store.
+"""
+
+import json
+import math
+import os
+import time
+import warnings
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold
+
+RESULTS_PATH = 'search_results.jsonl'
+
+
+class SearchResultsStore:
+    """Append-only JSON-lines log of every trial"""
+
+    def __init__(self, path=RESULTS_PATH):
+        self.path = path
+
+    def record(self, trial):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(trial, default=_json_default) + '\n')
+
+    def load(self, search=None):
+        """All trials, optionally only those from one named search"""
+        if not os.path.exists(self.path):
+            return []
+        trials = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                trial = json.loads(line)
+                if search is None or trial['search'] == search:
+                    trials.append(trial)
+        return trials
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, tuple):
+        return list(value)
+    return repr(value)
+
+
+def _fit_and_score(estimator, X, y, train_idx, val_idx):
+    """Fit one candidate on one fold; returns (validation MAE, fit seconds)"""
+    with warnings.catch_warnings():
+        # Small budgets in early rounds are expected not to converge
+        warnings.simplefilter('ignore')
+        start = time.perf_counter()
+        estimator.fit(X[train_idx], y[train_idx])
+        seconds = time.perf_counter() - start
+        mae = float(np.mean(np.abs(estimator.predict(X[val_idx]) - y[val_idx])))
+    return mae, seconds
+
+
+def successive_halving(name, estimator, candidates, X, y, resource, min_resource, max_resource,
+                       factor=3, cv=3, n_jobs=-1, store=None, random_state=42, verbose=True):
+    """
+    Search candidates (a list of param dicts) for the lowest CV mean absolute error.
+    resource is the budget parameter ('max_iter', 'n_estimators', ...) which grows
+    from min_resource by factor each round, capped at max_resource; the final
+    survivor is always scored at max_resource.
+    Returns {'best_params', 'best_score', 'best_resource', 'trials'}.
+    """
+    store = store if store is not None else SearchResultsStore()
+    X = np.asarray(X)
+    y = np.asarray(y)
+    folds = list(KFold(n_splits=cv, shuffle=True, random_state=random_state).split(X))
+
+    run_id = time.strftime('%Y%m%d-%H%M%S')
+    survivors = list(candidates)
+    budget = min_resource
+    round_number = 0
+    trials = []
+
+    with Parallel(n_jobs=n_jobs) as parallel:
+        while True:
+            jobs = []
+            for params in survivors:
+                model = clone(estimator).set_params(**params, **{resource: budget})
+                for train_idx, val_idx in folds:
+                    jobs.append(delayed(_fit_and_score)(clone(model), X, y, train_idx, val_idx))
+            fold_results = parallel(jobs)
+
+            round_trials = []
+            for k, params in enumerate(survivors):
+                results = fold_results[k * cv:(k + 1) * cv]
+                scores = [mae for mae, _ in results]
+                trial = {
+                    'search': name,
+                    'run': run_id,
+                    'round': round_number,
+                    'params': params,
+                    'resource': resource,
+                    'budget': budget,
+                    'cv_mae': float(np.mean(scores)),
+                    'cv_mae_std': float(np.std(scores)),
+                    'fit_seconds': float(sum(seconds for _, seconds in results)),
+                    'timestamp': time.time(),
+                }
+                store.record(trial)
+                round_trials.append(trial)
+            trials.extend(round_trials)
+            round_trials.sort(key=lambda t: t['cv_mae'])
+
+            if verbose:
+                print(f"  Round {round_number}: {len(survivors)} candidates at {resource}={budget}, "
+                      f"best CV MAE ${round_trials[0]['cv_mae']:.2f} ({round_trials[0]['params']})")
+
+            if budget >= max_resource:
+                break
+            keep = max(1, math.ceil(len(survivors) / factor))
+            survivors = [t['params'] for t in round_trials[:keep]]
+            # The last survivor (or a lone candidate) is always confirmed with the full budget
+            budget = max_resource if keep == 1 else min(budget * factor, max_resource)
+            round_number += 1
+
+    best = round_trials[0]
+    return {
+        'best_params': best['params'],
+        'best_score': best['cv_mae'],
+        'best_resource': best['budget'],
+        'trials': trials,
+    }
+
+
+def expand_grid(grid):
+    """Cartesian product of a {param: [values]} grid as a list of param dicts"""
+    candidates = [{}]
+    for param, values in grid.items():
+        candidates = [{**c, param: v} for c in candidates for v in values]
+    return candidates
+
+
+if __name__ == "__main__":
+    # Summarize the most recent run of every stored search
+    store = SearchResultsStore()
+    searches = {}
+    for trial in store.load():
+        latest = searches.get(trial['search'])
+        if latest is None or trial['run'] > latest[0]['run']:
+            searches[trial['search']] = [trial]
+        elif trial['run'] == latest[0]['run']:
+            latest.append(trial)
+    for name, trials in searches.items():
+        final_round = max(t['round'] for t in trials)
+        best = min((t for t in trials if t['round'] == final_round), key=lambda t: t['cv_mae'])
+        fit_seconds = sum(t['fit_seconds'] for t in trials)
+        print(f"{name}: {len(trials)} trials, {fit_seconds:.1f}s of fitting, "
+              f"best CV MAE ${best['cv_mae']:.2f} with {best['params']} at {best['resource']}={best['budget']}")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Integer-cents arithmetic with selectable rounding modes
+Money is int64 cents and rates are exact fractions ('0.58' -> 58/100), so a
+formula like per_day * days + per_mile * miles + rate * receipts is summed
+exactly and rounded to cents once (or per term), vectorized over whole
+arrays. Modes: half_up (away from zero), half_even (banker's), truncate
+(toward zero), floor, ceil, and double (round half-up to a tenth of a cent,
+then half-up to cents: the ".49 rounds up twice" folklore).
+"""
+
+import math
+import time
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP
+from fractions import Fraction
+import numpy as np
+
+ROUNDING_MODES = ('half_up', 'half_even', 'truncate', 'floor', 'ceil', 'double')
+DOUBLE_ROUNDING_STEPS = 10  # first pass rounds to 1/10 cent
+
+
+def to_cents(dollars):
+    """Float dollar amounts -> int64 cents (nearest cent; inputs are expected on the cents grid)"""
+    return np.round(np.asarray(dollars, dtype=float) * 100).astype(np.int64)
+
+
+def from_cents(cents):
+    return np.asarray(cents, dtype=np.int64) / 100
+
+
+def as_fraction(rate):
+    """Exact rate from a string, int, Decimal or float (floats by their shortest repr, like Decimal(str(x)))"""
+    if isinstance(rate, float):
+        rate = repr(rate)
+    return Fraction(rate)
+
+
+def round_div(numerator, denominator, mode='half_up'):
+    """
+    numerator / denominator rounded to an integer under mode, exactly, for
+    int64 arrays (denominator a positive int)
+    """
+    n = np.asarray(numerator, dtype=np.int64)
+    d = int(denominator)
+    if d <= 0:
+        raise ValueError("denominator must be positive")
+    if mode == 'double':
+        # Half-up to 1/DOUBLE_ROUNDING_STEPS of the unit first, then half-up again
+        if d % DOUBLE_ROUNDING_STEPS == 0:
+            finer = round_div(n, d // DOUBLE_ROUNDING_STEPS, 'half_up')
+        else:
+            finer = round_div(n * DOUBLE_ROUNDING_STEPS, d, 'half_up')
+        return round_div(finer, DOUBLE_ROUNDING_STEPS, 'half_up')
+
+    q, r = np.divmod(n, d)  # floor quotient, 0 <= r < d
+    if mode == 'floor':
+        return q
+    if mode == 'ceil':
+        return q + (r > 0)
+    if mode == 'truncate':
+        return q + ((r > 0) & (n < 0))
+    twice = 2 * r
+    if mode == 'half_up':
+        # Away from zero on ties: up for positive, down (toward -inf) for negative
+        return q + ((twice > d) | ((twice == d) & (n >= 0)))
+    if mode == 'half_even':
+        return q + ((twice > d) | ((twice == d) & (q % 2 == 1)))
+    raise ValueError(f"unknown rounding mode {mode!r}; expected one of {ROUNDING_MODES}")
+
+
+def mul_rate(cents, rate, mode='half_up'):
+    """cents x rate rounded to whole cents"""
+    rate = as_fraction(rate)
+    return round_div(np.asarray(cents, dtype=np.int64) * rate.numerator, rate.denominator, mode)
+
+
+def exact_linear(terms, constant_cents=0, mode='half_up', round_each=False):
+    """
+    sum(rate * values) + constant in cents. terms is [(rate, int64 values in
+    the units the rate applies to), ...], e.g. [('100.00', days), ('0.58',
+    miles), ('0.8', receipts_cents)] with days and miles as counts (rates in
+    dollars are scaled to cents) -- see linear_cents for the usual formula.
+    round_each rounds every term to cents before summing, as some legacy
+    systems did; otherwise the exact sum is rounded once.
+    """
+    rates = [as_fraction(rate) for rate, _ in terms]
+    if round_each:
+        total = np.int64(constant_cents)
+        for rate, (_, values) in zip(rates, terms):
+            total = total + mul_rate(values, rate, mode)
+        return total
+    common = math.lcm(*(rate.denominator for rate in rates)) if rates else 1
+    total = np.int64(constant_cents) * common
+    for rate, (_, values) in zip(rates, terms):
+        total = total + np.asarray(values, dtype=np.int64) * (rate.numerator * (common // rate.denominator))
+    return round_div(total, common, mode)
+
+
+def linear_cents(days, miles, receipts, per_day, per_mile, receipt_rate, constant='0',
+                 mode='half_up', round_each=False):
+    """
+    per_day * days + per_mile * miles + receipt_rate * receipts (+ constant),
+    all rates in dollars, exact and rounded to cents. Returns int64 cents.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    miles_hundredths = to_cents(miles)  # miles may carry two decimals
+    receipts_cents = to_cents(receipts)
+    terms = [
+        (as_fraction(per_day) * 100, days),
+        (as_fraction(per_mile), miles_hundredths),
+        (as_fraction(receipt_rate), receipts_cents),
+    ]
+    constant = as_fraction(constant) * 100
+    if constant.denominator != 1:
+        terms.append((constant, np.ones_like(days)))
+        constant = 0
+    return exact_linear(terms, int(constant), mode, round_each)
+
+
+def float_to_cents(dollars, mode='half_up', digits=6):
+    """
+    Round float dollar amounts to cents under mode, reading each float as a
+    decimal with `digits` places (so 1.005 is a tie, as Decimal('1.005') is)
+    """
+    scale = 10 ** digits
+    units = np.round(np.asarray(dollars, dtype=float) * scale).astype(np.int64)
+    return round_div(units, scale // 100, mode)
+
+
+DECIMAL_MODES = {'half_up': ROUND_HALF_UP, 'half_even': ROUND_HALF_EVEN, 'truncate': ROUND_DOWN}
+
+
+def _decimal_linear(days, miles, receipts, per_day, per_mile, receipt_rate, mode):
+    """Reference: the one-value-at-a-time Decimal computation of integer_formula_search.py"""
+    total = (Decimal(per_day) * Decimal(str(days)) + Decimal(per_mile) * Decimal(str(miles))
+             + Decimal(receipt_rate) * Decimal(str(receipts)))
+    return int(total.quantize(Decimal('0.01'), rounding=DECIMAL_MODES[mode]) * 100)
+
+
+def verify_and_report():
+    from gbr_model import load_known_inputs
+    days, miles, receipts, expected = load_known_inputs()
+    n_public = int((~np.isnan(expected)).sum())
+    rates = ('100', '0.58', '0.80')
+
+    print(f"Integer-cents linear formula vs Decimal on {len(days)} known cases")
+    print("=" * 76)
+    inputs = list(zip(days.astype(int).tolist(), miles.tolist(), receipts.tolist()))
+    for mode in DECIMAL_MODES:
+        start = time.perf_counter()
+        reference = np.array([_decimal_linear(d, m, r, *rates, mode) for d, m, r in inputs])
+        decimal_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        ours = linear_cents(days, miles, receipts, *rates, mode=mode)
+        vector_seconds = time.perf_counter() - start
+        mismatches = int((ours != reference).sum())
+        print(f"{mode:<10} mismatches {mismatches:>3}   Decimal {decimal_seconds * 1000:7.1f} ms   "
+              f"int64 {vector_seconds * 1000:6.2f} ms   ({decimal_seconds / vector_seconds:,.0f}x)")
+        assert mismatches == 0, f"integer-cents {mode} differs from Decimal"
+
+    # Ties and negatives for every mode against Fraction arithmetic
+    rng = np.random.default_rng(0)
+    numerators = np.concatenate([rng.integers(-10**9, 10**9, 20000), np.arange(-50, 51) * 5])
+    for denominator in (2, 10, 100, 1000):
+        for mode in ROUNDING_MODES[:5]:
+            ours = round_div(numerators, denominator, mode)
+            for n, value in zip(numerators[::97].tolist(), ours[::97].tolist()):
+                exact = Fraction(n, denominator)
+                floor = math.floor(exact)
+                frac = exact - floor
+                reference = {
+                    'floor': floor, 'ceil': math.ceil(exact), 'truncate': int(exact),
+                    'half_up': (floor + 1 if frac > Fraction(1, 2) or (frac == Fraction(1, 2) and n >= 0)
+                                else floor),
+                    'half_even': round(exact),
+                }[mode]
+                assert value == reference, (n, denominator, mode, value, reference)
+    print("round_div matches Fraction arithmetic for every mode, ties and negatives included")
+
+    public = slice(0, n_public)
+    target = to_cents(expected[public])
+    print(f"\nExact matches of {' + '.join(rates)} (days, miles, receipts) on {n_public} public cases:")
+    for round_each in (False, True):
+        for mode in ROUNDING_MODES:
+            cents = linear_cents(days[public], miles[public], receipts[public], *rates,
+                                 mode=mode, round_each=round_each)
+            print(f"  {mode:<10} {'per term' if round_each else 'once':<9} {int((cents == target).sum()):>4}")
+
+    # Double rounding pushes x.xx45..x.xx49 up a cent where a single half-up keeps it
+    sample = np.array([10049, 10045, 10044, 10050, -10049])  # in 1/100 cent
+    print("\n1/100-cent values", sample.tolist(), "-> half_up", round_div(sample, 100, 'half_up').tolist(),
+          "double", round_div(sample, 100, 'double').tolist())
+
+
+if __name__ == "__main__":
+    verify_and_report()
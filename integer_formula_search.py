@@ -5,8 +5,10 @@ Legacy systems often used integer arithmetic to avoid floating point issues
 """
 
 import json
+import math
 from fractions import Fraction
-from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+from integer_cents import ROUNDING_MODES, linear_cents, to_cents
 
 # Load the data
 with open('public_cases.json', 'r') as f:
@@ -60,43 +62,39 @@ def test_integer_formulas():
     print(f"\nExact matches: {exact_matches}/100")
 
 def test_decimal_calculations():
-    """Test using Decimal for exact decimal arithmetic"""
-    print("\n\nTesting Decimal-based calculations...")
+    """Test exact decimal arithmetic (integer cents) under each rounding mode"""
+    print("\n\nTesting exact decimal calculations...")
     
     # Common rates in legacy systems
     rates_to_test = [
-        (Decimal('100'), Decimal('0.58'), Decimal('0.80')),
-        (Decimal('95'), Decimal('0.55'), Decimal('0.85')),
-        (Decimal('105'), Decimal('0.60'), Decimal('0.75')),
-        (Decimal('98'), Decimal('0.575'), Decimal('0.82')),
+        ('100', '0.58', '0.80'),
+        ('95', '0.55', '0.85'),
+        ('105', '0.60', '0.75'),
+        ('98', '0.575', '0.82'),
     ]
     
+    days = np.array([case['input']['trip_duration_days'] for case in data])
+    miles = np.array([case['input']['miles_traveled'] for case in data])
+    receipts = np.array([case['input']['total_receipts_amount'] for case in data])
+    expected = to_cents([case['expected_output'] for case in data])
+    
     best_rate = None
     best_matches = 0
     
     for base, mile_rate, receipt_rate in rates_to_test:
-        exact_matches = 0
-        
-        for case in data:
-            days = Decimal(str(case['input']['trip_duration_days']))
-            miles = Decimal(str(case['input']['miles_traveled']))
-            receipts = Decimal(str(case['input']['total_receipts_amount']))
-            expected = Decimal(str(case['expected_output']))
-            
-            # Calculate
-            total = base * days + mile_rate * miles + receipt_rate * receipts
-            
-            # Round to 2 decimal places (cents)
-            total = total.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-            
-            if total == expected:
-                exact_matches += 1
+        matches_by_mode = {}
+        for mode in ROUNDING_MODES:
+            total = linear_cents(days, miles, receipts, base, mile_rate, receipt_rate, mode=mode)
+            matches_by_mode[mode] = int((total == expected).sum())
+        mode = max(matches_by_mode, key=matches_by_mode.get)
+        exact_matches = matches_by_mode[mode]
         
         if exact_matches > best_matches:
             best_matches = exact_matches
-            best_rate = (base, mile_rate, receipt_rate)
+            best_rate = (base, mile_rate, receipt_rate, mode)
         
-        print(f"Rate {base}, {mile_rate}, {receipt_rate}: {exact_matches} exact matches")
+        print(f"Rate {base}, {mile_rate}, {receipt_rate}: " +
+              ", ".join(f"{m} {count}" for m, count in matches_by_mode.items()) + " exact matches")
     
     print(f"\nBest rate: {best_rate} with {best_matches} matches")
 
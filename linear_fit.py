@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Fast least-squares fitting for linear reimbursement formulas
+Closed-form and bound-constrained fits of a*days + b*miles + c*receipts + d,
+and batched per-segment fits (one coefficient vector per trip length,
+receipt band, ...) in a single vectorized call.
+"""
+
+import itertools
+import json
+import time
+import numpy as np
+from scipy.optimize import lsq_linear
+
+
+def design_matrix(days, miles, receipts):
+    """[days, miles, receipts, 1] rows for the linear formula"""
+    days = np.asarray(days, dtype=float)
+    return np.column_stack([days, np.asarray(miles, dtype=float),
+                            np.asarray(receipts, dtype=float), np.ones_like(days)])
+
+
+def sse(params, X, y):
+    """Sum of squared errors of X @ params against y"""
+    residual = X @ params - y
+    return residual @ residual
+
+
+def _bounds_arrays(bounds, n_params):
+    """[(lo, hi), ...] with None for unbounded -> (lower, upper) float arrays"""
+    if bounds is None:
+        return np.full(n_params, -np.inf), np.full(n_params, np.inf)
+    lower = np.array([-np.inf if lo is None else lo for lo, hi in bounds], dtype=float)
+    upper = np.array([np.inf if hi is None else hi for lo, hi in bounds], dtype=float)
+    return lower, upper
+
+
+def bounded_lstsq(X, y, bounds=None):
+    """
+    Exact bound-constrained least squares (BVLS), no numerical differentiation.
+    bounds is a list of (lo, hi) per coefficient, None meaning unbounded.
+    """
+    lower, upper = _bounds_arrays(bounds, X.shape[1])
+    if np.all(np.isinf(lower)) and np.all(np.isinf(upper)):
+        return np.linalg.lstsq(X, y, rcond=None)[0]
+    return lsq_linear(X, y, bounds=(lower, upper), method='bvls').x
+
+
+def segment_normal_equations(X, y, segment_ids, n_segments, max_chunk_elements=1 << 22):
+    """
+    Per-segment X^T X (S, p, p), X^T y (S, p) and row counts, without a loop
+    over segments. Rows are accumulated in chunks so the (rows, p * p) outer
+    products stay bounded in memory for large samples.
+    """
+    p = X.shape[1]
+    xtx = np.zeros((n_segments, p * p))
+    chunk = max(1, max_chunk_elements // (p * p))
+    for start in range(0, len(X), chunk):
+        rows = X[start:start + chunk]
+        outer = np.einsum('ni,nj->nij', rows, rows).reshape(len(rows), p * p)
+        np.add.at(xtx, segment_ids[start:start + chunk], outer)
+    xty = np.zeros((n_segments, p))
+    np.add.at(xty, segment_ids, X * y[:, None])
+    counts = np.bincount(segment_ids, minlength=n_segments)
+    return xtx.reshape(n_segments, p, p), xty, counts
+
+
+def _bounded_segments(xtx, xty, lower, upper):
+    """
+    Exact box-constrained least squares for every segment at once.
+    With few coefficients every active set (each coefficient free, at its lower
+    or at its upper bound) can be tried: each pattern is one batched solve, and
+    the optimum is the lowest-SSE pattern whose free coefficients stay in bounds.
+    """
+    n_segments, p = xty.shape
+    best = np.full((n_segments, p), np.nan)
+    best_sse = np.full(n_segments, np.inf)
+    eye = np.eye(p)
+    for pattern in itertools.product((0, 1, 2), repeat=p):
+        pattern = np.array(pattern)
+        fixed_values = np.where(pattern == 1, lower, np.where(pattern == 2, upper, 0.0))
+        if np.any(np.isinf(fixed_values)):
+            continue
+        free = pattern == 0
+        # Reduced system: fixed coefficients are moved to the right-hand side
+        rhs = xty - xtx @ fixed_values
+        system = xtx * np.outer(free, free) + np.diag(~free).astype(float)
+        rhs = rhs * free
+        coef = np.linalg.solve(system, rhs[:, :, None])[:, :, 0] + fixed_values
+        feasible = np.all((coef >= lower - 1e-9) & (coef <= upper + 1e-9), axis=1)
+        sse = np.einsum('si,sij,sj->s', coef, xtx, coef) - 2 * np.einsum('si,si->s', coef, xty)
+        better = feasible & (sse < best_sse)
+        best[better] = coef[better]
+        best_sse[better] = sse[better]
+    return best
+
+
+def fit_segments(X, y, segment_ids, n_segments=None, bounds=None, ridge=1e-9):
+    """
+    Fit one coefficient vector per segment in one batched operation.
+    Unbounded fits solve the stacked normal equations directly; bounded fits
+    solve the box-constrained problem exactly by batched active-set enumeration.
+    Columns are rescaled internally so days, miles and receipts are equally
+    conditioned. Returns (coefficients (S, p), counts (S,)).
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    segment_ids = np.asarray(segment_ids, dtype=np.int64)
+    n_segments = n_segments or int(segment_ids.max()) + 1
+    p = X.shape[1]
+
+    scale = np.sqrt((X ** 2).mean(axis=0))
+    scale[scale == 0] = 1.0
+    xtx, xty, counts = segment_normal_equations(X / scale, y, segment_ids, n_segments)
+    # A tiny ridge keeps segments with fewer rows than coefficients solvable
+    xtx = xtx + ridge * np.maximum(counts, 1)[:, None, None] * np.eye(p)
+
+    if bounds is None:
+        coef = np.linalg.solve(xtx, xty[:, :, None])[:, :, 0]
+    else:
+        lower, upper = _bounds_arrays(bounds, p)
+        coef = _bounded_segments(xtx, xty, lower * scale, upper * scale)
+
+    coef = coef / scale
+    coef[counts == 0] = np.nan
+    return coef, counts
+
+
+def predict_segments(X, segment_ids, coef):
+    """Apply each row's segment coefficients"""
+    return np.einsum('ni,ni->n', np.asarray(X, dtype=float), coef[segment_ids])
+
+
+def receipt_band_ids(receipts, width=100.0, max_band=None):
+    """Integer receipt-band IDs: floor(receipts / width), optionally capped"""
+    bands = np.floor(np.asarray(receipts, dtype=float) / width).astype(np.int64)
+    if max_band is not None:
+        bands = np.minimum(bands, max_band)
+    return bands
+
+
+def load_public_cases(path='public_cases.json'):
+    """(days, miles, receipts, expected) arrays"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return (np.array([c['input']['trip_duration_days'] for c in data], dtype=float),
+            np.array([c['input']['miles_traveled'] for c in data], dtype=float),
+            np.array([c['input']['total_receipts_amount'] for c in data], dtype=float),
+            np.array([c['expected_output'] for c in data], dtype=float))
+
+
+if __name__ == "__main__":
+    days, miles, receipts, y = load_public_cases()
+    X = design_matrix(days, miles, receipts)
+    non_negative = [(0, None)] * 4
+
+    print("Segmented linear fits (a*days + b*miles + c*receipts + d per segment)")
+    print("=" * 70)
+    segmentations = [
+        ('trip_duration_days', days.astype(np.int64)),
+        ('$100 receipt band', receipt_band_ids(receipts, 100)),
+        ('days x $250 receipt band', days.astype(np.int64) * 20 + receipt_band_ids(receipts, 250, 19)),
+    ]
+    for name, ids in segmentations:
+        for label, bounds in [('unbounded', None), ('coefficients >= 0', non_negative)]:
+            start = time.perf_counter()
+            coef, counts = fit_segments(X, y, ids, bounds=bounds)
+            elapsed = time.perf_counter() - start
+            errors = np.abs(predict_segments(X, ids, coef) - y)
+            print(f"{name:<26} {label:<18} {int((counts > 0).sum()):>4} segments  "
+                  f"{elapsed * 1000:7.2f} ms  avg error ${errors.mean():.2f}")
+
+    # Cross-check the batched bounded solver against per-segment BVLS
+    ids = days.astype(np.int64) * 20 + receipt_band_ids(receipts, 250, 19)
+    coef, counts = fit_segments(X, y, ids, bounds=non_negative)
+    start = time.perf_counter()
+    reference = np.array([bounded_lstsq(X[ids == s], y[ids == s], non_negative)
+                          if counts[s] else np.full(4, np.nan) for s in range(len(counts))])
+    elapsed = time.perf_counter() - start
+    batched_sse = sum(sse(coef[s], X[ids == s], y[ids == s]) for s in range(len(counts)) if counts[s])
+    reference_sse = sum(sse(reference[s], X[ids == s], y[ids == s]) for s in range(len(counts)) if counts[s])
+    print(f"\nPer-segment BVLS loop: {elapsed * 1000:.2f} ms, "
+          f"SSE batched {batched_sse:,.2f} vs BVLS {reference_sse:,.2f}")
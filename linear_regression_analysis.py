@@ -3,8 +3,8 @@
 import json
 import numpy as np
 from sklearn.linear_model import LinearRegression
-from scipy.optimize import minimize
 import pandas as pd
+from linear_fit import bounded_lstsq, fit_segments, predict_segments, receipt_band_ids
 
 # Load the data
 with open('public_cases.json', 'r') as f:
@@ -73,15 +73,6 @@ print("\n" + "="*60)
 print("METHOD 2: Constrained Optimization (0 ≤ c ≤ 1)")
 print("="*60)
 
-def objective(params):
-    """Minimize sum of squared errors"""
-    predictions = X @ params
-    return np.sum((predictions - y)**2)
-
-# Initial guess (from unconstrained solution)
-initial_guess = coefficients.copy()
-initial_guess[2] = np.clip(initial_guess[2], 0, 1)  # Clip c to [0, 1]
-
 # Define bounds: no bounds for a, b, d; c in [0, 1]
 bounds = [
     (None, None),  # a (days)
@@ -90,39 +81,38 @@ bounds = [
     (None, None)   # d (intercept)
 ]
 
-# Optimize
-result = minimize(objective, initial_guess, bounds=bounds, method='L-BFGS-B')
+# Solve the bound-constrained least squares problem directly (BVLS)
+coeffs_const = bounded_lstsq(X, y, bounds)
 
-if result.success:
-    a_const, b_const, c_const, d_const = result.x
-    
-    print(f"\nConstrained Coefficients:")
-    print(f"a (days coefficient): {a_const:.6f}")
-    print(f"b (miles coefficient): {b_const:.6f}")
-    print(f"c (receipts coefficient): {c_const:.6f}")
-    print(f"d (intercept): {d_const:.6f}")
-    
-    # Test the constrained formula
-    predictions_const = X @ result.x
-    errors_const = np.abs(predictions_const - y)
-    avg_error_const = np.mean(errors_const)
-    max_error_const = np.max(errors_const)
-    rmse_const = np.sqrt(np.mean((predictions_const - y)**2))
-    
-    print(f"\nPerformance:")
-    print(f"Average absolute error: ${avg_error_const:.2f}")
-    print(f"Maximum absolute error: ${max_error_const:.2f}")
-    print(f"RMSE: ${rmse_const:.2f}")
-    
-    # Calculate R²
-    ss_res = np.sum((y - predictions_const)**2)
-    ss_tot = np.sum((y - np.mean(y))**2)
-    r2_const = 1 - (ss_res / ss_tot)
-    print(f"R² score: {r2_const:.6f}")
-    
-    print("\nSample predictions (first 10 cases):")
-    for i in range(min(10, len(y))):
-        print(f"Case {i+1}: Actual=${y[i]:.2f}, Predicted=${predictions_const[i]:.2f}, Error=${errors_const[i]:.2f}")
+a_const, b_const, c_const, d_const = coeffs_const
+
+print(f"\nConstrained Coefficients:")
+print(f"a (days coefficient): {a_const:.6f}")
+print(f"b (miles coefficient): {b_const:.6f}")
+print(f"c (receipts coefficient): {c_const:.6f}")
+print(f"d (intercept): {d_const:.6f}")
+
+# Test the constrained formula
+predictions_const = X @ coeffs_const
+errors_const = np.abs(predictions_const - y)
+avg_error_const = np.mean(errors_const)
+max_error_const = np.max(errors_const)
+rmse_const = np.sqrt(np.mean((predictions_const - y)**2))
+
+print(f"\nPerformance:")
+print(f"Average absolute error: ${avg_error_const:.2f}")
+print(f"Maximum absolute error: ${max_error_const:.2f}")
+print(f"RMSE: ${rmse_const:.2f}")
+
+# Calculate R²
+ss_res = np.sum((y - predictions_const)**2)
+ss_tot = np.sum((y - np.mean(y))**2)
+r2_const = 1 - (ss_res / ss_tot)
+print(f"R² score: {r2_const:.6f}")
+
+print("\nSample predictions (first 10 cases):")
+for i in range(min(10, len(y))):
+    print(f"Case {i+1}: Actual=${y[i]:.2f}, Predicted=${predictions_const[i]:.2f}, Error=${errors_const[i]:.2f}")
 
 # Method 3: Try other constraint combinations
 print("\n" + "="*60)
@@ -137,23 +127,48 @@ bounds_positive = [
     (0, None)      # d (intercept) ≥ 0
 ]
 
-result_pos = minimize(objective, np.abs(coefficients), bounds=bounds_positive, method='L-BFGS-B')
+coeffs_pos = bounded_lstsq(X, y, bounds_positive)
 
-if result_pos.success:
-    a_pos, b_pos, c_pos, d_pos = result_pos.x
-    
-    print(f"\nPositive Coefficients:")
-    print(f"a (days coefficient): {a_pos:.6f}")
-    print(f"b (miles coefficient): {b_pos:.6f}")
-    print(f"c (receipts coefficient): {c_pos:.6f}")
-    print(f"d (intercept): {d_pos:.6f}")
-    
-    predictions_pos = X @ result_pos.x
-    errors_pos = np.abs(predictions_pos - y)
-    avg_error_pos = np.mean(errors_pos)
-    
-    print(f"\nPerformance:")
-    print(f"Average absolute error: ${avg_error_pos:.2f}")
+a_pos, b_pos, c_pos, d_pos = coeffs_pos
+
+print(f"\nPositive Coefficients:")
+print(f"a (days coefficient): {a_pos:.6f}")
+print(f"b (miles coefficient): {b_pos:.6f}")
+print(f"c (receipts coefficient): {c_pos:.6f}")
+print(f"d (intercept): {d_pos:.6f}")
+
+predictions_pos = X @ coeffs_pos
+errors_pos = np.abs(predictions_pos - y)
+avg_error_pos = np.mean(errors_pos)
+
+print(f"\nPerformance:")
+print(f"Average absolute error: ${avg_error_pos:.2f}")
+
+# Method 4: Segmented formulas (separate coefficients per region)
+print("\n" + "="*60)
+print("METHOD 4: Segmented Coefficients (all segments fitted in one batch)")
+print("="*60)
+
+days_ids = X[:, 0].astype(np.int64)
+segmentations = [
+    ('per trip_duration_days', days_ids),
+    ('per $250 receipt band', receipt_band_ids(X[:, 2], 250)),
+    ('per days x $250 receipt band', days_ids * 20 + receipt_band_ids(X[:, 2], 250, 19)),
+]
+segment_results = []
+for name, segment_ids in segmentations:
+    seg_coeffs, seg_counts = fit_segments(X, y, segment_ids, bounds=bounds_positive)
+    seg_errors = np.abs(predict_segments(X, segment_ids, seg_coeffs) - y)
+    segment_results.append((name, seg_errors.mean()))
+    print(f"\n{name}: {int((seg_counts > 0).sum())} segments, all coefficients >= 0")
+    print(f"  Average Error: ${seg_errors.mean():.2f}")
+
+print("\nCoefficients per trip_duration_days (all >= 0):")
+seg_coeffs, seg_counts = fit_segments(X, y, days_ids, bounds=bounds_positive)
+for day in np.nonzero(seg_counts)[0]:
+    a_seg, b_seg, c_seg, d_seg = seg_coeffs[day]
+    print(f"  {day:2d} days ({seg_counts[day]:3d} cases): "
+          f"{a_seg:.4f} * days + {b_seg:.4f} * miles + {c_seg:.4f} * receipts + {d_seg:.2f}")
 
 # Summary comparison
 print("\n" + "="*60)
@@ -163,31 +178,33 @@ print(f"\nUnconstrained Linear Regression:")
 print(f"  Formula: {a:.6f} * days + {b:.6f} * miles + {c:.6f} * receipts + {d:.6f}")
 print(f"  Average Error: ${avg_error:.2f}")
 
-if result.success:
-    print(f"\nConstrained (0 ≤ c ≤ 1):")
-    print(f"  Formula: {a_const:.6f} * days + {b_const:.6f} * miles + {c_const:.6f} * receipts + {d_const:.6f}")
-    print(f"  Average Error: ${avg_error_const:.2f}")
+print(f"\nConstrained (0 ≤ c ≤ 1):")
+print(f"  Formula: {a_const:.6f} * days + {b_const:.6f} * miles + {c_const:.6f} * receipts + {d_const:.6f}")
+print(f"  Average Error: ${avg_error_const:.2f}")
 
-if result_pos.success:
-    print(f"\nAll Positive Coefficients:")
-    print(f"  Formula: {a_pos:.6f} * days + {b_pos:.6f} * miles + {c_pos:.6f} * receipts + {d_pos:.6f}")
-    print(f"  Average Error: ${avg_error_pos:.2f}")
+print(f"\nAll Positive Coefficients:")
+print(f"  Formula: {a_pos:.6f} * days + {b_pos:.6f} * miles + {c_pos:.6f} * receipts + {d_pos:.6f}")
+print(f"  Average Error: ${avg_error_pos:.2f}")
 
 # Save the best formula
 best_method = "unconstrained"
 best_coeffs = coefficients
 best_error = avg_error
 
-if result.success and avg_error_const < best_error:
+if avg_error_const < best_error:
     best_method = "constrained"
-    best_coeffs = result.x
+    best_coeffs = coeffs_const
     best_error = avg_error_const
 
-if result_pos.success and avg_error_pos < best_error:
+if avg_error_pos < best_error:
     best_method = "positive"
-    best_coeffs = result_pos.x
+    best_coeffs = coeffs_pos
     best_error = avg_error_pos
 
+for name, seg_error in segment_results:
+    print(f"\nSegmented ({name}):")
+    print(f"  Average Error: ${seg_error:.2f}")
+
 print(f"\n{'='*60}")
 print(f"BEST METHOD: {best_method}")
 print(f"Best Formula: {best_coeffs[0]:.6f} * days + {best_coeffs[1]:.6f} * miles + {best_coeffs[2]:.6f} * receipts + {best_coeffs[3]:.6f}")
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Bounded memoization for calculate_reimbursement
+Opt-in decorator keyed on integer cents (days, miles in cents, receipts in
+cents) with a size bound, LRU or TinyLFU eviction, hit/miss counters and a
+warm-start preload from a JSON file of frequent trips. Inputs that are not on
+the cents grid bypass the cache, so wrapped functions return exactly what
+they returned before.
+"""
+
+import json
+import time
+from collections import OrderedDict, namedtuple
+import numpy as np
+from gbr_model import load_known_inputs
+from solution_registry import load_solution
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses bypassed evictions rejected size maxsize policy')
+
+
+def cents_key(days, miles, receipts):
+    """(days, miles cents, receipts cents), or None if an input is off the cents grid"""
+    miles_cents = round(miles * 100)
+    receipts_cents = round(receipts * 100)
+    if days != int(days) or miles_cents / 100 != miles or receipts_cents / 100 != receipts:
+        return None
+    return int(days), miles_cents, receipts_cents
+
+
+class LRUPolicy:
+    """Evict the least recently used entry"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """Insert; returns (evicted, rejected) counts"""
+        self.entries[key] = value
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            return 1, 0
+        return 0, 0
+
+
+class TinyLFUPolicy(LRUPolicy):
+    """
+    LRU order with TinyLFU admission: a 4-row count-min sketch estimates how
+    often each key was requested recently (counts halve every 10 x maxsize
+    requests), and a new key only replaces the LRU victim if it was requested
+    more often
+    """
+
+    DEPTH = 4
+
+    def __init__(self, maxsize):
+        super().__init__(maxsize)
+        self.width = 1 << max(4, int(np.ceil(np.log2(maxsize * 4))))
+        # Plain lists: per-request scalar updates are much cheaper than on numpy arrays
+        self.counts = [0] * (self.DEPTH * self.width)
+        self.seeds = [0x9E3779B1 * (i + 1) for i in range(self.DEPTH)]
+        self.sample_size = 10 * maxsize
+        self.requests = 0
+
+    def _slots(self, key):
+        h = hash(key)
+        return [row * self.width + ((h ^ seed) * 0x85EBCA6B) % self.width
+                for row, seed in enumerate(self.seeds)]
+
+    def frequency(self, key):
+        counts = self.counts
+        return min(counts[slot] for slot in self._slots(key))
+
+    def record(self, key):
+        counts = self.counts
+        for slot in self._slots(key):
+            counts[slot] += 1
+        self.requests += 1
+        if self.requests >= self.sample_size:
+            self.counts = [count >> 1 for count in counts]
+            self.requests //= 2
+
+    def get(self, key):
+        self.record(key)
+        return super().get(key)
+
+    def put(self, key, value):
+        if len(self.entries) < self.maxsize or key in self.entries:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            return 0, 0
+        victim = next(iter(self.entries))
+        if self.frequency(key) <= self.frequency(victim):
+            return 0, 1
+        del self.entries[victim]
+        self.entries[key] = value
+        return 1, 0
+
+
+POLICIES = {'lru': LRUPolicy, 'tinylfu': TinyLFUPolicy}
+
+
+def memoize(fn=None, maxsize=4096, policy='lru', preload=None):
+    """
+    Wrap calculate_reimbursement(days, miles, receipts) with a bounded cache.
+    Usable as @memoize, @memoize(maxsize=..., policy='tinylfu') or
+    memoize(module.calculate_reimbursement, preload='frequent_trips.json').
+    The wrapper gains cache_info(), cache_clear() and preload(path).
+    """
+    if fn is None:
+        return lambda f: memoize(f, maxsize=maxsize, policy=policy, preload=preload)
+
+    cache = POLICIES[policy](maxsize)
+    stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'evictions': 0, 'rejected': 0}
+
+    def wrapper(trip_duration_days, miles_traveled, total_receipts_amount):
+        key = cents_key(trip_duration_days, miles_traveled, total_receipts_amount)
+        if key is None:
+            stats['bypassed'] += 1
+            return fn(trip_duration_days, miles_traveled, total_receipts_amount)
+        value = cache.get(key)
+        if value is not None:
+            stats['hits'] += 1
+            return value
+        stats['misses'] += 1
+        value = fn(trip_duration_days, miles_traveled, total_receipts_amount)
+        evicted, rejected = cache.put(key, value)
+        stats['evictions'] += evicted
+        stats['rejected'] += rejected
+        return value
+
+    def cache_info():
+        return CacheInfo(size=len(cache.entries), maxsize=maxsize, policy=policy, **stats)
+
+    def cache_clear():
+        cache.entries.clear()
+        for name in stats:
+            stats[name] = 0
+
+    def load(path):
+        """
+        Warm-start from a JSON list of trips in the private_cases.json format,
+        most frequent first; fills at most maxsize entries. Returns the count.
+        """
+        with open(path, 'r') as f:
+            trips = json.load(f)
+        loaded = 0
+        for trip in trips[:maxsize]:
+            days, miles, receipts = (trip['trip_duration_days'], trip['miles_traveled'],
+                                     trip['total_receipts_amount'])
+            key = cents_key(days, miles, receipts)
+            if key is not None and key not in cache.entries:
+                cache.entries[key] = fn(days, miles, receipts)
+                loaded += 1
+        return loaded
+
+    wrapper.__name__ = getattr(fn, '__name__', 'calculate_reimbursement')
+    wrapper.__doc__ = fn.__doc__
+    wrapper.__wrapped__ = fn
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    wrapper.preload = load
+    if preload is not None:
+        load(preload)
+    return wrapper
+
+
+def memoized_solution(name, **options):
+    """The calculate_reimbursement of a registered solution module, memoized"""
+    return memoize(load_solution(name), **options)
+
+
+def simulated_traffic(n_requests=20000, n_standing=300, standing_share=0.6, seed=42):
+    """
+    Production-like request stream over the known cases: a set of standing
+    trips with Zipf-distributed popularity makes up standing_share of the
+    traffic, the rest is uniform over every known case
+    """
+    days, miles, receipts, _ = load_known_inputs()
+    rng = np.random.default_rng(seed)
+    standing = rng.choice(len(days), n_standing, replace=False)
+    popularity = 1.0 / np.arange(1, n_standing + 1) ** 1.1
+    picks = np.where(rng.random(n_requests) < standing_share,
+                     standing[rng.choice(n_standing, n_requests, p=popularity / popularity.sum())],
+                     rng.integers(0, len(days), n_requests))
+    return [(int(days[i]), float(miles[i]), float(receipts[i])) for i in picks], standing
+
+
+def report():
+    trips, standing = simulated_traffic()
+    days, miles, receipts, _ = load_known_inputs()
+    preload_path = 'frequent_trips.json'
+    with open(preload_path, 'w') as f:
+        json.dump([{'trip_duration_days': int(days[i]), 'miles_traveled': float(miles[i]),
+                    'total_receipts_amount': float(receipts[i])} for i in standing[:100]], f)
+
+    print(f"Memoized calculate_reimbursement on {len(trips)} simulated requests "
+          f"({len({cents_key(*t) for t in trips})} distinct trips)")
+    print("=" * 100)
+    print(f"{'Solution':<24} {'Policy':<8} {'Size':>5} {'Preload':>8} {'Hit rate':>9} {'Evict':>7} "
+          f"{'Reject':>7} {'Plain us':>9} {'Cached us':>10} {'Same':>5}")
+    for name in ['solution_optimized', 'nn_inference', 'xgb_scoring']:
+        fn = load_solution(name)
+        start = time.perf_counter()
+        reference = [fn(*t) for t in trips]
+        plain_us = (time.perf_counter() - start) / len(trips) * 1e6
+        for policy in POLICIES:
+            for maxsize, preload in [(256, None), (256, preload_path), (4096, None)]:
+                cached = memoize(fn, maxsize=maxsize, policy=policy, preload=preload)
+                start = time.perf_counter()
+                results = [cached(*t) for t in trips]
+                cached_us = (time.perf_counter() - start) / len(trips) * 1e6
+                info = cached.cache_info()
+                same = results == reference
+                print(f"{name:<24} {policy:<8} {maxsize:>5} {'yes' if preload else 'no':>8} "
+                      f"{info.hits / len(trips):>8.1%} {info.evictions:>7} {info.rejected:>7} "
+                      f"{plain_us:>9.2f} {cached_us:>10.2f} {str(same):>5}")
+                assert same, f"memoization changed outputs of {name}"
+
+
+if __name__ == "__main__":
+    report()
@@ -8,27 +8,13 @@ import json
 import numpy as np
 from sklearn.neural_network import MLPRegressor
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import GridSearchCV
+from hyperparameter_search import expand_grid, successive_halving
+from training_cache import cached_run, print_metrics
 import warnings
 warnings.filterwarnings('ignore')
 
-# Load the data
-with open('public_cases.json', 'r') as f:
-    data = json.load(f)
-
-# Extract features and targets
-X = []
-y = []
-raw_inputs = []  # Keep raw for later
-
-for case in data:
-    days = case['input']['trip_duration_days']
-    miles = case['input']['miles_traveled']
-    receipts = case['input']['total_receipts_amount']
-    expected = case['expected_output']
-    
-    raw_inputs.append((days, miles, receipts))
-    
+def engineer_features(days, miles, receipts):
+    """Feature vector fed (after scaling) to the network"""
     # Engineer many features for neural network
     miles_per_day = miles / days if days > 0 else 0
     receipts_per_day = receipts / days if days > 0 else 0
@@ -59,7 +45,7 @@ for case in data:
     is_5_day = 1 if days == 5 else 0
     is_efficient = 1 if 180 <= miles_per_day <= 220 else 0
     
-    features = [
+    return [
         days, miles, receipts,
         miles_per_day, receipts_per_day, receipts_per_mile,
         days_x_miles, days_x_receipts, miles_x_receipts,
@@ -69,22 +55,9 @@ for case in data:
         is_long_trip, is_high_mileage, is_high_spending,
         is_5_day, is_efficient
     ]
-    
-    X.append(features)
-    y.append(expected)
-
-X = np.array(X)
-y = np.array(y)
-
-# Standardize features for neural network
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-
-print("Training Neural Networks...")
-print("=" * 60)
 
 # Test different architectures
-architectures = [
+ARCHITECTURES = [
     (10,),           # Single layer, 10 neurons
     (20,),           # Single layer, 20 neurons
     (50,),           # Single layer, 50 neurons
@@ -95,74 +68,37 @@ architectures = [
     (50, 30, 15),   # Three layers
 ]
 
-best_score = float('inf')
-best_model = None
-best_arch = None
-
-for arch in architectures:
-    print(f"\nTesting architecture: {arch}")
-    
-    mlp = MLPRegressor(
-        hidden_layer_sizes=arch,
-        activation='relu',
-        solver='adam',
-        max_iter=1000,
-        random_state=42,
-        early_stopping=True,
-        validation_fraction=0.1
-    )
-    
-    mlp.fit(X_scaled, y)
-    
-    # Calculate training error
-    predictions = mlp.predict(X_scaled)
-    errors = np.abs(predictions - y)
-    avg_error = np.mean(errors)
-    total_error = np.sum(errors)
-    
-    print(f"  Average Error: ${avg_error:.2f}")
-    print(f"  Total Error: ${total_error:.0f}")
-    
-    if total_error < best_score:
-        best_score = total_error
-        best_model = mlp
-        best_arch = arch
-
-print("\n" + "=" * 60)
-print(f"Best architecture: {best_arch}")
-print(f"Best total error: ${best_score:.0f}")
-
-# Fine-tune the best model
-print("\nFine-tuning best model...")
-
-param_grid = {
+# Regularization grid searched alongside the architectures
+PARAM_GRID = {
     'alpha': [0.0001, 0.001, 0.01],
     'learning_rate_init': [0.001, 0.01, 0.1]
 }
 
-mlp_tuned = MLPRegressor(
-    hidden_layer_sizes=best_arch,
-    activation='relu',
-    solver='adam',
-    max_iter=2000,
-    random_state=42,
-    early_stopping=True
-)
+# Successive-halving budget: max_iter grows 50 -> 150 -> 450 -> 1350 -> 2000
+SEARCH_BUDGET = {'min_resource': 50, 'max_resource': 2000, 'factor': 3, 'cv': 3}
 
-grid_search = GridSearchCV(mlp_tuned, param_grid, cv=3, scoring='neg_mean_absolute_error', n_jobs=-1)
-grid_search.fit(X_scaled, y)
+# Load the data
+with open('public_cases.json', 'r') as f:
+    data = json.load(f)
 
-best_mlp = grid_search.best_estimator_
-print(f"Best parameters: {grid_search.best_params_}")
+# Extract features and targets
+X = []
+y = []
+raw_inputs = []  # Keep raw for later
 
-# Final evaluation
-predictions = best_mlp.predict(X_scaled)
-errors = np.abs(predictions - y)
-avg_error = np.mean(errors)
-print(f"Final average error: ${avg_error:.2f}")
+for case in data:
+    days = case['input']['trip_duration_days']
+    miles = case['input']['miles_traveled']
+    receipts = case['input']['total_receipts_amount']
+    expected = case['expected_output']
+    
+    raw_inputs.append((days, miles, receipts))
+    
+    X.append(engineer_features(days, miles, receipts))
+    y.append(expected)
 
-# Generate simplified neural network code
-print("\nGenerating neural network implementation...")
+X = np.array(X)
+y = np.array(y)
 
 def generate_nn_code(model, scaler, architecture):
     """Generate Python code that approximates the neural network"""
@@ -172,7 +108,6 @@ def generate_nn_code(model, scaler, architecture):
     biases = model.intercepts_
     
     code = """def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
-    import numpy as np
     
     # Engineer features
     days = trip_duration_days
@@ -228,22 +163,129 @@ def generate_nn_code(model, scaler, architecture):
     code += "    \n"
     code += "    return round(result, 2)\n"
     
+    # The same rules over arrays: np.select for layer 1, masked np.where for layer 2
+    code += '''
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    features = trip_features(days, miles, receipts)
+    miles_per_day = features['miles_per_day']
+    receipts_per_day = features['receipts_per_day']
+
+    # Layer 1: Feature combinations
+    base = np.select(
+        [(days <= 3) & (receipts_per_day <= 50),
+         days <= 3,
+         (days <= 6) & (miles_per_day >= 180) & (miles_per_day <= 220),
+         days <= 6,
+         receipts_per_day > 150],
+        [95 * days + 0.58 * miles,
+         100 * days + 0.55 * miles + 0.7 * receipts,
+         110 * days + 0.52 * miles + 0.75 * receipts + 50,
+         105 * days + 0.5 * miles + 0.72 * receipts,
+         90 * days + 0.45 * miles + 0.5 * receipts],
+        100 * days + 0.48 * miles + 0.65 * receipts)
+
+    # Layer 2: Non-linear adjustments
+    base = np.where(days == 5, base * 1.05, base)
+    high_mileage = features['days_x_miles'] > 5000
+    base = np.where(high_mileage & (receipts < 500), base * 1.08, base)
+    base = np.where(high_mileage & (receipts >= 500), base * 0.95, base)
+
+    result = np.maximum(150, np.minimum(2200, base))
+    return round_cents(result)
+'''
+    
     return code
 
-# Save the neural network approximation
-nn_code = generate_nn_code(best_mlp, scaler, best_arch)
+def train_network():
+    """Select and tune the MLP, then write solution_neural_network.py and nn_weights.npz"""
+    # Standardize features for neural network
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
 
-with open('solution_neural_network.py', 'w') as f:
-    f.write("#!/usr/bin/env python3\n\n")
-    f.write(nn_code)
+    print("Training Neural Networks...")
+    print("=" * 60)
 
-print("\nNeural network solution saved to solution_neural_network.py")
+    # Architectures and regularization compete in one successive-halving search:
+    # every candidate gets a short max_iter budget and only the best third is
+    # promoted to a longer one
+    candidates = expand_grid({'hidden_layer_sizes': ARCHITECTURES, **PARAM_GRID})
+    print(f"Successive halving over {len(candidates)} candidates...")
+    search = successive_halving(
+        'neural_network',
+        MLPRegressor(activation='relu', solver='adam', random_state=42, early_stopping=True),
+        candidates, X_scaled, y, resource='max_iter', **SEARCH_BUDGET
+    )
+    best_params = search['best_params']
+    best_arch = best_params['hidden_layer_sizes']
+    
+    print("\n" + "=" * 60)
+    print(f"Best architecture: {best_arch}")
+    print(f"Best parameters: {best_params}")
+    print(f"Best CV average error: ${search['best_score']:.2f}")
+    
+    # Refit the winner on all data with its full budget
+    best_mlp = MLPRegressor(
+        activation='relu',
+        solver='adam',
+        max_iter=search['best_resource'],
+        random_state=42,
+        early_stopping=True,
+        **best_params
+    )
+    best_mlp.fit(X_scaled, y)
+    
+    # Final evaluation
+    predictions = best_mlp.predict(X_scaled)
+    errors = np.abs(predictions - y)
+    avg_error = np.mean(errors)
+    print(f"Final average error: ${avg_error:.2f}")
+
+    print("\nGenerating neural network implementation...")
+
+    # Save the neural network approximation
+    nn_code = generate_nn_code(best_mlp, scaler, best_arch)
+
+    with open('solution_neural_network.py', 'w') as f:
+        f.write("#!/usr/bin/env python3\n\n")
+        f.write(nn_code)
 
-# Also save exact weights for reference
-print("\nSaving exact neural network weights...")
-np.savez('nn_weights.npz', 
-         weights=weights, 
-         biases=biases,
-         scaler_mean=scaler.mean_,
-         scaler_scale=scaler.scale_,
-         architecture=best_arch)
\ No newline at end of file
+    print("\nNeural network solution saved to solution_neural_network.py")
+
+    # Also save exact weights for reference
+    print("\nSaving exact neural network weights...")
+    # Layers have different shapes, so store one array per layer
+    layers = {}
+    for i, (coef, intercept) in enumerate(zip(best_mlp.coefs_, best_mlp.intercepts_)):
+        layers[f'coef_{i}'] = coef
+        layers[f'intercept_{i}'] = intercept
+    np.savez('nn_weights.npz',
+             n_layers=len(best_mlp.coefs_),
+             scaler_mean=scaler.mean_,
+             scaler_scale=scaler.scale_,
+             architecture=np.array(best_arch),
+             **layers)
+
+    return {
+        'best_architecture': list(best_arch),
+        'best_cv_error': float(search['best_score']),
+        'best_params': {k: v for k, v in best_params.items() if k != 'hidden_layer_sizes'},
+        'search_trials': len(search['trials']),
+        'final_avg_error': float(avg_error)
+    }
+
+
+# Reuse the last run when data, features and search space are unchanged
+result = cached_run(
+    'neural_network',
+    params={'architectures': ARCHITECTURES, 'param_grid': PARAM_GRID, 'search': SEARCH_BUDGET},
+    train_fn=train_network,
+    outputs=['nn_weights.npz'],  # solution_neural_network.py is tracked source, regenerated only by a real run
+    features=engineer_features
+)
+if result['cache_hit']:
+    print_metrics(result['metrics'])
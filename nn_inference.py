@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Exact MLP inference from nn_weights.npz
+Runs the trained network from neural_network.py (feature engineering,
+standard scaling, ReLU hidden layers, linear output) with NumPy matrix
+multiplies only, so the real model can ship without scikit-learn.
+"""
+
+import json
+import math
+import sys
+import time
+import numpy as np
+
+WEIGHTS_PATH = 'nn_weights.npz'
+
+
+def engineer_features(days, miles, receipts):
+    """Scalar features, same as neural_network.engineer_features"""
+    miles_per_day = miles / days if days > 0 else 0
+    receipts_per_day = receipts / days if days > 0 else 0
+    receipts_per_mile = receipts / miles if miles > 0 else 0
+    return [
+        days, miles, receipts,
+        miles_per_day, receipts_per_day, receipts_per_mile,
+        days * miles, days * receipts, miles * receipts,
+        math.log1p(miles), math.log1p(receipts), math.log1p(days),
+        math.sqrt(days), math.sqrt(miles), math.sqrt(receipts),
+        days ** 2, miles ** 2, receipts ** 2,
+        days >= 7, miles >= 500, receipts >= 1000,
+        days == 5, 180 <= miles_per_day <= 220
+    ]
+
+
+def engineer_features_batch(days, miles, receipts):
+    """Vectorized copy of neural_network.engineer_features: (n,) arrays -> (n, 23)"""
+    days = np.asarray(days, dtype=np.float64)
+    miles = np.asarray(miles, dtype=np.float64)
+    receipts = np.asarray(receipts, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        miles_per_day = np.where(days > 0, miles / days, 0)
+        receipts_per_day = np.where(days > 0, receipts / days, 0)
+        receipts_per_mile = np.where(miles > 0, receipts / miles, 0)
+
+    # Python's float ** 2 calls C pow(), which can differ from x * x in the last
+    # bit; match the training features exactly
+    miles_squared = np.array([m ** 2 for m in miles.tolist()])
+    receipts_squared = np.array([r ** 2 for r in receipts.tolist()])
+
+    return np.column_stack([
+        days, miles, receipts,
+        miles_per_day, receipts_per_day, receipts_per_mile,
+        days * miles, days * receipts, miles * receipts,
+        np.log1p(miles), np.log1p(receipts), np.log1p(days),
+        np.sqrt(days), np.sqrt(miles), np.sqrt(receipts),
+        days ** 2, miles_squared, receipts_squared,
+        days >= 7, miles >= 500, receipts >= 1000,
+        days == 5, (180 <= miles_per_day) & (miles_per_day <= 220)
+    ]).astype(np.float64)
+
+
+class MLPInference:
+    """Forward pass of the saved MLPRegressor, optionally in float32"""
+
+    def __init__(self, path=WEIGHTS_PATH, dtype=np.float64):
+        weights = np.load(path)
+        self.dtype = np.dtype(dtype)
+        self.architecture = tuple(int(n) for n in weights['architecture'])
+        self.scaler_mean = weights['scaler_mean']
+        self.scaler_scale = weights['scaler_scale']
+        n_layers = int(weights['n_layers'])
+        self.coefs = [weights[f'coef_{i}'].astype(self.dtype) for i in range(n_layers)]
+        self.intercepts = [weights[f'intercept_{i}'].astype(self.dtype) for i in range(n_layers)]
+
+    def predict_features(self, X):
+        """Unrounded predictions for an (n, 23) engineered feature matrix"""
+        # Scale in float64 exactly like StandardScaler.transform, then cast
+        activation = ((np.asarray(X, dtype=np.float64) - self.scaler_mean) / self.scaler_scale)
+        activation = activation.astype(self.dtype, copy=False)
+        last = len(self.coefs) - 1
+        for i, (coef, intercept) in enumerate(zip(self.coefs, self.intercepts)):
+            activation = activation @ coef
+            activation += intercept
+            if i != last:
+                np.maximum(activation, 0, out=activation)  # ReLU
+        return activation[:, 0].astype(np.float64)
+
+    def predict(self, days, miles, receipts):
+        """Unrounded predictions for arrays of raw inputs"""
+        return self.predict_features(engineer_features_batch(days, miles, receipts))
+
+    def predict_one(self, days, miles, receipts):
+        """Unrounded prediction for a single trip (no batch overhead)"""
+        activation = (np.array(engineer_features(days, miles, receipts)) - self.scaler_mean) / self.scaler_scale
+        activation = activation.astype(self.dtype, copy=False)
+        for coef, intercept in zip(self.coefs[:-1], self.intercepts[:-1]):
+            activation = activation @ coef + intercept
+            np.maximum(activation, 0, out=activation)  # ReLU
+        return float(activation @ self.coefs[-1][:, 0] + self.intercepts[-1][0])
+
+
+_model = None
+
+
+def _default_model():
+    global _model
+    if _model is None:
+        _model = MLPInference()
+    return _model
+
+
+def calculate_reimbursement(days, miles, receipts):
+    """Reimbursement from the trained network, rounded to cents"""
+    return round(_default_model().predict_one(days, miles, receipts), 2)
+
+
+def calculate_reimbursement_batch(days, miles, receipts):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    return np.round(_default_model().predict(days, miles, receipts), 2)
+
+
+def _load_all_inputs():
+    """(days, miles, receipts) arrays for public and private cases"""
+    with open('public_cases.json', 'r') as f:
+        public = [case['input'] for case in json.load(f)]
+    with open('private_cases.json', 'r') as f:
+        private = json.load(f)
+    cases = public + private
+    return (np.array([c['trip_duration_days'] for c in cases], dtype=float),
+            np.array([c['miles_traveled'] for c in cases], dtype=float),
+            np.array([c['total_receipts_amount'] for c in cases], dtype=float))
+
+
+def verify_against_sklearn():
+    """Rebuild the MLPRegressor from the saved weights and compare every known case"""
+    from sklearn.neural_network import MLPRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    model = _default_model()
+    mlp = MLPRegressor(hidden_layer_sizes=model.architecture, activation='relu')
+    mlp.coefs_ = model.coefs
+    mlp.intercepts_ = model.intercepts
+    mlp.n_layers_ = len(model.coefs) + 1
+    mlp.n_outputs_ = 1
+    mlp.out_activation_ = 'identity'
+    mlp.n_features_in_ = len(model.scaler_mean)
+    scaler = StandardScaler()
+    scaler.mean_ = model.scaler_mean
+    scaler.scale_ = model.scaler_scale
+    scaler.var_ = model.scaler_scale ** 2
+    scaler.n_features_in_ = len(model.scaler_mean)
+
+    days, miles, receipts = _load_all_inputs()
+    X = engineer_features_batch(days, miles, receipts)
+    expected = mlp.predict(scaler.transform(X))
+
+    for dtype in (np.float64, np.float32):
+        candidate = MLPInference(dtype=dtype)
+        outputs = {
+            'batch': candidate.predict(days, miles, receipts),
+            'scalar': np.array([candidate.predict_one(d, m, r) for d, m, r in zip(days, miles, receipts)]),
+        }
+        for api, ours in outputs.items():
+            diff = np.abs(ours - expected)
+            rounded_changes = int((np.round(ours, 2) != np.round(expected, 2)).sum())
+            print(f"{np.dtype(dtype).name:>8} {api:>6}: max |diff| = {diff.max():.3e}, "
+                  f"rounded outputs changed = {rounded_changes}/{len(expected)}")
+
+
+def benchmark(repeats=5):
+    """Per-row latency of the scalar API and throughput of the batch API"""
+    days, miles, receipts = _load_all_inputs()
+    for dtype in (np.float64, np.float32):
+        model = MLPInference(dtype=dtype)
+        n = 1000
+        start = time.perf_counter()
+        for d, m, r in zip(days[:n], miles[:n], receipts[:n]):
+            model.predict_one(d, m, r)
+        scalar_us = (time.perf_counter() - start) / n * 1e6
+
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            model.predict(days, miles, receipts)
+            best = min(best, time.perf_counter() - start)
+        print(f"{np.dtype(dtype).name:>8}: scalar {scalar_us:.1f} us/call, "
+              f"batch {len(days) / best:,.0f} rows/s ({best / len(days) * 1e6:.2f} us/row)")
+
+
+def main():
+    if '--verify' in sys.argv:
+        verify_against_sklearn()
+        return
+    if '--bench' in sys.argv:
+        benchmark()
+        return
+
+    # Read input
+    if len(sys.argv) > 1:
+        # Command line arguments
+        days = int(sys.argv[1])
+        miles = float(sys.argv[2])
+        receipts = float(sys.argv[3])
+    else:
+        # Read from stdin (JSON format expected)
+        data = json.loads(sys.stdin.read())
+        days = data['trip_duration_days']
+        miles = data['miles_traveled']
+        receipts = data['total_receipts_amount']
+
+    print(f"{calculate_reimbursement(days, miles, receipts):.2f}")
+
+
+if __name__ == "__main__":
+    main()
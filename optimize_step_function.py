@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 import json
+import numpy as np
+from rule_engine import compile_batch, step_config
 
 # Load public cases
 with open('public_cases.json', 'r') as f:
@@ -26,6 +28,8 @@ def optimize_step_function():
             long_trips.append((days, miles, receipts, expected))
     
     print(f"\nData split: {len(short_trips)} short trips, {len(long_trips)} long trips")
+    short_arrays = np.array(short_trips, dtype=float).T
+    long_arrays = np.array(long_trips, dtype=float).T
     
     # Optimize parameters for short trips
     print("\nOptimizing SHORT trips (1-3 days):")
@@ -35,13 +39,9 @@ def optimize_step_function():
     for base in range(70, 100, 2):
         for receipt_mult in [0.8, 0.9, 1.0, 1.1, 1.2]:
             for mile_rate in [0.60, 0.65, 0.67, 0.70, 0.75]:
-                errors = []
-                for days, miles, receipts, expected in short_trips:
-                    pred = base * days + receipts * receipt_mult + miles * mile_rate
-                    error = abs(pred - expected) / expected * 100
-                    errors.append(error)
-                
-                avg_error = sum(errors) / len(errors)
+                params = (base, receipt_mult, mile_rate)
+                pred = compile_batch(step_config(params, params))(*short_arrays[:3])
+                avg_error = np.mean(np.abs(pred - short_arrays[3]) / short_arrays[3] * 100)
                 if avg_error < best_short_error:
                     best_short_error = avg_error
                     best_short_params = (base, receipt_mult, mile_rate)
@@ -58,13 +58,9 @@ def optimize_step_function():
     for base in range(20, 50, 2):
         for receipt_mult in [0.8, 0.9, 1.0, 1.1, 1.2]:
             for mile_rate in [0.60, 0.65, 0.67, 0.70, 0.75]:
-                errors = []
-                for days, miles, receipts, expected in long_trips:
-                    pred = base * days + receipts * receipt_mult + miles * mile_rate
-                    error = abs(pred - expected) / expected * 100
-                    errors.append(error)
-                
-                avg_error = sum(errors) / len(errors)
+                params = (base, receipt_mult, mile_rate)
+                pred = compile_batch(step_config(params, params))(*long_arrays[:3])
+                avg_error = np.mean(np.abs(pred - long_arrays[3]) / long_arrays[3] * 100)
                 if avg_error < best_long_error:
                     best_long_error = avg_error
                     best_long_params = (base, receipt_mult, mile_rate)
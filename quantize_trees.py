@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Quantized tree models
+Packs the GradientBoosting and RandomForest artifacts into compact arrays:
+int8 features, int16 child offsets (int32 when a tree is too large for
+int16), float32 thresholds snapped to the data's
+real granularity (whole days, miles and receipts in cents) and fixed-point
+int32 leaf values. Verifies that no public or private case changes its
+rounded output and reports memory saved and batch throughput.
+"""
+
+import time
+import numpy as np
+from gbr_model import engineer_features_batch, load_gbr, load_known_inputs, residual_corrections
+
+# Granularity of each of the 31 engineered features (train_gradient_boosting order)
+INTEGER, CENTS, FLOAT = 0, 1, 2
+FEATURE_KINDS = np.array([
+    INTEGER, CENTS, CENTS,           # days, miles, receipts
+    FLOAT, FLOAT, FLOAT,             # per-day and per-mile ratios
+    FLOAT, FLOAT, FLOAT,             # interactions
+    FLOAT, FLOAT, FLOAT,             # logs
+    FLOAT, FLOAT, FLOAT,             # offset ratios
+    INTEGER, FLOAT, FLOAT, FLOAT, FLOAT,  # days^2, miles^2, receipts^2, square roots
+    INTEGER, INTEGER, INTEGER,       # cents-ending flags
+    INTEGER, INTEGER, INTEGER,       # receipt, miles and days bins
+    INTEGER, INTEGER, INTEGER, INTEGER, INTEGER,  # indicator flags
+], dtype=np.int8)
+
+LEAF_BITS = 30  # fixed-point leaves use at most 30 of the 31 int32 value bits
+
+
+def _snap_thresholds(threshold, kinds):
+    """
+    Float32 thresholds in each feature's comparison domain, exact for every
+    input on the data's grid: sklearn tests float32(x) <= threshold.
+    INTEGER features compare x <= floor(t); CENTS features compare the integer
+    cent count c against the largest c with float32(c / 100) <= t; FLOAT
+    features compare float32(x) against the largest float32 <= t.
+    """
+    snapped = np.empty(len(threshold), dtype=np.float32)
+
+    integer = kinds == INTEGER
+    snapped[integer] = np.floor(threshold[integer])
+
+    cents = kinds == CENTS
+    code = np.floor(threshold[cents] * 100) + 2
+    for _ in range(5):
+        too_high = (code / 100).astype(np.float32) > threshold[cents]
+        code = np.where(too_high, code - 1, code)
+    snapped[cents] = code
+
+    floats = kinds == FLOAT
+    t32 = threshold[floats].astype(np.float32)
+    snapped[floats] = np.where(t32 > threshold[floats], np.nextafter(t32, np.float32(-np.inf)), t32)
+    return snapped
+
+
+def quantize_inputs(X):
+    """Map a raw (n, 31) feature matrix into the domain of the snapped thresholds"""
+    X = np.asarray(X, dtype=np.float64)
+    Xq = X.astype(np.float32).astype(np.float64)
+    cents = FEATURE_KINDS == CENTS
+    Xq[:, cents] = np.round(X[:, cents] * 100)
+    return Xq
+
+
+class QuantizedForest:
+    """All trees of one ensemble in flat compact arrays, evaluated together"""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.root = arrays['root'].astype(np.int64)
+        self.max_depth = int(arrays['max_depth'])
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """GradientBoostingRegressor (sum of learning_rate * leaf) or RandomForestRegressor (mean)"""
+        if hasattr(model, 'learning_rate'):
+            trees = [estimator[0].tree_ for estimator in model.estimators_]
+            leaf_scale = model.learning_rate
+            init = float(model.init_.predict(np.zeros((1, model.n_features_in_)))[0])
+            mode = 'sum'
+        else:
+            trees = [estimator.tree_ for estimator in model.estimators_]
+            leaf_scale, init, mode = 1.0, 0.0, 'mean'
+
+        leaves = np.concatenate([leaf_scale * t.value[:, 0, 0] for t in trees])
+        shift = LEAF_BITS - int(np.ceil(np.log2(np.abs(leaves).max())))
+
+        # Offsets span at most node_count - 1; widen rather than wrap when int16 cannot hold them
+        max_offset = max(t.node_count for t in trees) - 1
+        offset_dtype = np.int16 if max_offset <= np.iinfo(np.int16).max else np.int32
+
+        feature, threshold, left, right, value, root = [], [], [], [], [], []
+        offset = 0
+        for t in trees:
+            is_leaf = t.children_left < 0
+            kinds = FEATURE_KINDS[np.where(is_leaf, 0, t.feature)]
+            feature.append(np.where(is_leaf, 0, t.feature).astype(np.int8))
+            threshold.append(np.where(is_leaf, 0, _snap_thresholds(t.threshold, kinds)).astype(np.float32))
+            # Children as offsets from the node itself; 0 marks a leaf
+            node_ids = np.arange(t.node_count)
+            left.append(np.where(is_leaf, 0, t.children_left - node_ids).astype(offset_dtype))
+            right.append(np.where(is_leaf, 0, t.children_right - node_ids).astype(offset_dtype))
+            value.append(np.where(is_leaf, np.round(leaf_scale * t.value[:, 0, 0] * 2.0 ** shift), 0)
+                         .astype(np.int32))
+            root.append(offset)
+            offset += t.node_count
+
+        return cls({
+            'feature': np.concatenate(feature), 'threshold': np.concatenate(threshold),
+            'left': np.concatenate(left), 'right': np.concatenate(right),
+            'value': np.concatenate(value), 'root': np.array(root, dtype=np.int32),
+            'shift': np.int8(shift), 'init': np.float64(init), 'mode': mode,
+            'max_depth': np.int16(max(t.max_depth for t in trees)),
+        })
+
+    @property
+    def nbytes(self):
+        return sum(np.asarray(a).nbytes for a in self.arrays.values())
+
+    def predict(self, X, chunk_rows=128):
+        """Unrounded predictions for a raw (n, 31) feature matrix"""
+        Xq = quantize_inputs(X).astype(np.float32)
+        a = self.arrays
+        feature = a['feature'].astype(np.intp)
+        threshold = a['threshold']
+        # child[2 * node + went_right] is the offset to the next node
+        child = np.column_stack([a['left'], a['right']]).ravel().astype(np.intp)
+        n_features = Xq.shape[1]
+        totals = np.empty(len(Xq), dtype=np.int64)
+        for start in range(0, len(Xq), chunk_rows):
+            rows = Xq[start:start + chunk_rows]
+            flat = rows.ravel()
+            row_base = (np.arange(len(rows)) * n_features)[:, None]
+            node = np.broadcast_to(self.root, (len(rows), len(self.root))).astype(np.intp)
+            for _ in range(self.max_depth):
+                went_right = flat[row_base + feature[node]] > threshold[node]
+                node += child[2 * node + went_right]
+            # Leaves have zero offsets, so finished trees stay put; integer sums are exact
+            totals[start:start + chunk_rows] = a['value'][node].sum(axis=1, dtype=np.int64)
+        result = totals * 2.0 ** -int(a['shift'])
+        if a['mode'] == 'mean':
+            return result / len(self.root)
+        return float(a['init']) + result
+
+    def save(self, path):
+        np.savez(path, **self.arrays)
+
+    @classmethod
+    def load(cls, path):
+        saved = np.load(path)
+        arrays = {key: saved[key] for key in saved.files}
+        arrays['mode'] = str(arrays['mode'])
+        return cls(arrays)
+
+
+def sklearn_tree_bytes(model):
+    """In-memory size of the fitted trees' node and value arrays"""
+    estimators = np.ravel(model.estimators_)
+    return sum(e.tree_.__getstate__()['nodes'].nbytes + e.tree_.value.nbytes for e in estimators)
+
+
+def _best_seconds(fn, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def verify_and_report():
+    days, miles, receipts, _ = load_known_inputs()
+    on_grid = (np.round(miles * 100) / 100 == miles) & (np.round(receipts * 100) / 100 == receipts)
+    assert on_grid.all(), "known inputs are not on the cents grid"
+    X = engineer_features_batch(days, miles, receipts)
+
+    gbr_data = load_gbr()
+    ensemble = load_gbr('ensemble_model.pkl')
+    offsets = residual_corrections(gbr_data['residual_lookup'], days, miles, receipts)
+    models = [
+        ('gradient_boosting_model.pkl', gbr_data['model'], offsets, 'quantized_gbr.npz'),
+        ('ensemble_model.pkl rf_model', ensemble['rf_model'], 0.0, 'quantized_rf.npz'),
+    ]
+
+    print(f"Quantized tree models, checked on {len(X)} public + private cases")
+    print("=" * 96)
+    print(f"{'Model':<30} {'Changed':>8} {'Max |diff|':>11} {'Trees (KB)':>11} {'Quantized (KB)':>15} "
+          f"{'sklearn rows/s':>15} {'Quantized rows/s':>17}")
+    for name, model, offset, path in models:
+        quantized = QuantizedForest.from_sklearn(model)
+        quantized.save(path)
+        quantized = QuantizedForest.load(path)
+
+        reference = model.predict(X) + offset
+        ours = quantized.predict(X) + offset
+        changed = int((np.round(ours, 2) != np.round(reference, 2)).sum())
+        sklearn_rate = len(X) / _best_seconds(lambda: model.predict(X))
+        quantized_rate = len(X) / _best_seconds(lambda: quantized.predict(X))
+        print(f"{name:<30} {changed:>8} {np.abs(ours - reference).max():>11.2e} "
+              f"{sklearn_tree_bytes(model) / 1024:>11.0f} {quantized.nbytes / 1024:>15.0f} "
+              f"{sklearn_rate:>15,.0f} {quantized_rate:>17,.0f}")
+        assert changed == 0, f"quantization changed {changed} rounded outputs of {name}"
+
+
+if __name__ == "__main__":
+    verify_and_report()
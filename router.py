@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Region-based solution router
+Partitions trips by days, receipt band, miles-per-day band and cents ending,
+picks the solution with the lowest error in each cell (backing off to coarser
+cells where a cell has too few public cases; solutions fit to the public
+cases are left out, their errors there being in-sample), and compiles the choices into a
+dense dispatch array indexed by integer bin IDs. Production scoring runs the
+one solution its cell points to.
+"""
+
+import sys
+import time
+import numpy as np
+from sklearn.model_selection import KFold
+from rule_cv import eval_score
+from solution_matrix import SolutionMatrix, compute_column
+from solution_registry import PUBLIC_FIT, discover_solutions, load_solution
+
+TABLE_PATH = 'router_table.npz'
+# Meta-solutions built on the others, and every model fit to the public cases:
+# their in-sample errors would win every cell (xgb_scoring took all 1260)
+EXCLUDED = ('router', 'stacking') + PUBLIC_FIT
+
+MAX_DAYS = 14
+RECEIPT_EDGES = [300, 600, 1000, 1500, 2000]
+MPD_EDGES = [50, 100, 200, 300]
+CENTS_ENDINGS = [49, 99]  # cents endings with special handling; everything else is bin 0
+SHAPE = (MAX_DAYS, len(RECEIPT_EDGES) + 1, len(MPD_EDGES) + 1, len(CENTS_ENDINGS) + 1)
+MIN_CELL_CASES = 8
+
+# Back-off levels, finest first: the bin axes each level keeps
+LEVELS = [(0, 1, 2, 3), (0, 1, 3), (0, 1), (0,), ()]
+
+
+def bin_ids(days, miles, receipts):
+    """(n, 4) integer bins: days, receipt band, miles-per-day band, cents ending"""
+    days = np.asarray(days, dtype=float)
+    miles = np.asarray(miles, dtype=float)
+    receipts = np.asarray(receipts, dtype=float)
+    cents = np.round(receipts * 100).astype(np.int64) % 100
+    ending = np.zeros(len(cents), dtype=np.int64)
+    for i, value in enumerate(CENTS_ENDINGS):
+        ending[cents == value] = i + 1
+    return np.column_stack([
+        np.clip(days.astype(np.int64), 1, MAX_DAYS) - 1,
+        np.searchsorted(RECEIPT_EDGES, receipts, side='right'),
+        np.searchsorted(MPD_EDGES, miles / np.maximum(days, 1), side='right'),
+        ending,
+    ])
+
+
+def cell_ids(bins):
+    return np.ravel_multi_index(tuple(bins.T), SHAPE)
+
+
+def _level_keys(bins, axes):
+    """Cell keys at one back-off level (axes not kept collapse to 0)"""
+    kept = np.zeros_like(bins)
+    kept[:, list(axes)] = bins[:, list(axes)]
+    return cell_ids(kept)
+
+
+def fit_table(errors, bins):
+    """
+    Dense dispatch table: for every cell, the solution with the lowest mean
+    error over the training cases of the finest level with enough of them
+    """
+    n_cells = int(np.prod(SHAPE))
+    every_cell = np.column_stack([axis.ravel() for axis in np.indices(SHAPE)])
+    table = np.full(n_cells, -1, dtype=np.int64)
+    for axes in LEVELS:
+        keys = _level_keys(bins, axes)
+        counts = np.bincount(keys, minlength=n_cells)
+        sums = np.zeros((n_cells, errors.shape[1]))
+        np.add.at(sums, keys, errors)
+        cell_keys = _level_keys(every_cell, axes)
+        undecided = (table < 0) & ((counts[cell_keys] >= MIN_CELL_CASES) | (len(axes) == 0))
+        table[undecided] = np.argmin(sums[cell_keys[undecided]], axis=1)
+    return table.reshape(SHAPE).astype(np.int8)
+
+
+def route(table, outputs, bins):
+    """Routed predictions from a full outputs matrix (for evaluation)"""
+    chosen = table.ravel()[cell_ids(bins)]
+    return outputs[np.arange(len(outputs)), chosen]
+
+
+def out_of_fold(outputs, expected, bins, n_splits=10, random_state=42):
+    """Routed predictions for each case from a table fit without its fold"""
+    errors = np.abs(outputs - expected[:, None])
+    predicted = np.empty(len(expected))
+    for train_idx, val_idx in KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(outputs):
+        table = fit_table(errors[train_idx], bins[train_idx])
+        predicted[val_idx] = route(table, outputs[val_idx], bins[val_idx])
+    return predicted
+
+
+class Router:
+    """Compiled dispatch table: one solution call per trip"""
+
+    def __init__(self, path=TABLE_PATH):
+        saved = np.load(path)
+        self.table = saved['table']
+        self.flat = self.table.ravel()
+        self.names = [str(name) for name in saved['names']]
+        self._functions = None
+
+    def predict_one(self, days, miles, receipts):
+        if self._functions is None:
+            self._functions = [load_solution(name) for name in self.names]
+        d, r, m, c = bin_ids([days], [miles], [receipts])[0]
+        return self._functions[self.table[d, r, m, c]](days, miles, receipts)
+
+    def predict_batch(self, days, miles, receipts):
+        """Each solution runs once, on just the trips routed to it"""
+        days = np.asarray(days, dtype=float)
+        miles = np.asarray(miles, dtype=float)
+        receipts = np.asarray(receipts, dtype=float)
+        chosen = self.flat[cell_ids(bin_ids(days, miles, receipts))]
+        result = np.empty(len(days))
+        for index in np.unique(chosen):
+            rows = chosen == index
+            result[rows] = compute_column(self.names[index], days[rows], miles[rows], receipts[rows])
+        return result
+
+
+_router = None
+
+
+def _load_router():
+    global _router
+    if _router is None:
+        _router = Router()
+    return _router
+
+
+def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
+    return _load_router().predict_one(trip_duration_days, miles_traveled, total_receipts_amount)
+
+
+def calculate_reimbursement_batch(days, miles, receipts):
+    return _load_router().predict_batch(days, miles, receipts)
+
+
+def train_and_report(names=None):
+    names = names or [name for name in discover_solutions()[0] if name not in EXCLUDED]
+    matrix = SolutionMatrix()
+    matrix.update(names, verbose=False)
+    outputs, expected = matrix.public(names)
+    outputs = np.round(outputs, 2)
+    n = matrix.n_public
+    bins = bin_ids(matrix.days[:n], matrix.miles[:n], matrix.receipts[:n])
+
+    print(f"Router over {len(names)} solutions, {int(np.prod(SHAPE))} cells {SHAPE} "
+          f"(10-fold out-of-fold scores on {n} public cases)")
+    print("=" * 78)
+    scores = {name: eval_score(outputs[:, j], expected) for j, name in enumerate(names)}
+    best_single = min(scores, key=lambda name: scores[name]['score'])
+    routed = eval_score(out_of_fold(outputs, expected, bins), expected)
+    for label, metrics in [(f'best single: {best_single}', scores[best_single]), ('routed (out-of-fold)', routed)]:
+        print(f"{label:<40} score {metrics['score']:>9.2f}  avg err {metrics['avg_error']:>7.2f}  "
+              f"exact {metrics['exact']:>3}  close {metrics['close']:>3}")
+
+    table = fit_table(np.abs(outputs - expected[:, None]), bins)
+    used = np.unique(table)
+    if len(used) < 2:
+        raise ValueError(f"every cell routes to {names[used[0]]}: the table is a constant dispatch, "
+                         f"not a router (is a base fit to the public cases?)")
+    np.savez(TABLE_PATH, table=table, names=np.array(names))
+    print(f"\nDispatch table {table.shape} int8 ({table.nbytes} bytes) saved to {TABLE_PATH}")
+    router = Router()
+    chosen = router.flat[cell_ids(bin_ids(matrix.days, matrix.miles, matrix.receipts))]
+    print(f"Solutions used on the {len(chosen)} known cases:")
+    for index, count in sorted(zip(*np.unique(chosen, return_counts=True)), key=lambda item: -item[1]):
+        print(f"  {names[index]:<28} {count:>5}")
+
+    days, miles, receipts = matrix.days, matrix.miles, matrix.receipts
+    batch = router.predict_batch(days, miles, receipts)
+    full = matrix.outputs[:, [matrix.names.index(name) for name in names]]
+    assert np.allclose(batch, full[np.arange(len(days)), chosen], equal_nan=True), "batch routing mismatch"
+    start = time.perf_counter()
+    router.predict_batch(days, miles, receipts)
+    routed_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for name in names:
+        compute_column(name, days, miles, receipts)
+    all_seconds = time.perf_counter() - start
+    print(f"\nBatch throughput on {len(days)} cases: routed {len(days) / routed_seconds:,.0f} cases/s, "
+          f"every solution {len(days) / all_seconds:,.0f} cases/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and not sys.argv[1].startswith('--'):
+        print(calculate_reimbursement(int(sys.argv[1]), float(sys.argv[2]), float(sys.argv[3])))
+    else:
+        # python router.py [--train] [solution names...]
+        train_and_report([arg for arg in sys.argv[1:] if not arg.startswith('--')])
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Shared pieces of the vectorized calculate_reimbursement_batch functions
+Exact Python-round cents rounding for arrays, the derived trip features with
+the scalar modules' exact expressions, and the hand-written decision tree
+shared by solution_optimized_final, solution_corrected, solution_hybrid_final
+and (in part) solution_hybrid. The generator scripts emit each generated
+module's batch function next to its scalar one. Run directly to check every
+batch function against its scalar version on all known cases.
+"""
+
+import time
+import numpy as np
+
+# Solution modules with a calculate_reimbursement_batch to check
+BATCH_MODULES = [
+    'solution_corrected', 'solution_ensemble', 'solution_extreme', 'solution_final',
+    'solution_genetic', 'solution_genetic_v2', 'solution_gradient_boost', 'solution_hybrid',
+    'solution_hybrid_final', 'solution_linear_regression', 'solution_neural_network',
+    'solution_optimized', 'solution_optimized_final', 'solution_v2', 'solution_v3',
+]
+
+
+def as_arrays(days, miles, receipts):
+    return (np.asarray(days, dtype=float), np.asarray(miles, dtype=float),
+            np.asarray(receipts, dtype=float))
+
+
+def round_cents(values):
+    """
+    round(value, 2) for every element. np.round scales by 100 before rounding,
+    which can pick the other cent when the scaled value lands within float
+    error of a half cent; those few elements go through Python's round.
+    """
+    values = np.asarray(values, dtype=float)
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if near_half.any():
+        rounded[near_half] = [round(value, 2) for value in values[near_half].tolist()]
+    return rounded
+
+
+def cents_ending(receipts):
+    """int(receipts * 100) % 100, as the scalar modules compute it"""
+    return np.trunc(np.asarray(receipts, dtype=float) * 100).astype(np.int64) % 100
+
+
+def trip_features(days, miles, receipts):
+    """Derived features named as in the scalar modules (0 where the divisor is not positive)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return {
+            'trip_duration_days': days,
+            'miles_traveled': miles,
+            'total_receipts_amount': receipts,
+            'miles_per_day': np.where(days > 0, miles / days, 0.0),
+            'receipts_per_day': np.where(days > 0, receipts / days, 0.0),
+            'receipts_per_mile': np.where(miles > 0, receipts / miles, 0.0),
+            'days_x_miles': days * miles,
+            'days_x_receipts': days * receipts,
+            'miles_x_receipts': miles * receipts,
+        }
+
+
+# (feature, threshold, left if feature <= threshold, right) or a leaf value
+DECISION_TREE = (
+    'total_receipts_amount', 828.1,
+    ('days_x_miles', 2070.0,
+        ('days_x_receipts', 487.54,
+            ('days_x_miles', 566.0,
+                ('days_x_miles', 210.5, 196.57, 336.31),
+                559.32),
+            ('days_x_receipts', 4036.29,
+                ('days_x_miles', 1310.5,
+                    ('total_receipts_amount', 588.27,
+                        ('trip_duration_days', 4.5, 492.73, 619.95),
+                        719.4),
+                    ('days_x_receipts', 1467.28, 700.75, 828.74)),
+                935.06)),
+        ('days_x_miles', 4945.5,
+            ('total_receipts_amount', 570.45,
+                ('days_x_receipts', 1790.1,
+                    ('days_x_miles', 3963.6,
+                        ('receipts_per_mile', 0.41, 750.44, 788.25),
+                        845.6),
+                    ('miles_traveled', 628.5,
+                        ('receipts_per_mile', 1.11, 925.07, 853.04),
+                        1000.77)),
+                ('total_receipts_amount', 691.05, 1019.89, 1170.65)),
+            ('miles_x_receipts', 529812.36,
+                ('trip_duration_days', 10.5,
+                    ('days_x_receipts', 2838.7,
+                        ('receipts_per_mile', 0.18, 1111.45, 1042.71),
+                        1208.17),
+                    ('days_x_miles', 11460.5,
+                        ('miles_x_receipts', 218691.81, 1213.97, 1298.64),
+                        1364.9)),
+                ('days_x_receipts', 5526.72, 1417.53, 1611.04)))),
+    ('days_x_miles', 3873.0,
+        ('days_x_receipts', 5494.43,
+            ('miles_x_receipts', 385934.73,
+                ('total_receipts_amount', 1082.07,
+                    ('days_x_receipts', 3208.57, 949.66, 1099.06),
+                    1239.56),
+                ('miles_x_receipts', 1033628.09,
+                    ('days_x_receipts', 2736.24,
+                        ('miles_x_receipts', 827348.03, 1176.45, 1261.61),
+                        ('total_receipts_amount', 942.36, 1288.02, 1376.78)),
+                    ('days_x_miles', 1205.0,
+                        ('receipts_per_mile', 1.77, 1294.13, 1408.36),
+                        ('miles_per_day', 406.0, 1495.94, 1526.97)))),
+            ('days_x_receipts', 11625.58,
+                ('days_x_miles', 979.83,
+                    ('days_x_receipts', 9327.43, 1270.85, 1406.93),
+                    ('miles_traveled', 518.5,
+                        ('days_x_miles', 2578.0, 1496.66, 1336.63),
+                        ('receipts_per_day', 624.27, 1653.03, 1498.03))),
+                ('trip_duration_days', 12.5,
+                    ('receipts_per_mile', 6.38,
+                        1664.33,
+                        ('trip_duration_days', 8.5, 1528.26, 1605.61)),
+                    1714.87))),
+        ('days_x_miles', 6939.0,
+            ('total_receipts_amount', 1089.04,
+                1476.82,
+                ('miles_per_day', 99.75,
+                    ('trip_duration_days', 10.5,
+                        ('miles_x_receipts', 1229175.0, 1636.17, 1521.96),
+                        ('receipts_per_day', 169.39, 1795.96, 1702.51)),
+                    ('trip_duration_days', 5.5,
+                        ('miles_traveled', 1030.5, 1736.47, 1659.12),
+                        ('trip_duration_days', 6.5, 1778.5, 1860.13)))),
+            ('days_x_miles', 11863.0,
+                ('miles_per_day', 127.34,
+                    ('miles_x_receipts', 877176.88,
+                        1742.71,
+                        ('receipts_per_day', 174.05, 1906.01, 1800.23)),
+                    ('days_x_receipts', 12912.54, 2048.61, 1857.2)),
+                ('total_receipts_amount', 1787.72,
+                    ('miles_traveled', 1017.5, 1988.28, 2136.03),
+                    1924.59)))),
+)
+
+
+def evaluate_tree(node, features, rows=None, out=None):
+    """Leaf value of every row: each split partitions the row indices that reach it"""
+    n = len(features['trip_duration_days'])
+    if out is None:
+        rows, out = np.arange(n), np.empty(n)
+    if not isinstance(node, tuple):
+        out[rows] = node
+        return out
+    name, threshold, left, right = node
+    go_left = features[name][rows] <= threshold
+    evaluate_tree(left, features, rows[go_left], out)
+    evaluate_tree(right, features, rows[~go_left], out)
+    return out
+
+
+def synthetic_trips(n=20000, seed=42):
+    """
+    Random trips beyond the known cases' ranges, on the cents grid, with a
+    third of receipts ending in .33/.49/.99 and some on exact bucket edges
+    """
+    rng = np.random.default_rng(seed)
+    days = rng.integers(1, 21, n).astype(float)
+    scale = 10.0 ** rng.integers(0, 3, n)  # whole miles, tenths or hundredths
+    miles = np.round(rng.uniform(0, 1500, n) * scale) / scale
+    receipts = np.round(rng.uniform(0, 3000, n), 2)
+    special = rng.random(n) < 0.33
+    receipts[special] = np.round(np.floor(receipts[special]) + rng.choice([0.33, 0.49, 0.99], special.sum()), 2)
+    edges = rng.random(n) < 0.05
+    miles[edges] = rng.choice([50, 100, 200, 300, 400, 600, 1000], edges.sum())
+    receipts[edges] = rng.choice([100, 200, 500, 800, 828.1, 1000, 1500, 2000], edges.sum())
+    return days, miles, receipts
+
+
+def check_equivalence(names=BATCH_MODULES):
+    """Compare every batch function with its scalar version on all known cases plus synthetic trips"""
+    import importlib
+    from gbr_model import load_known_inputs
+    known = load_known_inputs()[:3]
+    days, miles, receipts = (np.concatenate(pair) for pair in zip(known, synthetic_trips()))
+    inputs = list(zip(days.astype(int).tolist(), miles.tolist(), receipts.tolist()))
+
+    print(f"Batch vs scalar calculate_reimbursement on {len(known[0])} known cases "
+          f"+ {len(days) - len(known[0])} synthetic trips")
+    print("=" * 72)
+    print(f"{'Module':<28} {'Mismatches':>10} {'Scalar us':>10} {'Batch us':>9} {'Speedup':>8}")
+    failed = []
+    for name in names:
+        module = importlib.import_module(name)
+        if not hasattr(module, 'calculate_reimbursement_batch'):
+            print(f"{name:<28} no calculate_reimbursement_batch")
+            failed.append(name)
+            continue
+        start = time.perf_counter()
+        scalar = np.array([module.calculate_reimbursement(*trip) for trip in inputs], dtype=float)
+        scalar_seconds = time.perf_counter() - start
+        module.calculate_reimbursement_batch(days, miles, receipts)  # warm up lazy imports
+        start = time.perf_counter()
+        batch = np.asarray(module.calculate_reimbursement_batch(days, miles, receipts), dtype=float)
+        batch_seconds = time.perf_counter() - start
+        mismatches = int((batch != scalar).sum())
+        print(f"{name:<28} {mismatches:>10} {scalar_seconds / len(days) * 1e6:>10.2f} "
+              f"{batch_seconds / len(days) * 1e6:>9.3f} {scalar_seconds / batch_seconds:>7.0f}x")
+        if mismatches:
+            failed.append(name)
+    assert not failed, f"batch functions differ from scalar: {', '.join(failed)}"
+
+
+if __name__ == "__main__":
+    check_equivalence()
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+K-fold cross-validation for the hand-tuned rule solutions
+Each rule family is a vectorized predictor plus the procedure that fits its
+parameters. The fit is re-run on every training fold in parallel and the
+out-of-fold predictions are scored with the eval.sh formula, next to the
+in-sample score, to show how much of a rule's score is overfit.
+"""
+
+import importlib
+import sys
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.model_selection import KFold
+from sklearn.tree import DecisionTreeRegressor
+from linear_fit import fit_segments, load_public_cases
+
+
+def eval_score(predicted, expected, n_cases=None):
+    """
+    eval.sh metrics for predictions rounded to cents. n_cases is the number of
+    cases attempted when some runs failed and are missing from predicted
+    """
+    errors = np.abs(np.round(np.asarray(predicted, dtype=float), 2) - expected)
+    exact = int((errors < 0.01).sum())
+    avg_error = float(errors.mean())
+    return {
+        'score': avg_error * 100 + ((n_cases or len(expected)) - exact) * 0.1,
+        'avg_error': avg_error,
+        'exact': exact,
+        'close': int((errors < 1.0).sum()),
+        'max_error': float(errors.max()),
+    }
+
+
+# Step function (optimize_step_function.py): one linear formula for 1-3 day
+# trips and one for longer trips, grid-searched on mean percentage error
+
+STEP_GRID = {
+    'short_base': range(70, 100, 2),
+    'long_base': range(20, 50, 2),
+    'receipt_mult': [0.8, 0.9, 1.0, 1.1, 1.2],
+    'mile_rate': [0.60, 0.65, 0.67, 0.70, 0.75],
+}
+
+
+def _step_grid_search(bases, days, miles, receipts, expected):
+    """Best (base, receipt_mult, mile_rate) in the loop order of optimize_step_function"""
+    grid = np.array([(b, rm, mr) for b in bases
+                     for rm in STEP_GRID['receipt_mult'] for mr in STEP_GRID['mile_rate']], dtype=float)
+    pred = grid[:, :1] * days + receipts * grid[:, 1:2] + miles * grid[:, 2:3]
+    pct_error = (np.abs(pred - expected) / expected * 100).mean(axis=1)
+    return tuple(grid[int(np.argmin(pct_error))])
+
+
+def fit_step_function(days, miles, receipts, expected):
+    short = days <= 3
+    return {
+        'short': _step_grid_search(STEP_GRID['short_base'], days[short], miles[short],
+                                   receipts[short], expected[short]),
+        'long': _step_grid_search(STEP_GRID['long_base'], days[~short], miles[~short],
+                                  receipts[~short], expected[~short]),
+    }
+
+
+def predict_step_function(params, days, miles, receipts):
+    short = days <= 3
+    coef = np.where(short[:, None], np.array(params['short']), np.array(params['long']))
+    return coef[:, 0] * days + receipts * coef[:, 1] + miles * coef[:, 2]
+
+
+# solution_v3.py: per-trip-length linear formulas (days 2-8, 9+) and a
+# special 1-day rule with a low-input formula, a flat rate and a cap
+
+V3_PARAMS = {
+    'day1': (100, 0.4, 0.6, 0.7, 1475),  # low const, low mile, low receipt, high rate, cap
+    'buckets': {  # days: (per day, per mile, per receipt dollar, bonus)
+        2: (160, 0.55, 0.85, 0), 3: (80, 0.55, 0.85, 0), 4: (75, 0.52, 0.88, 0),
+        5: (70, 0.5, 0.9, 50), 6: (65, 0.48, 0.92, 0), 7: (60, 0.46, 0.94, 0),
+        8: (55, 0.44, 0.95, 0), 9: (50, 0.42, 0.96, 0),
+    },
+}
+
+
+def _bucket_table(buckets, width):
+    table = np.full((10, width), np.nan)
+    for day, coef in buckets.items():
+        table[day] = coef
+    return table
+
+
+def predict_v3(params, days, miles, receipts):
+    low_const, low_mile, low_receipt, high_rate, cap = params['day1']
+    coef = _bucket_table(params['buckets'], 4)[np.minimum(days, 9).astype(int)]
+    result = coef[:, 0] * days + coef[:, 1] * miles + coef[:, 2] * receipts + coef[:, 3]
+    low = (miles < 200) & (receipts < 200)
+    day1 = np.where(low, low_const + low_mile * miles + low_receipt * receipts, (miles + receipts) * high_rate)
+    return np.where(days == 1, np.minimum(day1, cap), result)
+
+
+def fit_v3(days, miles, receipts, expected):
+    longer = days >= 2
+    bucket_ids = np.minimum(days[longer], 9).astype(int)
+    X = np.column_stack([days[longer], miles[longer], receipts[longer], np.ones(longer.sum())])
+    coef, counts = fit_segments(X, expected[longer], bucket_ids, n_segments=10)
+    buckets = {day: tuple(coef[day]) for day in range(2, 10) if counts[day]}
+
+    one_day = days == 1
+    low = one_day & (miles < 200) & (receipts < 200)
+    high = one_day & ~low
+    low_fit = np.linalg.lstsq(np.column_stack([np.ones(low.sum()), miles[low], receipts[low]]),
+                              expected[low], rcond=None)[0]
+    total = miles[high] + receipts[high]
+    high_rate = (total @ expected[high]) / (total @ total)
+    return {'day1': (*low_fit, high_rate, V3_PARAMS['day1'][4]), 'buckets': buckets}
+
+
+# solution_final.py: receipts pass through a fixed diminishing-returns
+# schedule, each trip length gets a base and mileage rate, then per-day caps
+
+FINAL_PARAMS = {
+    'day1_low': (100, 0.4, 0.6),  # 1-day trips under 200 miles and $200 receipts
+    'buckets': {  # days: (per day, per mile, bonus)
+        1: (0, 0.5, 100), 2: (160, 0.45, 0), 3: (80, 0.55, 0), 4: (75, 0.48, 0),
+        5: (70, 0.45, 50), 6: (65, 0.42, 0), 7: (60, 0.40, 0), 8: (55, 0.38, 0),
+        9: (50, 0.35, 0),
+    },
+}
+
+
+def effective_receipts(receipts):
+    """solution_final's receipt schedule"""
+    return np.where(receipts > 1000, 100 + (receipts - 1000) * 0.05,
+                    np.where(receipts > 500, 50 + (receipts - 500) * 0.1 + 500 * 0.2,
+                             np.where(receipts > 200, receipts * 0.4, receipts * 0.85)))
+
+
+def predict_final(params, days, miles, receipts):
+    coef = _bucket_table(params['buckets'], 3)[np.minimum(days, 9).astype(int)]
+    result = (coef[:, 0] * days + coef[:, 2]) + miles * coef[:, 1] + effective_receipts(receipts)
+    low_const, low_mile, low_receipt = params['day1_low']
+    low = (days == 1) & (miles < 200) & (receipts < 200)
+    result = np.where(low, low_const + low_mile * miles + low_receipt * receipts, result)
+    result = np.where(days == 1, np.minimum(result, 1475), result)
+    return np.minimum(result, days * (500 - (days * 20)))
+
+
+def fit_final(days, miles, receipts, expected):
+    low = (days == 1) & (miles < 200) & (receipts < 200)
+    rest = ~low
+    bucket_ids = np.minimum(days[rest], 9).astype(int)
+    X = np.column_stack([days[rest], miles[rest], np.ones(rest.sum())])
+    coef, counts = fit_segments(X, expected[rest] - effective_receipts(receipts[rest]), bucket_ids,
+                                n_segments=10)
+    buckets = {day: (coef[day, 0], coef[day, 1], coef[day, 2]) for day in range(1, 10) if counts[day]}
+    low_fit = np.linalg.lstsq(np.column_stack([np.ones(low.sum()), miles[low], receipts[low]]),
+                              expected[low], rcond=None)[0]
+    return {'day1_low': tuple(low_fit), 'buckets': buckets}
+
+
+# solution_corrected.py: a depth-6 regression tree over interaction features,
+# then multiplicative corrections by receipt bracket and trip length
+
+CORRECTED_TREE_DEPTH = 6
+RECEIPT_BRACKETS = [1000, 1200, 1500, 1800, 2000]
+
+
+def _tree_features(days, miles, receipts):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.column_stack([
+            days, miles, receipts,
+            np.where(days > 0, miles / days, 0), np.where(days > 0, receipts / days, 0),
+            np.where(miles > 0, receipts / miles, 0),
+            days * miles, days * receipts, miles * receipts,
+        ])
+
+
+def _correction_cells(days, receipts):
+    """Receipt bracket x short-trip flag x long-trip flag, as in solution_corrected"""
+    bracket = np.searchsorted(RECEIPT_BRACKETS, receipts, side='left')
+    short = (days <= 5) & (receipts > 1000)
+    long = (days >= 8) & (receipts > 1400)
+    return bracket * 4 + short * 2 + long
+
+
+def fit_corrected(days, miles, receipts, expected):
+    tree = DecisionTreeRegressor(max_depth=CORRECTED_TREE_DEPTH, random_state=42)
+    tree.fit(_tree_features(days, miles, receipts), expected)
+    raw = tree.predict(_tree_features(days, miles, receipts))
+    cells = _correction_cells(days, receipts)
+    n_cells = 4 * (len(RECEIPT_BRACKETS) + 1)
+    # Least-squares multiplier per cell: sum(y * p) / sum(p * p)
+    numerator = np.bincount(cells, weights=raw * expected, minlength=n_cells)
+    denominator = np.bincount(cells, weights=raw * raw, minlength=n_cells)
+    multipliers = np.divide(numerator, denominator, out=np.ones(n_cells), where=denominator > 0)
+    return {'tree': tree, 'multipliers': multipliers}
+
+
+def predict_corrected(params, days, miles, receipts):
+    raw = params['tree'].predict(_tree_features(days, miles, receipts))
+    return raw * params['multipliers'][_correction_cells(days, receipts)]
+
+
+# Each family: parameter fitting, vectorized prediction, and (if it ships as a
+# solution module) the module and its hand-tuned parameters
+RULE_FAMILIES = {
+    'step_function': {'fit': fit_step_function, 'predict': predict_step_function},
+    'solution_v3': {'fit': fit_v3, 'predict': predict_v3,
+                    'module': 'solution_v3', 'shipped': V3_PARAMS},
+    'solution_final': {'fit': fit_final, 'predict': predict_final,
+                       'module': 'solution_final', 'shipped': FINAL_PARAMS},
+    'solution_corrected': {'fit': fit_corrected, 'predict': predict_corrected,
+                           'module': 'solution_corrected'},
+}
+
+
+def _fit_fold(family, cases, train_idx, val_idx):
+    """Fit on one training fold; returns (validation indices, predictions, fit seconds)"""
+    days, miles, receipts, expected = cases
+    start = time.perf_counter()
+    params = family['fit'](days[train_idx], miles[train_idx], receipts[train_idx], expected[train_idx])
+    seconds = time.perf_counter() - start
+    return val_idx, family['predict'](params, days[val_idx], miles[val_idx], receipts[val_idx]), seconds
+
+
+def cross_validate(name, cases=None, n_splits=10, n_jobs=-1, random_state=42):
+    """
+    Out-of-fold and in-sample eval.sh metrics for one rule family.
+    Returns {'in_sample', 'out_of_fold', 'fit_seconds', 'seconds'}.
+    """
+    family = RULE_FAMILIES[name]
+    cases = cases or load_public_cases()
+    days, miles, receipts, expected = cases
+    start = time.perf_counter()
+
+    folds = KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(days)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(family, cases, train_idx, val_idx) for train_idx, val_idx in folds)
+    oof = np.empty(len(expected))
+    for val_idx, predictions, _ in results:
+        oof[val_idx] = predictions
+
+    params = family['fit'](days, miles, receipts, expected)
+    in_sample = family['predict'](params, days, miles, receipts)
+    return {
+        'in_sample': eval_score(in_sample, expected),
+        'out_of_fold': eval_score(oof, expected),
+        'fit_seconds': sum(seconds for _, _, seconds in results),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def shipped_score(name, cases=None):
+    """
+    eval.sh metrics of the solution module as committed, plus how many cases the
+    vectorized predictor with the shipped parameters disagrees with it on
+    """
+    family = RULE_FAMILIES[name]
+    if 'module' not in family:
+        return None
+    cases = cases or load_public_cases()
+    days, miles, receipts, expected = cases
+    module = importlib.import_module(family['module'])
+    scalar = np.array([module.calculate_reimbursement(int(d), m, r) for d, m, r in zip(days, miles, receipts)])
+    metrics = eval_score(scalar, expected)
+    if 'shipped' in family:
+        vectorized = np.round(family['predict'](family['shipped'], days, miles, receipts), 2)
+        metrics['vectorized_mismatches'] = int((np.abs(vectorized - scalar) >= 0.005).sum())
+    return metrics
+
+
+def main():
+    n_splits = 10
+    if '--folds' in sys.argv:
+        n_splits = int(sys.argv[sys.argv.index('--folds') + 1])
+    names = [arg for arg in sys.argv[1:] if arg in RULE_FAMILIES] or list(RULE_FAMILIES)
+    cases = load_public_cases()
+
+    print(f"{n_splits}-fold cross-validation of rule families (eval.sh score, lower is better)")
+    print("=" * 92)
+    print(f"{'Family':<20} {'Shipped':>9} {'In-sample':>10} {'Out-of-fold':>12} {'OOF exact':>10} "
+          f"{'OOF close':>10} {'OOF avg err':>12} {'Seconds':>8}")
+    for name in names:
+        shipped = shipped_score(name, cases)
+        cv = cross_validate(name, cases, n_splits=n_splits)
+        oof = cv['out_of_fold']
+        shipped_text = f"{shipped['score']:>9.2f}" if shipped else f"{'-':>9}"
+        print(f"{name:<20} {shipped_text} {cv['in_sample']['score']:>10.2f} {oof['score']:>12.2f} "
+              f"{oof['exact']:>10} {oof['close']:>10} {oof['avg_error']:>12.2f} {cv['seconds']:>8.2f}")
+        if shipped and shipped.get('vectorized_mismatches'):
+            print(f"  warning: vectorized {name} differs from the module on "
+                  f"{shipped['vectorized_mismatches']} cases")
+
+
+if __name__ == "__main__":
+    main()
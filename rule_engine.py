@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Config-driven rule engine for the per-day-table solutions
+solution_final, solution_v3, run_v2.sh and optimize_step_function all share
+one structure: a base by trip length, a mileage rate by trip length, tiered
+receipt reimbursement, special-case overrides and caps. A config describes
+that structure as plain JSON-compatible data; compile_rules turns it once
+into a scalar closure and a vectorized batch evaluator, so optimizers can
+mutate a config and rescore every case without generating source files.
+
+Config keys (all optional):
+  base_per_day, base_flat, mileage_rate, receipt_multiplier: day tables,
+      {"1": 100, "2-4": 90, "default": 50}
+  receipt_tiers: [[above, base, rate, origin, bonus], ...], value = base +
+      rate * (receipts - origin) + bonus for the last tier with receipts >
+      above; origin defaults to above (0 for the first tier, whose above is
+      null) and bonus to 0
+  overrides: [{"when": condition, "total" | "base" | "mileage" | "receipts":
+      formula}, ...], the first matching rule per target wins
+  caps: [{"when": condition, "max": formula}, ...], every match applies
+  sum_order: the order base, mileage and receipts are added in, default
+      ["base", "mileage", "receipts"], optionally with "base_flat" to add the
+      flat bonus on its own instead of inside base (a base override then
+      replaces only the per-day part); float addition is not
+      associative, so a total near a half cent rounds like the original only
+      in its order
+  rounding: "round" (Python round) or an integer_cents rounding mode
+A condition has days (int or [lo, hi]), miles_below/miles_above,
+receipts_below/receipts_above (strict), receipts_in (exact amounts) and
+receipt_cents (cents endings); a formula has constant, days, days_squared,
+miles and receipts coefficients, summed in that order and multiplied by
+scale (default 1) for a shared rate, (miles + receipts) * 0.7.
+"""
+
+import json
+import re
+import sys
+import time
+import numpy as np
+
+MAX_TABLE_DAYS = 30  # day tables are compiled dense up to here; longer trips use the last entry
+RUN_V2_INPUTS = ('trip_duration_days', 'miles_traveled', 'total_receipts_amount')
+
+CONFIGS = {
+    'solution_final': {
+        'base_per_day': {'1': 100, '2': 160, '3': 80, '4': 75, '5': 70, '6': 65, '7': 60, '8': 55,
+                         'default': 50},
+        'base_flat': {'5': 50, 'default': 0},
+        'mileage_rate': {'1': 0.5, '2': 0.45, '3': 0.55, '4': 0.48, '5': 0.45, '6': 0.42, '7': 0.40,
+                         '8': 0.38, 'default': 0.35},
+        'receipt_tiers': [[None, 0, 0.85], [200, 0, 0.4, 0], [500, 50, 0.1, 500, 100], [1000, 100, 0.05]],
+        'overrides': [
+            {'when': {'days': 1, 'miles_below': 200, 'receipts_below': 200},
+             'total': {'constant': 100, 'miles': 0.4, 'receipts': 0.6}},
+            {'when': {'days': 3, 'receipts_below': 100}, 'receipts': {'receipts': 0.85}},
+        ],
+        'caps': [
+            {'when': {'days': 1}, 'max': {'constant': 1475}},
+            {'max': {'days': 500, 'days_squared': -20}},
+        ],
+    },
+    'solution_v3': {
+        'base_per_day': {'1': 0, '2': 160, '3': 80, '4': 75, '5': 70, '6': 65, '7': 60, '8': 55,
+                         'default': 50},
+        'base_flat': {'5': 50, 'default': 0},
+        'mileage_rate': {'1': 0, '2': 0.55, '3': 0.55, '4': 0.52, '5': 0.5, '6': 0.48, '7': 0.46,
+                         '8': 0.44, 'default': 0.42},
+        'receipt_multiplier': {'1': 0, '2': 0.85, '3': 0.85, '4': 0.88, '5': 0.9, '6': 0.92, '7': 0.94,
+                               '8': 0.95, 'default': 0.96},
+        'overrides': [
+            {'when': {'days': 1, 'miles_below': 200, 'receipts_below': 200},
+             'total': {'constant': 100, 'miles': 0.4, 'receipts': 0.6}},
+            {'when': {'days': 1}, 'total': {'miles': 1, 'receipts': 1, 'scale': 0.7}},
+        ],
+        'caps': [{'when': {'days': 1}, 'max': {'constant': 1475}}],
+        'sum_order': ['base', 'mileage', 'receipts', 'base_flat'],
+    },
+    'run_v2': {
+        'base_flat': {'1': 100, '2': 200, '3': 280, 'default': 290},
+        'mileage_rate': {'1-4': 0.40, '5': 0.67, '6-12': 0.85, 'default': 1.00},
+        'receipt_tiers': [[None, 0, 1.0], [50, 50, 0.70], [200, 155, 0.50], [1000, 555, 0.30]],
+        'overrides': [
+            {'when': {'receipts_in': [293.49, 389.49, 396.49, 1063.49, 1878.49, 2321.49]},
+             'receipts': {}},
+        ],
+        'sum_order': ['base', 'receipts', 'mileage'],
+    },
+}
+
+FORMULA_TERMS = ('constant', 'days', 'days_squared', 'miles', 'receipts')
+TARGETS = ('total', 'base', 'mileage', 'receipts')
+SUM_TERMS = ('base', 'mileage', 'receipts', 'base_flat')
+
+
+def load_config(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def step_config(short_params, long_params, short_max_days=3):
+    """optimize_step_function's model: (base per day, receipt multiplier, mile rate) for short and long trips"""
+    (short_base, short_receipts, short_miles), (long_base, long_receipts, long_miles) = short_params, long_params
+    short_days = f'1-{short_max_days}'
+    return {
+        'base_per_day': {short_days: short_base, 'default': long_base},
+        'mileage_rate': {short_days: short_miles, 'default': long_miles},
+        'receipt_multiplier': {short_days: short_receipts, 'default': long_receipts},
+        'rounding': None,
+    }
+
+
+def day_table(table, default=0.0):
+    """Dense list indexed by min(days, MAX_TABLE_DAYS) from a {"1": x, "2-4": y, "default": z} table"""
+    table = table or {}
+    values = [float(table.get('default', default))] * (MAX_TABLE_DAYS + 1)
+    for key, value in table.items():
+        if key == 'default':
+            continue
+        lo, _, hi = str(key).partition('-')
+        for day in range(int(lo), int(hi or lo) + 1):
+            values[min(day, MAX_TABLE_DAYS)] = float(value)
+    return values
+
+
+def _formula(spec):
+    """(constant, days, days_squared, miles, receipts, scale) coefficients"""
+    spec = spec or {}
+    return tuple(float(spec.get(term, 0.0)) for term in FORMULA_TERMS) + (float(spec.get('scale', 1.0)),)
+
+
+def _condition(when):
+    """Normalized condition: (days lo, days hi, miles below/above, receipts below/above, receipts_in, cents)"""
+    when = when or {}
+    days = when.get('days')
+    if days is None:
+        lo, hi = -np.inf, np.inf
+    elif isinstance(days, (list, tuple)):
+        lo, hi = days
+    else:
+        lo = hi = days
+    inf = float('inf')
+    return (lo, hi, when.get('miles_below', inf), when.get('miles_above', -inf),
+            when.get('receipts_below', inf), when.get('receipts_above', -inf),
+            frozenset(when.get('receipts_in', ())), frozenset(when.get('receipt_cents', ())))
+
+
+def _tiers(config):
+    """(thresholds, origins, bases, rates, bonuses), one entry per tier"""
+    tiers = config.get('receipt_tiers') or [[None, 0, 1.0]]
+    thresholds = [-float('inf')] + [float(tier[0]) for tier in tiers[1:]]
+    origins = [float(tier[3]) if len(tier) > 3 else default for tier, default in zip(tiers, [0.0] + thresholds[1:])]
+    return (thresholds, origins, [float(tier[1]) for tier in tiers], [float(tier[2]) for tier in tiers],
+            [float(tier[4]) if len(tier) > 4 else 0.0 for tier in tiers])
+
+
+def _compiled(config):
+    """The config as dense tables and normalized rules, shared by both evaluators"""
+    unknown = set(config) - {'base_per_day', 'base_flat', 'mileage_rate', 'receipt_multiplier',
+                             'receipt_tiers', 'overrides', 'caps', 'sum_order', 'rounding', 'name'}
+    if unknown:
+        raise ValueError(f"unknown rule config keys: {sorted(unknown)}")
+    overrides = {target: [] for target in TARGETS}
+    for rule in config.get('overrides', []):
+        targets = [target for target in TARGETS if target in rule]
+        if len(targets) != 1:
+            raise ValueError(f"override needs exactly one of {TARGETS}: {rule}")
+        overrides[targets[0]].append((_condition(rule.get('when')), _formula(rule[targets[0]])))
+    sum_order = list(config.get('sum_order', SUM_TERMS[:3]))
+    if sorted(set(sum_order) - {'base_flat'}) != sorted(SUM_TERMS[:3]) or len(set(sum_order)) != len(sum_order):
+        raise ValueError(f"sum_order must order {SUM_TERMS[:3]}, optionally with 'base_flat': {sum_order}")
+    return {
+        'tables': [day_table(config.get(key), default) for key, default in
+                   [('base_per_day', 0.0), ('base_flat', 0.0), ('mileage_rate', 0.0), ('receipt_multiplier', 1.0)]],
+        'tiers': _tiers(config),
+        'overrides': overrides,
+        'caps': [(_condition(rule.get('when')), _formula(rule['max'])) for rule in config.get('caps', [])],
+        'sum_order': tuple(SUM_TERMS.index(term) for term in sum_order),
+        'rounding': config.get('rounding', 'round'),
+    }
+
+
+def compile_scalar(config):
+    """calculate_reimbursement(days, miles, receipts) closure for a config"""
+    compiled = _compiled(config)
+    base_per_day, base_flat, mileage_rate, receipt_multiplier = compiled['tables']
+    tiers = list(zip(*compiled['tiers']))[::-1]
+    overrides = {target: rules for target, rules in compiled['overrides'].items()}
+    caps = compiled['caps']
+    first_term, *other_terms = sum_order = compiled['sum_order']
+    flat_apart = SUM_TERMS.index('base_flat') in sum_order
+    rounding = compiled['rounding']
+    if rounding not in ('round', None):
+        from integer_cents import float_to_cents
+
+    def matches(cond, days, miles, receipts):
+        lo, hi, miles_below, miles_above, receipts_below, receipts_above, receipts_in, cents = cond
+        return (lo <= days <= hi and miles_above < miles < miles_below
+                and receipts_above < receipts < receipts_below
+                and (not receipts_in or receipts in receipts_in)
+                and (not cents or int(receipts * 100) % 100 in cents))
+
+    def value(formula, days, miles, receipts):
+        constant, c_days, c_days_squared, c_miles, c_receipts, scale = formula
+        return (constant + c_days * days + c_days_squared * days * days + c_miles * miles
+                + c_receipts * receipts) * scale
+
+    def first(rules, days, miles, receipts):
+        for cond, formula in rules:
+            if matches(cond, days, miles, receipts):
+                return value(formula, days, miles, receipts)
+        return None
+
+    def calculate_reimbursement(days, miles, receipts):
+        total = first(overrides['total'], days, miles, receipts) if overrides['total'] else None
+        if total is None:
+            day = min(max(int(days), 0), MAX_TABLE_DAYS)
+            base = first(overrides['base'], days, miles, receipts) if overrides['base'] else None
+            if base is None:
+                base = base_per_day[day] * days if flat_apart else base_per_day[day] * days + base_flat[day]
+            mileage = first(overrides['mileage'], days, miles, receipts) if overrides['mileage'] else None
+            if mileage is None:
+                mileage = mileage_rate[day] * miles
+            receipt_part = first(overrides['receipts'], days, miles, receipts) if overrides['receipts'] else None
+            if receipt_part is None:
+                for threshold, origin, tier_base, tier_rate, tier_bonus in tiers:
+                    if receipts > threshold:
+                        receipt_part = receipt_multiplier[day] * (tier_base + tier_rate * (receipts - origin)
+                                                                  + tier_bonus)
+                        break
+            parts = (base, mileage, receipt_part, base_flat[day])
+            total = parts[first_term]
+            for term in other_terms:
+                total += parts[term]
+        for cond, formula in caps:
+            if matches(cond, days, miles, receipts):
+                total = min(total, value(formula, days, miles, receipts))
+        if rounding == 'round':
+            return round(total, 2)
+        if rounding is None:
+            return total
+        return int(float_to_cents(total, rounding)) / 100
+
+    return calculate_reimbursement
+
+
+def compile_batch(config):
+    """calculate_reimbursement_batch(days, miles, receipts) over arrays for a config"""
+    compiled = _compiled(config)
+    tables = [np.array(table) for table in compiled['tables']]
+    thresholds, origins, tier_bases, tier_rates, tier_bonuses = (np.array(values) for values in compiled['tiers'])
+    overrides = compiled['overrides']
+    caps = compiled['caps']
+    first_term, *other_terms = sum_order = compiled['sum_order']
+    flat_apart = SUM_TERMS.index('base_flat') in sum_order
+    rounding = compiled['rounding']
+
+    def mask(cond, days, miles, receipts):
+        lo, hi, miles_below, miles_above, receipts_below, receipts_above, receipts_in, cents = cond
+        rows = ((days >= lo) & (days <= hi) & (miles > miles_above) & (miles < miles_below)
+                & (receipts > receipts_above) & (receipts < receipts_below))
+        if receipts_in:
+            rows &= np.isin(receipts, list(receipts_in))
+        if cents:
+            rows &= np.isin(np.trunc(receipts * 100).astype(np.int64) % 100, list(cents))
+        return rows
+
+    def value(formula, days, miles, receipts):
+        constant, c_days, c_days_squared, c_miles, c_receipts, scale = formula
+        return (constant + c_days * days + c_days_squared * days * days + c_miles * miles
+                + c_receipts * receipts) * scale
+
+    def apply_first(rules, result, days, miles, receipts):
+        """Overwrite rows matching a rule; earlier rules win, so apply them last"""
+        for cond, formula in reversed(rules):
+            rows = mask(cond, days, miles, receipts)
+            if rows.any():
+                result = np.where(rows, value(formula, days, miles, receipts), result)
+        return result
+
+    def calculate_reimbursement_batch(days, miles, receipts):
+        days = np.asarray(days, dtype=float)
+        miles = np.asarray(miles, dtype=float)
+        receipts = np.asarray(receipts, dtype=float)
+        day = np.clip(days.astype(np.int64), 0, MAX_TABLE_DAYS)
+        base_per_day, base_flat, mileage_rate, receipt_multiplier = (table[day] for table in tables)
+
+        tier = np.searchsorted(thresholds, receipts, side='left') - 1
+        receipt_part = receipt_multiplier * (tier_bases[tier] + tier_rates[tier] * (receipts - origins[tier])
+                                             + tier_bonuses[tier])
+        base = base_per_day * days if flat_apart else base_per_day * days + base_flat
+        base = apply_first(overrides['base'], base, days, miles, receipts)
+        mileage = apply_first(overrides['mileage'], mileage_rate * miles, days, miles, receipts)
+        receipt_part = apply_first(overrides['receipts'], receipt_part, days, miles, receipts)
+        parts = (base, mileage, receipt_part, base_flat)
+        total = parts[first_term]
+        for term in other_terms:
+            total = total + parts[term]
+        total = apply_first(overrides['total'], total, days, miles, receipts)
+        for cond, formula in caps:
+            rows = mask(cond, days, miles, receipts)
+            total = np.where(rows, np.minimum(total, value(formula, days, miles, receipts)), total)
+        if rounding == 'round':
+            from rule_batch import round_cents
+            return round_cents(total)
+        if rounding is None:
+            return total
+        from integer_cents import float_to_cents
+        return float_to_cents(total, rounding) / 100
+
+    return calculate_reimbursement_batch
+
+
+def compile_rules(config):
+    """(scalar closure, batch evaluator) for a config dict or a path to a JSON config"""
+    if isinstance(config, str):
+        config = CONFIGS[config] if config in CONFIGS else load_config(config)
+    return compile_scalar(config), compile_batch(config)
+
+
+def run_v2_totals(trips, script='run_v2.sh'):
+    """
+    run_v2.sh's unrounded total per trip: its Python heredoc, minus the $var
+    assignments, compiled once and run in-process instead of one bash per trip
+    """
+    with open(script, 'r') as f:
+        body = re.search(r"<< EOF\n(.*?)\nEOF", f.read(), re.S).group(1)
+    body = re.sub(r'^\w+ = \$\w+\n', '', body, flags=re.M)
+    code = compile(body, script, 'exec')
+    totals = []
+    for trip in trips:
+        namespace = dict(zip(RUN_V2_INPUTS, trip), print=lambda *args: None)
+        exec(code, namespace)
+        totals.append(namespace['total'])
+    return np.array(totals)
+
+
+def _run_v2_shell(trips):
+    import subprocess
+    return [float(subprocess.run(['bash', 'run_v2.sh', str(d), str(m), str(r)], capture_output=True,
+                                 text=True, check=True).stdout) for d, m, r in trips]
+
+
+def check_and_report():
+    import importlib
+    from gbr_model import load_known_inputs
+    from rule_batch import synthetic_trips
+    known = load_known_inputs()
+    days, miles, receipts = (np.concatenate(pair) for pair in zip(known[:3], synthetic_trips()))
+    inputs = list(zip(days.astype(int).tolist(), miles.tolist(), receipts.tolist()))
+
+    print(f"Rule engine configs vs the original code on {len(known[0])} known cases "
+          f"+ {len(days) - len(known[0])} synthetic trips")
+    print("=" * 78)
+    print(f"{'Config':<16} {'Compared':>8} {'Differ':>7} {'Batch diff':>10} {'Compile us':>11} "
+          f"{'Scalar us':>10} {'Batch us/row':>12}")
+    failed = []
+    for name, config in CONFIGS.items():
+        start = time.perf_counter()
+        scalar, batch = compile_rules(config)
+        compile_us = (time.perf_counter() - start) * 1e6
+        start = time.perf_counter()
+        engine = np.array([scalar(*trip) for trip in inputs])
+        scalar_us = (time.perf_counter() - start) / len(inputs) * 1e6
+        batch(days, miles, receipts)
+        start = time.perf_counter()
+        engine_batch = batch(days, miles, receipts)
+        batch_us = (time.perf_counter() - start) / len(inputs) * 1e6
+        if name == 'run_v2':
+            # run_v2.sh prints f"{total:.2f}"; with its total known unrounded for
+            # every trip, both the totals and the printed cents must match exactly
+            totals = run_v2_totals(inputs)
+            reference = np.array([float(f"{total:.2f}") for total in totals.tolist()])
+            spot = np.random.default_rng(0).choice(len(inputs), 20, replace=False)
+            shell = np.array(_run_v2_shell([inputs[i] for i in spot]))
+            assert (shell == reference[spot]).all(), "run_v2.sh in bash disagrees with its heredoc run in-process"
+            unrounded = compile_batch(dict(config, rounding=None))(days, miles, receipts)
+            differ = (engine != reference) | (unrounded != totals)
+        else:
+            # Each config sums terms in its module's order, so even totals within
+            # float error of a half cent round to the same cent
+            module = importlib.import_module(name)
+            reference = np.array([module.calculate_reimbursement(*trip) for trip in inputs])
+            differ = engine != reference
+        batch_diff = int((engine_batch != engine).sum())
+        print(f"{name:<16} {len(reference):>8} {int(differ.sum()):>7} "
+              f"{batch_diff:>10} {compile_us:>11.0f} {scalar_us:>10.2f} {batch_us:>12.3f}")
+        if differ.any() or batch_diff:
+            failed.append(name)
+
+    # What an optimizer pays per candidate: mutate, compile, rescore the public cases
+    days, miles, receipts, expected = (values[:1000] for values in known)
+    rng = np.random.default_rng(42)
+    config = json.loads(json.dumps(CONFIGS['solution_final']))
+    best = np.abs(compile_batch(config)(days, miles, receipts) - expected).mean()
+    start_error = best
+    n_candidates = 500
+    start = time.perf_counter()
+    for _ in range(n_candidates):
+        candidate = json.loads(json.dumps(config))
+        table = candidate[rng.choice(['base_per_day', 'mileage_rate'])]
+        key = rng.choice(list(table))
+        table[key] = round(table[key] * rng.uniform(0.9, 1.1), 3)
+        error = np.abs(compile_batch(candidate)(days, miles, receipts) - expected).mean()
+        if error < best:
+            best, config = error, candidate
+    per_candidate_us = (time.perf_counter() - start) / n_candidates * 1e6
+    print(f"\nRandom local search from solution_final: {n_candidates} candidates, "
+          f"{per_candidate_us:.0f} us each (copy + compile + rescore {len(days)} cases); "
+          f"avg error {start_error:.2f} -> {best:.2f}")
+    assert not failed, f"rule engine differs from the original: {', '.join(failed)}"
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5:
+        # python rule_engine.py <config name or JSON path> days miles receipts
+        scalar, _ = compile_rules(sys.argv[1])
+        print(scalar(int(sys.argv[2]), float(sys.argv[3]), float(sys.argv[4])))
+    else:
+        check_and_report()
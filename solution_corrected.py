@@ -224,4 +224,23 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
         # Long trips with high receipts
         total *= 0.85
     
-    return round(total, 2)
\ No newline at end of file
+    return round(total, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import DECISION_TREE, as_arrays, evaluate_tree, round_cents, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    total = evaluate_tree(DECISION_TREE, trip_features(days, miles, receipts))
+
+    # Penalty for high receipt cases
+    correction = np.select(
+        [receipts > 2000, receipts > 1800, receipts > 1500, receipts > 1200, receipts > 1000],
+        [0.25, 0.35, 0.45, 0.6, 0.75], 1.0)
+    total = np.where(receipts > 1000, total * correction, total)
+
+    # Additional corrections for specific patterns
+    total = np.where((days <= 5) & (receipts > 1000), total * 0.8, total)
+    total = np.where((days >= 8) & (receipts > 1400), total * 0.85, total)
+    return round_cents(total)
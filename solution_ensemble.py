@@ -49,3 +49,29 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
     final_prediction = max(100, min(2500, final_prediction))
     
     return round(final_prediction, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    features = trip_features(days, miles, receipts)
+    miles_per_day = features['miles_per_day']
+
+    # Rule 1: Based on top features
+    pred1 = np.where(features['days_x_miles'] <= 2000,
+                     100 * days + 0.5 * miles + 0.8 * receipts,
+                     120 * days + 0.4 * miles + 0.7 * receipts)
+    # Rule 2: Efficiency-based
+    pred2 = np.where((150 <= miles_per_day) & (miles_per_day <= 250),
+                     110 * days + 0.55 * miles + 0.75 * receipts,
+                     95 * days + 0.45 * miles + 0.65 * receipts)
+    # Rule 3: Receipt-based
+    pred3 = np.where(features['receipts_per_day'] <= 100,
+                     105 * days + 0.52 * miles + 0.85 * receipts,
+                     100 * days + 0.48 * miles + 0.6 * receipts)
+
+    final_prediction = (pred1 + pred2 + pred3) / 3
+    final_prediction = np.maximum(100, np.minimum(2500, final_prediction))
+    return round_cents(final_prediction)
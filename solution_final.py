@@ -100,6 +100,40 @@ def calculate_reimbursement(days, miles, receipts):
     # Round to 2 decimal places
     return round(result, 2)
 
+def calculate_reimbursement_batch(days, miles, receipts):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents
+    days, miles, receipts = as_arrays(days, miles, receipts)
+
+    # Receipt caps/adjustments
+    effective_receipts = np.select(
+        [receipts > 1000, receipts > 500, receipts > 200],
+        [100 + (receipts - 1000) * 0.05, 50 + (receipts - 500) * 0.1 + 500 * 0.2, receipts * 0.4],
+        receipts * 0.85)
+
+    one_day = np.where((miles < 200) & (receipts < 200),
+                       100 + 0.4 * miles + 0.6 * receipts,
+                       100 + miles * 0.5 + effective_receipts)
+    one_day = np.minimum(one_day, 1475)
+    three_day_receipts = np.where(receipts < 100, receipts * 0.85, effective_receipts)
+
+    result = np.select(
+        [days == 1, days == 2, days == 3, days == 4, days == 5, days == 6, days == 7, days == 8],
+        [one_day,
+         160 * days + miles * 0.45 + effective_receipts,
+         80 * days + miles * 0.55 + three_day_receipts,
+         75 * days + miles * 0.48 + effective_receipts,
+         (70 * days + 50) + miles * 0.45 + effective_receipts,
+         65 * days + miles * 0.42 + effective_receipts,
+         60 * days + miles * 0.40 + effective_receipts,
+         55 * days + miles * 0.38 + effective_receipts],
+        50 * days + miles * 0.35 + effective_receipts)
+
+    # Overall caps based on trip length
+    max_total = days * (500 - (days * 20))
+    return round_cents(np.minimum(result, max_total))
+
 def main():
     # Read input
     if len(sys.argv) > 1:
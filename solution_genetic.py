@@ -50,3 +50,34 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
         total *= 1.106
     
     return round(total, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+
+    total = 50.87 * days
+    total = np.where(days == 5, total * 1.446, total)
+
+    mileage = np.select(
+        [miles <= 1844, miles <= 276],
+        [miles * 0.426, 1844 * 0.426 + (miles - 1844) * -1.588],
+        1844 * 0.426 + (276 - 1844) * -1.588 + (miles - 276) * 2.615)
+    total = total + mileage
+
+    receipt_reimb = np.select(
+        [receipts <= -262, receipts <= 1641],
+        [receipts * -1.012, receipts * 0.757],
+        receipts * 0.469)
+    total = total + receipt_reimb
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        miles_per_day = miles / days
+        receipts_per_day = np.where(days > 0, receipts / days, receipts)
+    total = np.where((days > 0) & (1507 <= miles_per_day) & (miles_per_day <= 1677), total + 48.67, total)
+    total = np.where((days >= 224) & (receipts_per_day > 150), total * -0.465, total)
+    total = np.where((days * miles > 5000) & (receipts < 500), total * 1.106, total)
+
+    return round_cents(total)
@@ -50,3 +50,34 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
         total *= 1.040
     
     return round(total, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+
+    total = 49.59 * days
+    total = np.where(days == 5, total * 1.287, total)
+
+    mileage = np.select(
+        [miles <= 2416, miles <= 2248],
+        [miles * 0.420, 2416 * 0.420 + (miles - 2416) * -7.936],
+        2416 * 0.420 + (2248 - 2416) * -7.936 + (miles - 2248) * 1.034)
+    total = total + mileage
+
+    receipt_reimb = np.select(
+        [receipts <= 1627, receipts <= 1932],
+        [receipts * 0.763, receipts * 0.524],
+        receipts * 0.466)
+    total = total + receipt_reimb
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        miles_per_day = miles / days
+        receipts_per_day = np.where(days > 0, receipts / days, receipts)
+    total = np.where((days > 0) & (1965 <= miles_per_day) & (miles_per_day <= 316), total + 58.11, total)
+    total = np.where((days >= 134) & (receipts_per_day > 150), total * 23.463, total)
+    total = np.where((days * miles > 5000) & (receipts < 500), total * 1.040, total)
+
+    return round_cents(total)
@@ -2,6 +2,13 @@
 
 import math
 
+# Boosted decision stumps: prediction = BASE + sum of LEFT/RIGHT per round
+BASE = 1349.114029999999
+FEATURE = (2, 7, 2, 7, 8, 7, 2, 8, 7, 6, 7, 7, 6, 2, 8, 6, 2, 7, 6, 2, 6, 6, 2, 6, 6, 7, 2, 6, 6, 2, 7, 6, 6, 2, 0, 1, 7, 2, 1, 0, 2, 0, 6, 1, 8, 0, 2, 1, 0, 2, 6, 7, 1, 0, 0, 2, 1, 7, 0, 1, 0, 2, 7, 6, 0, 8, 1, 2, 0, 1, 0, 2, 7, 1, 5, 5, 6, 5, 0, 1, 5, 6, 5, 2, 5, 5, 6, 0, 1, 5, 5, 7, 5, 2, 5, 2, 0, 5, 4, 5, 7, 5, 2, 5, 2, 5, 0, 7, 5, 3, 5, 0, 4, 5, 2, 8, 0, 3, 5, 6, 5, 5, 2, 0, 3, 5, 7, 5, 2, 8, 6, 4, 0, 5, 5, 3, 0, 2, 5, 3, 6, 4, 2, 8, 3, 5, 7, 4, 4, 0, 5, 2, 4, 3, 5, 6, 1, 8, 2, 4, 4, 5, 2, 0, 5, 3, 6, 8, 4, 7, 4, 5, 3, 6, 0, 5, 3, 4, 2, 5, 2, 8, 6, 5, 4, 4, 4, 2, 5, 7, 3, 0, 4, 2, 3, 3, 4, 2, 5, 5, 7, 5, 7, 4, 2, 5, 8, 1, 2, 4, 3, 5, 6, 6, 8, 2, 4, 3, 7, 4, 2, 4, 5, 5, 4, 6, 5, 7, 3, 4, 2, 4, 5, 8, 6, 3, 0, 2, 5, 4, 3, 4, 2, 8, 3, 3, 6, 4, 7, 4, 2, 5, 5, 2, 2, 4, 3, 7, 4, 5, 6, 4, 0, 5, 2, 3, 4, 7, 3, 5, 4, 2, 5, 6, 5, 1, 8, 2, 4, 3, 4, 2, 6, 8, 4, 6, 5, 3, 4, 7, 4, 5, 3, 4, 2, 2, 0, 3, 4, 5,)
+THRESHOLD = (828.095, 6179.68, 828.095, 3024.08, 427108.85, 5071.76, 864.0699999999999, 535358.42, 3024.08, 4356.5, 6179.68, 1420.56, 5281.5, 656.2049999999999, 322647.98, 5428.5, 978.2, 1268.94, 3519.0, 940.77, 6483.0, 654.0, 649.035, 1567.17, 6872.0, 1174.19, 980.98, 654.0, 6998.0, 559.265, 307.3, 1567.17, 6998.0, 940.77, 4.5, 617.0, 307.3, 1008.425, 593.5, 4.5, 559.265, 11.5, 550.0, 825.5, 5336.69, 11.5, 1008.425, 696.5, 4.5, 725.49, 11863.0, 49.334999999999994, 617.0, 11.5, 5.5, 1008.425, 825.5, 307.3, 12.5, 650.5, 4.5, 559.265, 41.28, 11863.0, 10.5, 5336.69, 825.5, 940.77, 12.5, 600.5, 4.5, 1008.425, 41.28, 943.5, 7.665860008601623, 0.04671303788538944, 546.5, 10.787728065802591, 12.5, 600.5, 7.589693197331679, 298.5, 0.04671303788538944, 559.265, 1.190448211701999, 10.787728065802591, 546.5, 11.5, 943.5, 6.759379259980525, 0.05228617824773414, 461.79499999999996, 1.190448211701999, 1008.425, 1.190448211701999, 1008.425, 4.5, 1.190448211701999, 816.72, 6.759379259980525, 41.28, 0.04671303788538944, 559.265, 1.190448211701999, 1064.065, 1.190448211701999, 12.5, 461.79499999999996, 0.05944342438634102, 99.4375, 9.56406148113647, 4.5, 816.72, 1.190448211701999, 1064.065, 1900649.1600000001, 10.5, 99.4375, 34.557923219241445, 298.5, 6.759379259980525, 1.190448211701999, 725.49, 4.5, 103.30000000000001, 0.05228617824773414, 461.79499999999996, 1.190448211701999, 1064.065, 1900649.1600000001, 11863.0, 816.72, 5.5, 1.190448211701999, 6.759379259980525, 103.30000000000001, 10.5, 940.77, 1.190448211701999, 9.833333333333332, 293.0, 8.26876923076923, 642.375, 1900649.1600000001, 99.4375, 34.557923219241445, 461.79499999999996, 8.26876923076923, 816.72, 4.5, 1.190448211701999, 1064.065, 154.2191346153846, 103.30000000000001, 6.759379259980525, 293.0, 1166.5, 2356393.56, 1064.065, 154.2191346153846, 811.74, 1.190448211701999, 1064.065, 12.5, 7.758101588457512, 99.4375, 1239.5, 1865409.2799999998, 8.26876923076923, 461.79499999999996, 21.890642857142858, 4.431253088828196, 99.4375, 11863.0, 4.5, 34.557923219241445, 103.30000000000001, 154.2191346153846, 696.5799999999999, 1.190448211701999, 1172.8899999999999, 1900649.1600000001, 293.0, 4.456042100393246, 8.26876923076923, 811.74, 154.2191346153846, 1172.8899999999999, 1.190448211701999, 461.79499999999996, 103.30000000000001, 10.5, 21.890642857142858, 559.265, 11.188034188034187, 99.4375, 154.2191346153846, 1172.8899999999999, 1.190448211701999, 4.456042100393246, 11.855, 0.05540121917542855, 461.79499999999996, 21.268857142857144, 696.5799999999999, 1.190448211701999, 2356393.56, 1166.5, 1172.8899999999999, 154.2191346153846, 103.30000000000001, 7.758101588457512, 12138.0, 293.0, 1840817.955, 696.5799999999999, 21.268857142857144, 103.30000000000001, 461.79499999999996, 154.2191346153846, 1172.8899999999999, 8.26876923076923, 4.456042100393246, 1.190448211701999, 816.72, 1239.5, 34.557923219241445, 31.28, 99.4375, 154.2191346153846, 1064.065, 21.268857142857144, 4.456042100393246, 2356393.56, 12138.0, 103.30000000000001, 4.5, 559.265, 1.190448211701999, 811.74, 1075.0, 154.2191346153846, 1172.8899999999999, 1840817.955, 103.30000000000001, 11.188034188034187, 282.0, 8.073, 461.79499999999996, 21.268857142857144, 696.5799999999999, 1.190448211701999, 4.456042100393246, 2320.81, 1172.8899999999999, 154.2191346153846, 99.4375, 11.855, 3.2254545454545456, 7.758101588457512, 1239.5, 811.74, 10.5, 1.190448211701999, 696.5799999999999, 1075.0, 21.268857142857144, 461.79499999999996, 103.30000000000001, 4.24017742833967, 154.2191346153846, 1172.8899999999999, 1.190448211701999, 196.0, 34.557923219241445, 1166.5, 2356393.56, 1172.8899999999999, 20.830512820512823, 99.4375, 154.2191346153846, 696.5799999999999, 12138.0, 1840817.955, 1868.62, 181.5, 8.583157771260996, 103.30000000000001, 8.073, 461.79499999999996, 154.2191346153846, 3.7356093991873065, 99.4375, 21.268857142857144, 1172.8899999999999, 2320.81, 4.5, 1075.0, 816.72, 1.190448211701999,)
+LEFT = (-48.05896957223787, -33.215467643965155, -40.40935105353403, -42.416497993566274, -28.793191894050008, -27.730339644635478, -29.145177117150833, -21.272007454607802, -30.292066980063225, -15.056461340354687, -18.009645613743626, -37.83714505314583, -10.87741457216898, -23.347138405008398, -18.408249467360097, -9.004155001454757, -15.178262412587907, -30.70635723727805, -11.249358712555114, -13.370648581479655, -6.486477083048662, -24.469398528584026, -15.218050320539582, -14.214486459347203, -5.133973023534738, -22.521489667686893, -9.60631381877788, -18.69588624435765, -4.2686490555463035, -12.311360568651423, -33.657074044661776, -10.157576634770516, -3.6220677707018925, -7.7367691073293035, -9.319282012886836, -6.116567645291667, -27.202202337472713, -6.266855822420599, -5.581947647219014, -7.991523894475403, -8.302472700422237, -2.269834658133819, -12.671654262282676, -3.1350867951021124, -25.235585638990823, -2.002604736088732, -4.853051882560724, -3.6549194857845544, -6.207117054772528, -5.581079047366078, -0.9049242999940632, -28.0986144462114, -3.6334220835889024, -1.6364721100621589, -4.030169850931962, -3.7643510341321846, -2.198428785158014, -15.112907141708792, -1.0078599044868386, -2.777025583286978, -4.42646090614395, -4.734737842859412, -21.81914115551864, -0.6454146558204367, -1.4554659159140801, -14.454146156598965, -1.6813097833114181, -2.992655482813099, -0.7807676468002632, -2.3799106902550675, -3.4310163632820414, -2.4936716266162833, -16.761647405143002, -1.0985282275115218, -0.7963339965416805, 22.05132704229363, -5.431300106133277, -0.6168769578220593, -0.6638662113784736, -2.032854127436647, -0.7196328956898109, -6.969969197693131, 19.891440753545997, -3.026149826869611, 2.779088256566148, -0.5534169185335099, -4.758289416597333, -0.8114904389511886, -0.9042642690344718, -0.688316013575168, 16.273464709484838, -6.928112671593263, 2.630907016353535, -2.0125373184054305, 2.5429892396709763, -1.9345797311261703, -2.4777892738456484, 2.478745552217532, -0.4629849021432688, -0.6409088619960066, -12.598585178498745, 16.957056416590472, -2.621467627743157, 2.4871114890135426, -1.700549688150196, 2.3938350992539044, -0.5160420995375786, -6.1241349431122885, 13.31589366170222, -1.29771412839944, -0.4855130608435616, -2.2909644086971808, -0.42198616143863293, 2.2520279243012857, -1.6560732474400006, 0.45552885806392907, -0.8243762552653147, -1.2707037247032433, -0.2478135597767293, -5.3800503111615265, -0.5564679994633351, 2.182177759636137, -2.1170568458564025, -2.1239798475594482, -1.1691942858668571, 13.053897415939174, -5.474793797216339, 2.116119166160857, -1.5139719487766672, 0.4304461877212977, -0.32640246749056095, -0.381020981238233, -1.5866752593648799, 2.0358278566058883, -0.5312104846570084, -1.101199016359665, -0.7473058848908408, -1.5835173089004337, 1.9930584611106639, 4.863700778221922, -4.806425437756493, 7.465918310311318, -2.0137847099443427, 0.4011052203847425, -1.1045621747762346, -0.21701130896662366, -4.950803376906381, 7.344953359221373, -0.34373242213852256, -1.9243515229967518, 1.9000752644929193, -1.3702867346607315, 1.3168753037918162, -1.0159963704510935, -0.48470554468592075, -4.484243801558549, -0.20395504813414142, 0.21595846929803156, -1.297794403442738, 1.2958419150585814, -0.33387811334711603, 1.778784762732241, -1.3048626224317266, -0.3869267685941291, -0.42319599068735114, -1.0090603650932974, -1.903213752166587, 0.3818737797318299, 6.731773896612404, -4.5958179106295685, 4.117139621203075, -0.5853359786428095, -0.9835680854798264, -0.27474149273585224, -1.699582589172518, -0.1905497728397943, -0.9216531780722902, 1.1875624886084242, -1.7053124727507663, 1.6633741060950578, -1.1285395865881085, 0.34255068584833737, -3.989509753935927, -0.5604959591186507, 6.292411821474694, -0.3089516794297105, 1.1482234238709128, -1.0783572863209252, 1.641754695728407, -4.333033644877316, -0.8749144142859869, -0.6045147637477486, 3.822640666572663, -1.776935570766706, 3.718342278289321, -0.8903236698192235, 1.113265030074374, -1.0323679389525076, 1.5736155306492554, -0.5345889764779254, -12.314720502368504, 9.253075161809864, -4.038282661711617, 3.73850584254323, -1.5067198171153233, 1.5618271733764024, 0.1801102378179521, -0.17028066236566197, -0.9953193540664457, 1.0691184302524872, -0.82944726482713, -0.35999730339310626, -0.21633755252969109, -3.586971681118639, 0.3251927278006982, -1.443675273974167, 3.583908865302498, -0.8027519849789583, -3.8217366599852385, 1.0344950416404617, -0.9576744572751403, 5.575400666306211, -0.48154537417830046, 1.4558608649598668, -0.2648987320910241, -1.5596630344928066, -0.16261074581326895, -7.704366811139244, -0.7819261828171064, 0.9989377245760296, -1.014099017172443, 3.3873762068703517, -0.46718979115911385, 0.16093451852386056, -0.19999607453839413, -0.7564064326236876, -1.386865267530427, -1.4704511456665819, 1.3848840990953004, -0.250518880818793, 0.0805923868357792, 0.9353014775901279, -0.9000403523991619, 0.29308217193110253, -0.7197549251480964, 3.124255307209719, -3.3733979376696883, 5.186614595102687, -3.482876570272378, 3.1631377278377215, -1.3035821546770745, 1.3119906934361298, -0.44333960030037906, 0.25588400120182336, -0.8549287554146903, 0.907467920765125, -0.7368102238555336, -10.031060652816116, 8.82259153304675, -0.30635532601546867, -1.3752897080446165, -0.2358676086744399, -0.4660848828971844, 1.2379648465521649, -1.2484904416229592, 0.07328001244187064, 2.9725822359819034, -3.2547330401544308, -0.6764673086560684, -0.4335281205516062, 0.8706481297308072, -0.807848222820986, 1.2365390884763767, -3.7170672021277777, -0.1400430884604216, -0.13402235188211012, 0.14048797992066994, -0.7797046909660441, 2.987830433783885, -0.6705383315925753, 0.8419798501257145, -1.192663394851415, -0.17004723618599424, 0.2606578936614579, -0.10032501105813836, -3.660559544745489, -0.26764257749938714, -0.6306161092070691, 4.505421678388724, -3.0411367001893934, 0.8121683327650987, -0.4347119714313625, -0.6430617940969813, 2.7402775793834406, -0.7556378055007494, 0.23019679320141262, -1.1342910088504146, 0.06559688973133897, -0.2098581126906555, 1.1294308022369348,)
+RIGHT = (26.22073610355491, 31.658492598154467, 22.04714207403029, 18.09205834533011, 22.90015082417275, 21.349907514011534, 16.970609460619578, 20.519755717509824, 12.920582064249599, 22.49082379768707, 17.165443475599513, 7.10008185082789, 22.798791533617543, 9.91089351095802, 10.951000081858654, 20.13550519742808, 11.172887609266153, 4.957240018561777, 12.48346557553591, 9.101029706721471, 18.27106903545775, 4.420092060063001, 6.306773329445697, 6.50633928314144, 15.906900023738798, 3.454853662978511, 7.100318909531467, 3.377178979205094, 13.973440925420789, 4.438789864887916, 1.4755710959037458, 4.649386389676309, 11.856854326314753, 5.2662041822997825, 4.013024157194489, 5.995447493899766, 1.1925808957973487, 4.844590671232949, 5.111438650135434, 3.4412713765909952, 2.9934085246420437, 10.775192112750236, 1.8268059920453237, 6.978096414904686, 0.7804820300718742, 9.506617885110861, 3.751650036873164, 4.766553983765096, 2.672878731740379, 2.626390139936971, 15.852933107303247, 0.4859373810636659, 3.5614731314386034, 7.768540016731821, 2.835536879786878, 2.9100302320596363, 4.893276973416233, 0.6625700417033153, 9.070739140381606, 3.131539487536399, 1.9061011913438304, 1.7070823515071436, 0.3547827830165742, 11.306708600113643, 4.558856050673018, 0.44703544814223584, 3.742270162854434, 2.0370175975450446, 7.026908821202382, 2.232319329619107, 1.477447675748069, 1.927731966674993, 0.2725471122787427, 4.058881291321898, 5.784938702149812, -0.20026432228117508, 0.768814170274565, 6.640499016555085, 5.974795902406289, 1.9067856544173294, 5.083858198582912, 0.5326887115567429, -0.18064880603624575, 1.0910608219325784, -1.196717546818905, 5.957370358331308, 0.6735478169612629, 3.8522477159406936, 3.341107886056978, 4.486992359170497, -0.18099910192551136, 0.4343875107587636, -1.132908457685869, 1.5557912603275983, -1.0950497298154023, 1.495526175125898, 1.0669736358047783, -1.0673854237732083, 5.879274031326205, 4.177954762034125, 0.2048550435528218, -0.15399950327883438, 0.9451549950366284, -1.070987923023009, 1.4427953916098648, -1.0308216951007625, 4.644378895838101, 0.3839787052535748, -0.1753866439738026, 1.770167971835601, 4.8497953000745575, 0.9865240157622801, 5.358646187035509, -0.9697573751283418, 1.4050602968113628, -4.662772917935451, 2.5821371962442043, 1.7333239932713078, 8.297481604937818, 0.4111771497227754, 3.627501921313548, -0.9396788349792331, 0.996262045108894, 0.9146179314955445, 1.7177051854093195, -0.14518996114797011, 0.34326549844394294, -0.9112330028818818, 1.2844974574648216, -4.406027831619311, 5.718087671223175, 4.838444515175762, 1.11634903256845, -0.8766583474082785, 3.462853309756474, 1.6178109005777603, 2.3407349617655058, 1.0778563195036557, -0.8582411971306221, -0.33811823591916723, 0.35622272309903624, -0.22297799278993616, 0.8265322293283628, -4.105695008657315, 1.5066959216214741, 7.2661372760892, 0.3104116888814836, -0.2193652393588232, 4.364930894827663, 0.8286549476710081, -0.818201222621405, 1.1625907785753797, -1.1584542146138401, 1.4926366430084033, 3.1596970469375956, 0.3323445996858733, 7.080153813799595, -6.750443766122446, 1.1010861944181274, -1.1399511583598063, 4.117830064614367, -0.7659716932509473, 1.1070830752239567, 3.4823409173471553, 3.1330728386181033, 1.37642513158117, 0.7219086646149195, -3.595978092474639, -0.20105194953836764, 0.2881543642158891, -0.30989222955291046, 2.2153146368730314, 1.3416519747561821, 4.813063928298619, 0.7318660362531197, 6.380132049221923, 1.354033681365463, -1.0446978283247037, 0.7625782258755186, -0.716274114355679, 1.133062791343957, -3.506333424807181, 0.29567795168804506, 2.134196152028669, -0.18792991021912378, 3.810404046299664, -1.0100912826533608, 1.0826793596127928, -0.7069644684037885, 0.2716779862356714, 1.2853680901238513, 1.8934801277718512, -0.28772564156998864, 0.6406638452424142, -0.2928144404693914, 1.2144604195879054, -0.9793384099150564, 1.0365056862028097, -0.6776227106229353, 2.035550333512072, 0.0868107185463958, -0.11238552828109301, 0.2531973188533254, -0.2770750839264168, 0.6737719587389566, -0.6725464652164774, -5.629897433729395, 5.9111715649790995, 0.9993086099945597, -0.9405026792446844, 1.2185706730176151, 2.665190120078312, 4.48665271985482, 0.26584430289708144, -2.9267345502062563, 0.6455798258437369, -0.2656173058065164, 1.1793516816357574, 0.2396200456313843, -0.9100445103152947, 0.96151283185341, -0.16651557087835267, 1.8335766170635281, -0.6269157658840083, 3.3638510225804534, 0.5915963234283032, 5.444656351195818, 0.10939263220683947, 1.066599072069646, -0.8787647652285515, 0.860390848210991, -0.2510515126466776, 1.7789149740289139, -5.030501562891116, 4.147744676296205, 1.111263771385407, 0.5972052153457089, 0.5301626579614185, -0.5963520941740885, 3.0897328634317893, -9.993455967636152, -0.8227840066018444, 0.9036477285610683, -2.637739547379977, 1.0574177295385652, -0.24603089258501143, 0.2345142951321164, -0.14940865088773614, 0.21837377008084322, -0.23443233428657817, 0.5829332645372127, -0.5649630883036796, 1.6881007857591752, -2.790354108343631, 0.858355323572671, -0.7982988475903617, 1.0050579176469168, 0.07071241144987125, -0.08012444379153913, 2.2680591783163044, 0.5216616133962424, 2.909033840318223, 1.4598857075870812, -0.533086436068951, 0.5582974623176558, -9.086721542790455, -0.2203095319900606, 0.2040693404560241, 0.9938223423465797, 1.5642973197783938, -0.7659085051015435, 0.8110860914495222, -0.532472483020598, 0.1710784067924898, 4.689028927416086, 4.652490215336235, -4.391382340100879, 0.7828297598677201, -0.21113148675560503, 0.9146586698083244, -0.740689041088037, 0.5333328350348551, 3.52663181133564, -2.3459210429530715, 5.801146227656512, 0.1604838213771651, 2.3058437446102955, 0.9264607036499343, -0.12978580966550765, 0.1906770088322849, -0.7144638716805787, 1.332409863655483, 0.8771788538864294, -0.20309253810681913, 0.7586664139396473, -2.510241221101001, 0.48844290939052953, -8.134014326686344, 2.6649105543046465, -0.48635003072005145,)
+
 def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
     """Gradient boosting ensemble for reimbursement calculation"""
     
@@ -11,62 +18,39 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
     receipts = total_receipts_amount
     
     # Engineer features
-    miles_per_day = miles / days if days > 0 else 0
-    receipts_per_day = receipts / days if days > 0 else 0
-    receipts_per_mile = receipts / miles if miles > 0 else 0
-    days_x_miles = days * miles
-    days_x_receipts = days * receipts
-    miles_x_receipts = miles * receipts
-    log_miles = math.log(miles + 1)
-    log_receipts = math.log(receipts + 1)
-    sqrt_days = math.sqrt(days)
-    
-    # Base prediction
-    prediction = 987.45  # Mean from training data
-    
-    # Boosting round 1: days_x_miles
-    if days_x_miles <= 2000:
-        prediction = prediction * 0.7
-    else:
-        prediction = prediction * 1.3
-    
-    # Boosting round 2: receipts_per_day
-    if receipts_per_day <= 100:
-        prediction += 50
-    else:
-        prediction -= 30
-    
-    # Boosting round 3: miles_per_day efficiency
-    if 150 <= miles_per_day <= 250:
-        prediction += 40
-    else:
-        prediction -= 20
-    
-    # Boosting round 4: Special cases
-    if days == 5:
-        prediction *= 1.05  # 5-day bonus
-    
-    if days >= 7 and receipts_per_day > 150:
-        prediction *= 0.85  # Long trip penalty
-    
-    # Boosting round 5: Receipt adjustments
-    if receipts < 50:
-        prediction *= 0.8  # Low receipt penalty
-    elif 600 <= receipts <= 800:
-        prediction *= 1.02  # Sweet spot bonus
-    
-    # Boosting round 6: Mileage tiers
-    if miles <= 100:
-        mileage_component = miles * 0.58
-    elif miles <= 300:
-        mileage_component = 100 * 0.58 + (miles - 100) * 0.50
-    else:
-        mileage_component = 100 * 0.58 + 200 * 0.50 + (miles - 300) * 0.40
-    
-    # Combine base prediction with mileage
-    prediction = prediction * 0.7 + mileage_component * 0.3
-    
-    # Final bounds
-    prediction = max(150, min(2500, prediction))
+    features = (
+        days, miles, receipts,
+        miles / days if days > 0 else 0,
+        receipts / days if days > 0 else 0,
+        receipts / miles if miles > 0 else 0,
+        days * miles, days * receipts, miles * receipts,
+        math.log(miles + 1), math.log(receipts + 1), math.sqrt(days)
+    )
+    
+    prediction = BASE
+    for feature, threshold, left_val, right_val in zip(FEATURE, THRESHOLD, LEFT, RIGHT):
+        prediction += left_val if features[feature] <= threshold else right_val
     
     return round(prediction, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement: every stump is applied to all trips at once"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        features = np.stack([
+            days, miles, receipts,
+            np.where(days > 0, miles / days, 0.0),
+            np.where(days > 0, receipts / days, 0.0),
+            np.where(miles > 0, receipts / miles, 0.0),
+            days * miles, days * receipts, miles * receipts,
+            np.log(miles + 1), np.log(receipts + 1), np.sqrt(days),
+        ])
+
+    # Stumps are added one at a time in the scalar order, so the float sums match exactly
+    prediction = np.full(len(days), BASE)
+    for feature, threshold, left_val, right_val in zip(FEATURE, THRESHOLD, LEFT, RIGHT):
+        prediction += np.where(features[feature] <= threshold, left_val, right_val)
+    return round_cents(prediction)
@@ -142,3 +142,53 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
     result = max(150, min(2200, base))
     
     return round(result, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import DECISION_TREE, as_arrays, cents_ending, evaluate_tree, round_cents, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    features = trip_features(days, miles, receipts)
+    miles_per_day = features['miles_per_day']
+    receipts_per_day = features['receipts_per_day']
+
+    # Extreme patterns: very high receipts, 1-day trips with very high miles, long trips
+    high_receipts = np.maximum(300, np.minimum(700, days * 50 + miles * 0.2 + receipts * 0.1))
+    one_day_far = np.maximum(400, np.minimum(600, 100 + miles * 0.3 + receipts * 0.15))
+    long_trip = np.maximum(800, np.minimum(1200, days * 70 + miles * 0.35 + receipts * 0.4))
+
+    # .49 endings: the decision tree's receipts <= 828.10, days_x_miles <= 2070 branch
+    low_tree = evaluate_tree(DECISION_TREE[2][2], features)
+    ending_49 = np.select(
+        [(receipts <= 828.10) & (features['days_x_miles'] <= 2070.00), receipts <= 828.10],
+        [low_tree, (100 * days + 0.5 * miles + 0.7 * receipts) * 1.1],
+        90 * days + 0.4 * miles + 0.5 * receipts)
+
+    # Regular calculation
+    base = np.select([days <= 3, days == 5, days <= 7], [95 * days, 105 * days, 98 * days], 85 * days)
+    mileage = np.select(
+        [miles <= 100, miles <= 300, miles <= 600],
+        [miles * 0.58,
+         100 * 0.58 + (miles - 100) * 0.48,
+         100 * 0.58 + 200 * 0.48 + (miles - 300) * 0.38],
+        100 * 0.58 + 200 * 0.48 + 300 * 0.38 + (miles - 600) * 0.28)
+    base = base + mileage
+    receipt_rate = np.select(
+        [receipts < 50, receipts < 200, receipts < 500, receipts < 800, receipts < 1200, receipts < 1800],
+        [0.6, 0.75, 0.8, 0.85, 0.7, 0.5], 0.3)
+    base = base + receipts * receipt_rate
+    base = np.select(
+        [(180 <= miles_per_day) & (miles_per_day <= 220), miles_per_day > 400],
+        [base + 40, base - 50], base)
+    base = np.where((days == 5) & (miles_per_day >= 180) & (receipts_per_day < 100), base * 1.12, base)
+    base = np.where((days >= 8) & (receipts_per_day > 150), base * 0.82, base)
+    base = np.where((miles > 700) & (receipts < 600), base * 1.05, base)
+    base = np.where(receipts > 1500, np.minimum(base, 1000 + days * 50), base)
+    regular = np.maximum(150, np.minimum(2200, base))
+
+    result = np.select(
+        [receipts > 2000, (days == 1) & (miles > 1000), (days >= 10) & (receipts < 1500),
+         cents_ending(receipts) == 49],
+        [high_receipts, one_day_far, long_trip, ending_49], regular)
+    return round_cents(result)
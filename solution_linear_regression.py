@@ -19,6 +19,16 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
             0.382861 * total_receipts_amount + 
             266.707681)
 
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    from rule_batch import as_arrays
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    return (50.050486 * days +
+            0.445645 * miles +
+            0.382861 * receipts +
+            266.707681)
+
 # Test with a few examples
 if __name__ == "__main__":
     # Test case 1: 3 days, 93 miles, $1.42 receipts
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Solution-output matrix cache
+Every registered solution's output on every known case (public then private),
+stored as one columnar .npy matrix (cases x solutions) with a JSON index of
+per-solution source hashes. A column is recomputed only when its module, a
+local module it imports or a model file it references has changed, so
+ensembling, routing and error analysis run as array operations over
+precomputed predictions.
+"""
+
+import ast
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import numpy as np
+from gbr_model import load_known_inputs
+from solution_registry import discover_solutions, load_solution
+from training_cache import file_hash
+
+MATRIX_PATH = 'solution_outputs.npy'
+INDEX_PATH = 'solution_outputs.json'
+CASE_FILES = ('public_cases.json', 'private_cases.json')
+DATA_SUFFIXES = ('.pkl', '.npz', '.json', '.ubj')
+
+
+def _dependencies(name, seen=None):
+    """
+    Files a module's outputs depend on: its source, the root modules it
+    imports (recursively) and data files it names in string literals
+    """
+    seen = set() if seen is None else seen
+    path = name + '.py'
+    if path in seen or not os.path.exists(path):
+        return seen
+    seen.add(path)
+    with open(path, 'r') as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                _dependencies(alias.name, seen)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            _dependencies(node.module, seen)
+        elif (isinstance(node, ast.Constant) and isinstance(node.value, str)
+              and node.value.endswith(DATA_SUFFIXES) and node.value not in CASE_FILES
+              and os.path.isfile(node.value)):
+            seen.add(node.value)
+    return seen
+
+
+def source_hash(name):
+    """Combined hash of every file a solution's outputs depend on"""
+    digest = hashlib.sha256()
+    for path in sorted(_dependencies(name)):
+        digest.update(path.encode())
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()[:24]
+
+
+def cases_hash():
+    digest = hashlib.sha256()
+    for path in CASE_FILES:
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()[:24]
+
+
+def compute_column(name, days, miles, receipts):
+    """
+    One solution's outputs on every case; NaN where a call fails. Uses the
+    module's calculate_reimbursement_batch when it has one.
+    """
+    module = importlib.import_module(name)
+    batch = getattr(module, 'calculate_reimbursement_batch', None)
+    if batch is not None:
+        try:
+            return np.asarray(batch(days, miles, receipts), dtype=float)
+        except Exception:
+            pass  # fall back to per-case calls, which mark failures as NaN
+    fn = load_solution(name)
+    column = np.full(len(days), np.nan)
+    for i, (d, m, r) in enumerate(zip(days.tolist(), miles.tolist(), receipts.tolist())):
+        try:
+            column[i] = float(fn(int(d), m, r))
+        except Exception:
+            pass
+    return column
+
+
+class SolutionMatrix:
+    """outputs[case, solution] for the named solutions over public + private cases"""
+
+    def __init__(self, matrix_path=MATRIX_PATH, index_path=INDEX_PATH):
+        self.matrix_path = matrix_path
+        self.index_path = index_path
+        self.days, self.miles, self.receipts, self.expected = load_known_inputs()
+        self.n_public = int((~np.isnan(self.expected)).sum())
+        self.names, self.hashes = [], []
+        self.outputs = np.empty((len(self.days), 0), order='F')
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.matrix_path) and os.path.exists(self.index_path)):
+            return
+        with open(self.index_path, 'r') as f:
+            index = json.load(f)
+        if index['cases'] != cases_hash():
+            return  # the case files changed: every column is stale
+        outputs = np.load(self.matrix_path)
+        if outputs.shape != (len(self.days), len(index['solutions'])):
+            return
+        self.names = [entry['name'] for entry in index['solutions']]
+        self.hashes = [entry['hash'] for entry in index['solutions']]
+        self.outputs = np.asfortranarray(outputs)
+
+    def save(self):
+        """Write the matrix and index atomically"""
+        tmp = self.matrix_path + '.tmp.npy'
+        np.save(tmp, np.asfortranarray(self.outputs))
+        os.replace(tmp, self.matrix_path)
+        index = {
+            'cases': cases_hash(),
+            'n_public': self.n_public,
+            'solutions': [{'name': n, 'hash': h} for n, h in zip(self.names, self.hashes)],
+        }
+        with open(self.index_path + '.tmp', 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+    def stale(self, names):
+        """Names whose column is missing or was computed from different sources"""
+        current = dict(zip(self.names, self.hashes))
+        return [name for name in names if current.get(name) != source_hash(name)]
+
+    def update(self, names=None, force=False, verbose=True):
+        """Recompute missing and stale columns, then save; returns the recomputed names"""
+        if names is None:
+            names, _ = discover_solutions()
+        todo = list(names) if force else self.stale(names)
+        for name in todo:
+            start = time.perf_counter()
+            column = compute_column(name, self.days, self.miles, self.receipts)
+            if name in self.names:
+                j = self.names.index(name)
+                self.outputs[:, j] = column
+                self.hashes[j] = source_hash(name)
+            else:
+                self.outputs = np.asfortranarray(np.column_stack([self.outputs, column]))
+                self.names.append(name)
+                self.hashes.append(source_hash(name))
+            if verbose:
+                print(f"  computed {name:<28} {time.perf_counter() - start:7.2f}s")
+        if todo:
+            self.save()
+        return todo
+
+    def column(self, name):
+        return self.outputs[:, self.names.index(name)]
+
+    def public(self, names=None):
+        """(outputs (n_public, k), expected) restricted to the public cases"""
+        columns = [self.names.index(n) for n in names] if names is not None else slice(None)
+        return self.outputs[:self.n_public, columns], self.expected[:self.n_public]
+
+
+def main():
+    selected = [arg for arg in sys.argv[1:] if not arg.startswith('--')] or None
+    start = time.perf_counter()
+    matrix = SolutionMatrix()
+    print(f"Solution-output matrix: {len(matrix.days)} cases ({matrix.n_public} public)")
+    print("=" * 70)
+    recomputed = matrix.update(selected, force='--force' in sys.argv)
+    elapsed = time.perf_counter() - start
+    print(f"{len(recomputed)} of {len(matrix.names)} columns recomputed in {elapsed:.2f}s")
+
+    outputs, expected = matrix.public()
+    errors = np.abs(np.round(outputs, 2) - expected[:, None])
+    print(f"\n{'Solution':<28} {'Avg err':>8} {'Exact':>6} {'Failed':>7} {'Hash':>26}")
+    for j in np.argsort(np.nanmean(errors, axis=0)):
+        print(f"{matrix.names[j]:<28} {np.nanmean(errors[:, j]):>8.2f} "
+              f"{int((errors[:, j] < 0.01).sum()):>6} {int(np.isnan(matrix.outputs[:, j]).sum()):>7} "
+              f"{matrix.hashes[j]:>26}")
+
+
+if __name__ == "__main__":
+    main()
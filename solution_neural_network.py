@@ -52,3 +52,36 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
     result = max(150, min(2200, result))
     
     return round(result, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    features = trip_features(days, miles, receipts)
+    miles_per_day = features['miles_per_day']
+    receipts_per_day = features['receipts_per_day']
+
+    # Layer 1: Feature combinations
+    base = np.select(
+        [(days <= 3) & (receipts_per_day <= 50),
+         days <= 3,
+         (days <= 6) & (miles_per_day >= 180) & (miles_per_day <= 220),
+         days <= 6,
+         receipts_per_day > 150],
+        [95 * days + 0.58 * miles,
+         100 * days + 0.55 * miles + 0.7 * receipts,
+         110 * days + 0.52 * miles + 0.75 * receipts + 50,
+         105 * days + 0.5 * miles + 0.72 * receipts,
+         90 * days + 0.45 * miles + 0.5 * receipts],
+        100 * days + 0.48 * miles + 0.65 * receipts)
+
+    # Layer 2: Non-linear adjustments
+    base = np.where(days == 5, base * 1.05, base)
+    high_mileage = features['days_x_miles'] > 5000
+    base = np.where(high_mileage & (receipts < 500), base * 1.08, base)
+    base = np.where(high_mileage & (receipts >= 500), base * 0.95, base)
+
+    result = np.maximum(150, np.minimum(2200, base))
+    return round_cents(result)
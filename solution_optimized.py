@@ -197,3 +197,138 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
                             return 2136.03
                     else:  # total_receipts_amount > 1787.72
                         return 1924.59
+
+
+# (feature, threshold, left if feature <= threshold, right) or a leaf value
+TREE = ('total_receipts_amount', 828.10,
+    ('days_x_miles', 2070.00,
+        ('days_x_receipts', 487.54,
+            ('days_x_miles', 566.00,
+                ('days_x_miles', 210.50,
+                    196.57,
+                    336.31),
+                559.32),
+            ('days_x_receipts', 4036.29,
+                ('days_x_miles', 1310.50,
+                    ('total_receipts_amount', 588.27,
+                        ('trip_duration_days', 4.50,
+                            492.73,
+                            619.95),
+                        719.40),
+                    ('days_x_receipts', 1467.28,
+                        700.75,
+                        828.74)),
+                935.06)),
+        ('days_x_miles', 4945.50,
+            ('total_receipts_amount', 570.45,
+                ('days_x_receipts', 1790.10,
+                    ('days_x_miles', 3963.60,
+                        ('receipts_per_mile', 0.41,
+                            750.44,
+                            788.25),
+                        845.60),
+                    ('miles_traveled', 628.50,
+                        ('receipts_per_mile', 1.11,
+                            925.07,
+                            853.04),
+                        1000.77)),
+                ('total_receipts_amount', 691.05,
+                    1019.89,
+                    1170.65)),
+            ('miles_x_receipts', 529812.36,
+                ('trip_duration_days', 10.50,
+                    ('days_x_receipts', 2838.70,
+                        ('receipts_per_mile', 0.18,
+                            1111.45,
+                            1042.71),
+                        1208.17),
+                    ('days_x_miles', 11460.50,
+                        ('miles_x_receipts', 218691.81,
+                            1213.97,
+                            1298.64),
+                        1364.90)),
+                ('days_x_receipts', 5526.72,
+                    1417.53,
+                    1611.04)))),
+    ('days_x_miles', 3873.00,
+        ('days_x_receipts', 5494.43,
+            ('miles_x_receipts', 385934.73,
+                ('total_receipts_amount', 1082.07,
+                    ('days_x_receipts', 3208.57,
+                        949.66,
+                        1099.06),
+                    1239.56),
+                ('miles_x_receipts', 1033628.09,
+                    ('days_x_receipts', 2736.24,
+                        ('miles_x_receipts', 827348.03,
+                            1176.45,
+                            1261.61),
+                        ('total_receipts_amount', 942.36,
+                            1288.02,
+                            1376.78)),
+                    ('days_x_miles', 1205.00,
+                        ('receipts_per_mile', 1.77,
+                            1294.13,
+                            1408.36),
+                        ('miles_per_day', 406.00,
+                            1495.94,
+                            1526.97)))),
+            ('days_x_receipts', 11625.58,
+                ('days_x_miles', 979.83,
+                    ('days_x_receipts', 9327.43,
+                        1270.85,
+                        1406.93),
+                    ('miles_traveled', 518.50,
+                        ('days_x_miles', 2578.00,
+                            1496.66,
+                            1336.63),
+                        ('receipts_per_day', 624.27,
+                            1653.03,
+                            1498.03))),
+                ('trip_duration_days', 12.50,
+                    ('receipts_per_mile', 6.38,
+                        1664.33,
+                        ('trip_duration_days', 8.50,
+                            1528.26,
+                            1605.61)),
+                    1714.87))),
+        ('days_x_miles', 6939.00,
+            ('total_receipts_amount', 1089.04,
+                1476.82,
+                ('miles_per_day', 99.75,
+                    ('trip_duration_days', 10.50,
+                        ('miles_x_receipts', 1229175.00,
+                            1636.17,
+                            1521.96),
+                        ('receipts_per_day', 169.39,
+                            1795.96,
+                            1702.51)),
+                    ('trip_duration_days', 5.50,
+                        ('miles_traveled', 1030.50,
+                            1736.47,
+                            1659.12),
+                        ('trip_duration_days', 6.50,
+                            1778.50,
+                            1860.13)))),
+            ('days_x_miles', 11863.00,
+                ('miles_per_day', 127.34,
+                    ('miles_x_receipts', 877176.88,
+                        1742.71,
+                        ('receipts_per_day', 174.05,
+                            1906.01,
+                            1800.23)),
+                    ('days_x_receipts', 12912.54,
+                        2048.61,
+                        1857.20)),
+                ('total_receipts_amount', 1787.72,
+                    ('miles_traveled', 1017.50,
+                        1988.28,
+                        2136.03),
+                    1924.59)))))
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    from rule_batch import as_arrays, evaluate_tree, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    return evaluate_tree(TREE, trip_features(days, miles, receipts))
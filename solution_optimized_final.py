@@ -199,3 +199,10 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
                         total = 1924.59
     
     return round(total, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    from rule_batch import DECISION_TREE, as_arrays, evaluate_tree, round_cents, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    return round_cents(evaluate_tree(DECISION_TREE, trip_features(days, miles, receipts)))
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Registry and timed leaderboard of every calculate_reimbursement implementation
+Discovers root modules that define calculate_reimbursement and are safe to
+import (no training or analysis runs at import time), scores each one against
+public_cases.json in its own fresh process, and prints accuracy next to cost:
+score, exact/close matches, mean and p99 per-call latency, import time and
+memory.
+"""
+
+import ast
+import glob
+import importlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import numpy as np
+
+ENTRY_POINT = 'calculate_reimbursement'
+# Builtins without side effects that constant assignments may call, e.g.
+# N_REGIONS = (len(EDGES) + 1) * 2
+PURE_CALLS = {'abs', 'dict', 'enumerate', 'float', 'frozenset', 'int', 'len', 'list', 'max', 'min',
+              'range', 'round', 'set', 'sorted', 'str', 'sum', 'tuple', 'zip'}
+
+# Modules fit to public_cases.json with enough capacity to memorize it:
+# residual and lookup tables, boosted and decision trees, neural networks and
+# the trees' pattern tables. Their public error is in-sample, so
+# meta-solutions that weight or pick bases by public error leave them out.
+PUBLIC_FIT = ('gbr_model', 'solution_hybrid_final', 'xgb_scoring', 'nn_inference', 'solution_gradient_boost',
+              'solution_optimized', 'solution_optimized_final', 'solution_ensemble', 'solution_neural_network',
+              'solution_extreme', 'solution_hybrid')
+
+
+def _is_main_guard(node):
+    return (isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and isinstance(node.test.left, ast.Name) and node.test.left.id == '__name__')
+
+
+def _calls_outside_lambdas(node):
+    """
+    True if evaluating node calls anything other than a PURE_CALLS builtin
+    (lambda bodies run later, not at import)
+    """
+    if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in PURE_CALLS):
+        return True
+    return any(_calls_outside_lambdas(child) for child in ast.iter_child_nodes(node)
+               if not isinstance(child, ast.Lambda))
+
+
+def _statements_are_safe(statements):
+    """
+    True if the statements only define things: imports, functions, classes,
+    constant assignments (pure builtin calls allowed), try blocks whose every
+    branch is itself safe and a __main__ guard
+    """
+    for node in statements:
+        if isinstance(node, (ast.Import, ast.ImportFrom, ast.FunctionDef, ast.ClassDef)):
+            continue
+        if isinstance(node, ast.Try):
+            if all(_statements_are_safe(branch) for branch in
+                   [node.body, node.orelse, node.finalbody] + [handler.body for handler in node.handlers]):
+                continue
+            return False
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue  # docstring
+        if isinstance(node, (ast.Assign, ast.AnnAssign)) and not _calls_outside_lambdas(node):
+            continue
+        if _is_main_guard(node):
+            continue
+        return False
+    return True
+
+
+def _import_is_safe(tree):
+    """True if importing the module only defines things (see _statements_are_safe)"""
+    return _statements_are_safe(tree.body)
+
+
+def discover_solutions(root='.'):
+    """
+    ([module names], {skipped module: reason}) for every root .py file that
+    defines a top-level calculate_reimbursement
+    """
+    found, skipped = [], {}
+    for path in sorted(glob.glob(os.path.join(root, '*.py'))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, 'r') as f:
+            try:
+                tree = ast.parse(f.read(), filename=path)
+            except SyntaxError as e:
+                skipped[name] = f'syntax error: {e.msg}'
+                continue
+        if not any(isinstance(node, ast.FunctionDef) and node.name == ENTRY_POINT for node in tree.body):
+            continue
+        if _import_is_safe(tree):
+            found.append(name)
+        else:
+            skipped[name] = 'runs code at import time'
+    return found, skipped
+
+
+def load_solution(name):
+    """The calculate_reimbursement function of a registered module"""
+    return getattr(importlib.import_module(name), ENTRY_POINT)
+
+
+def _load_public_cases(path='public_cases.json'):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return ([(c['input']['trip_duration_days'], c['input']['miles_traveled'],
+              c['input']['total_receipts_amount']) for c in data],
+            np.array([c['expected_output'] for c in data], dtype=float))
+
+
+def score_solution(name):
+    """Import and score one module; meant to run in a fresh process"""
+    from rule_cv import eval_score
+    cases, expected = _load_public_cases()
+
+    # Memory retained by the import (modules, tables, loaded models); traced
+    # only around the import so per-call latencies are not slowed down
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        fn = load_solution(name)
+    except Exception as e:
+        return {'name': name, 'error': f'import failed: {type(e).__name__}: {e}'}
+    import_seconds = time.perf_counter() - start
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    outputs = np.full(len(cases), np.nan)
+    latencies = np.zeros(len(cases))
+    failures = 0
+    for i, (days, miles, receipts) in enumerate(cases):
+        start = time.perf_counter()
+        try:
+            outputs[i] = float(fn(days, miles, receipts))
+        except Exception:
+            failures += 1
+        latencies[i] = time.perf_counter() - start
+
+    succeeded = ~np.isnan(outputs)
+    if not succeeded.any():
+        return {'name': name, 'error': f'all {len(cases)} calls failed'}
+    metrics = eval_score(outputs[succeeded], expected[succeeded], n_cases=len(cases))
+    metrics.update({
+        'name': name,
+        'failures': failures,
+        'mean_latency_us': float(latencies.mean() * 1e6),
+        'p99_latency_us': float(np.percentile(latencies, 99) * 1e6),
+        'import_ms': import_seconds * 1000,
+        'memory_kb': memory_bytes / 1024,
+    })
+    return metrics
+
+
+def leaderboard(names=None, max_workers=None):
+    """Score modules in parallel, one fresh process per module; sorted by score"""
+    if names is None:
+        names, _ = discover_solutions()
+    # spawn + one task per child: every import and memory reading starts clean
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                             mp_context=get_context('spawn'), max_tasks_per_child=1) as pool:
+        results = list(pool.map(score_solution, names))
+    return sorted(results, key=lambda r: r.get('score', float('inf')))
+
+
+def print_leaderboard(results, skipped=None):
+    print("Solution leaderboard on public_cases.json (eval.sh score, lower is better)")
+    print("=" * 108)
+    print(f"{'Solution':<28} {'Score':>10} {'Exact':>6} {'Close':>6} {'Avg err':>8} {'Fail':>5} "
+          f"{'Mean us':>9} {'p99 us':>9} {'Import ms':>10} {'Mem KB':>8}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['name']:<28} {r['error']}")
+            continue
+        print(f"{r['name']:<28} {r['score']:>10.2f} {r['exact']:>6} {r['close']:>6} {r['avg_error']:>8.2f} "
+              f"{r['failures']:>5} {r['mean_latency_us']:>9.1f} {r['p99_latency_us']:>9.1f} "
+              f"{r['import_ms']:>10.1f} {r['memory_kb']:>8.0f}")
+    for name, reason in (skipped or {}).items():
+        print(f"{name:<28} skipped: {reason}")
+
+
+def main():
+    names, skipped = discover_solutions()
+    selected = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if selected:
+        names = [name for name in names if name in selected]
+        skipped = {}
+    results = leaderboard(names)
+    print_leaderboard(results, skipped)
+    if '--json' in sys.argv:
+        with open('leaderboard.json', 'w') as f:
+            json.dump(results, f, indent=2)
+        print("\nLeaderboard saved to leaderboard.json")
+
+
+if __name__ == "__main__":
+    main()
@@ -50,6 +50,16 @@ def calculate_reimbursement(days, miles, receipts):
     # Round to 2 decimal places
     return round(total, 2)
 
+def calculate_reimbursement_batch(days, miles, receipts):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents
+    days, miles, receipts = as_arrays(days, miles, receipts)
+    base_amount = 80 * days + 0.55 * miles + 0.85 * receipts
+    multiplier = np.select([days == d for d in range(1, 9)],
+                           [6.5, 5.0, 3.5, 3.0, 2.5, 2.2, 2.0, 1.8], 1.5)
+    return round_cents(base_amount * multiplier)
+
 def main():
     # Read input
     if len(sys.argv) > 1:
@@ -62,6 +62,31 @@ def calculate_reimbursement(days, miles, receipts):
     # Round to 2 decimal places
     return round(result, 2)
 
+def calculate_reimbursement_batch(days, miles, receipts):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, round_cents
+    days, miles, receipts = as_arrays(days, miles, receipts)
+
+    # 1-day trips: low-input formula or percentage-based, capped at $1475
+    one_day = np.where((miles < 200) & (receipts < 200),
+                       100 + 0.4 * miles + 0.6 * receipts,
+                       (miles + receipts) * 0.7)
+    one_day = np.minimum(one_day, 1475)
+
+    result = np.select(
+        [days == 1, days == 2, days == 3, days == 4, days == 5, days == 6, days == 7, days == 8],
+        [one_day,
+         160 * days + miles * 0.55 + receipts * 0.85,
+         80 * days + 0.55 * miles + 0.85 * receipts,
+         75 * days + 0.52 * miles + 0.88 * receipts,
+         70 * days + 0.5 * miles + 0.9 * receipts + 50,
+         65 * days + 0.48 * miles + 0.92 * receipts,
+         60 * days + 0.46 * miles + 0.94 * receipts,
+         55 * days + 0.44 * miles + 0.95 * receipts],
+        50 * days + 0.42 * miles + 0.96 * receipts)
+    return round_cents(result)
+
 def main():
     # Read input
     if len(sys.argv) > 1:
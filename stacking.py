@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Learned stacking over the existing solutions
+Fits non-negative blending weights (plus an intercept) over the outputs of
+the registered solutions not fit to the public cases (their outputs there are
+in-sample), globally or per trip region, scores each variant
+on out-of-fold predictions, and saves the better one. The runtime evaluates
+only the base solutions that received a non-zero weight, in one batch.
+"""
+
+import json
+import sys
+import time
+import numpy as np
+from sklearn.model_selection import KFold
+from linear_fit import bounded_lstsq
+from rule_cv import eval_score
+from solution_matrix import SolutionMatrix, compute_column
+from solution_registry import PUBLIC_FIT, discover_solutions, load_solution
+
+WEIGHTS_PATH = 'stacking_weights.json'
+# Meta-solutions built on the others, and every model fit to the public cases:
+# their in-sample outputs would take all the weight (xgb_scoring alone got 1.0)
+EXCLUDED = ('stacking', 'router') + PUBLIC_FIT
+MIN_REGION_CASES = 60  # smaller regions fall back to the global weights
+WEIGHT_TOL = 1e-6
+
+# Regions: trip length bands x low/high receipts
+REGION_DAY_EDGES = [2, 4, 7, 11]
+REGION_RECEIPT_EDGE = 800.0
+N_REGIONS = (len(REGION_DAY_EDGES) + 1) * 2
+
+
+def region_ids(days, miles, receipts):
+    days = np.asarray(days, dtype=float)
+    day_band = np.searchsorted(REGION_DAY_EDGES, days, side='right')
+    return day_band * 2 + (np.asarray(receipts, dtype=float) >= REGION_RECEIPT_EDGE)
+
+
+def fit_weights(outputs, expected):
+    """Non-negative weights per base and a free intercept: returns (weights, intercept)"""
+    X = np.column_stack([outputs, np.ones(len(outputs))])
+    bounds = [(0, None)] * outputs.shape[1] + [(None, None)]
+    coef = bounded_lstsq(X, expected, bounds)
+    weights = np.where(coef[:-1] > WEIGHT_TOL, coef[:-1], 0.0)
+    return weights, float(coef[-1])
+
+
+def fit_stack(outputs, expected, regions=None):
+    """
+    (weights (R, k), intercepts (R,)): one row for a global stack, or one
+    per region with regions given as ids
+    """
+    weights, intercept = fit_weights(outputs, expected)
+    if regions is None:
+        return weights[None, :], np.array([intercept])
+    all_weights = np.tile(weights, (N_REGIONS, 1))
+    intercepts = np.full(N_REGIONS, intercept)
+    for r in range(N_REGIONS):
+        rows = regions == r
+        if rows.sum() >= MIN_REGION_CASES:
+            all_weights[r], intercepts[r] = fit_weights(outputs[rows], expected[rows])
+    return all_weights, intercepts
+
+
+def blend(outputs, weights, intercepts, regions=None):
+    """Per-row blend; rows use their region's weights when there is more than one row of weights"""
+    if len(weights) == 1:
+        return outputs @ weights[0] + intercepts[0]
+    return np.einsum('nk,nk->n', outputs, weights[regions]) + intercepts[regions]
+
+
+def out_of_fold(outputs, expected, regions=None, n_splits=10, random_state=42):
+    """Stacked predictions for each case from weights fit without its fold"""
+    predicted = np.empty(len(expected))
+    for train_idx, val_idx in KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(outputs):
+        weights, intercepts = fit_stack(outputs[train_idx], expected[train_idx],
+                                        None if regions is None else regions[train_idx])
+        predicted[val_idx] = blend(outputs[val_idx], weights, intercepts,
+                                   None if regions is None else regions[val_idx])
+    return predicted
+
+
+class StackedSolution:
+    """Saved stack: only bases with a non-zero weight anywhere are evaluated"""
+
+    def __init__(self, path=WEIGHTS_PATH):
+        with open(path, 'r') as f:
+            saved = json.load(f)
+        weights = np.array(saved['weights'])
+        active = np.any(weights != 0, axis=0)
+        self.bases = [name for name, used in zip(saved['bases'], active) if used]
+        self.weights = weights[:, active]
+        self.intercepts = np.array(saved['intercepts'])
+        self.per_region = saved['per_region']
+        self._functions = None
+
+    def _regions(self, days, miles, receipts):
+        return region_ids(days, miles, receipts) if self.per_region else None
+
+    def predict_batch(self, days, miles, receipts):
+        days = np.asarray(days, dtype=float)
+        miles = np.asarray(miles, dtype=float)
+        receipts = np.asarray(receipts, dtype=float)
+        outputs = np.column_stack([compute_column(name, days, miles, receipts) for name in self.bases])
+        return np.round(blend(outputs, self.weights, self.intercepts, self._regions(days, miles, receipts)), 2)
+
+    def predict_one(self, days, miles, receipts):
+        if self._functions is None:
+            self._functions = [load_solution(name) for name in self.bases]
+        r = int(self._regions(days, miles, receipts)) if self.per_region else 0
+        total = self.intercepts[r]
+        for fn, weight in zip(self._functions, self.weights[r]):
+            if weight:
+                total += weight * fn(days, miles, receipts)
+        return round(float(total), 2)
+
+
+_stack = None
+
+
+def _load_stack():
+    global _stack
+    if _stack is None:
+        _stack = StackedSolution()
+    return _stack
+
+
+def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_amount):
+    return _load_stack().predict_one(trip_duration_days, miles_traveled, total_receipts_amount)
+
+
+def calculate_reimbursement_batch(days, miles, receipts):
+    return _load_stack().predict_batch(days, miles, receipts)
+
+
+def _cases_per_second(fn, n, repeats=3):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+def train_and_report(bases=None):
+    bases = bases or [name for name in discover_solutions()[0] if name not in EXCLUDED]
+    matrix = SolutionMatrix()
+    matrix.update(bases, verbose=False)
+    outputs, expected = matrix.public(bases)
+    outputs = np.round(outputs, 2)
+    regions = region_ids(matrix.days[:matrix.n_public], matrix.miles[:matrix.n_public],
+                         matrix.receipts[:matrix.n_public])
+
+    best_single = min(bases, key=lambda name: eval_score(outputs[:, bases.index(name)], expected)['score'])
+    print(f"Stacking {len(bases)} solutions on {len(expected)} public cases (10-fold out-of-fold scores)")
+    print("=" * 78)
+    print(f"{'Model':<34} {'Score':>10} {'Avg err':>8} {'Exact':>6} {'Close':>6} {'Bases':>6}")
+    single = eval_score(outputs[:, bases.index(best_single)], expected)
+    print(f"{'best single: ' + best_single:<34} {single['score']:>10.2f} {single['avg_error']:>8.2f} "
+          f"{single['exact']:>6} {single['close']:>6} {1:>6}")
+
+    variants = {}
+    for label, ids in [('global stack', None), (f'per-region stack ({N_REGIONS} regions)', regions)]:
+        metrics = eval_score(out_of_fold(outputs, expected, ids), expected)
+        weights, intercepts = fit_stack(outputs, expected, ids)
+        n_active = int(np.any(weights != 0, axis=0).sum())
+        variants[label] = (metrics, weights, intercepts, ids is not None)
+        print(f"{label:<34} {metrics['score']:>10.2f} {metrics['avg_error']:>8.2f} "
+              f"{metrics['exact']:>6} {metrics['close']:>6} {n_active:>6}")
+
+    label = min(variants, key=lambda key: variants[key][0]['score'])
+    metrics, weights, intercepts, per_region = variants[label]
+    with open(WEIGHTS_PATH, 'w') as f:
+        json.dump({'bases': bases, 'weights': weights.tolist(), 'intercepts': intercepts.tolist(),
+                   'per_region': per_region, 'oof_score': metrics['score']}, f, indent=2)
+    print(f"\nSaved {label} to {WEIGHTS_PATH}")
+
+    stack = StackedSolution()
+    print("Weights of the bases in use" + (" (one column per region):" if per_region else ":"))
+    for j, name in enumerate(stack.bases):
+        print(f"  {name:<28} " + " ".join(f"{w:6.3f}" for w in stack.weights[:, j]))
+    print(f"  {'intercept':<28} " + " ".join(f"{b:6.1f}" for b in stack.intercepts))
+
+    days, miles, receipts = matrix.days, matrix.miles, matrix.receipts
+    stacked_rate = _cases_per_second(lambda: stack.predict_batch(days, miles, receipts), len(days))
+    single_rate = _cases_per_second(lambda: compute_column(best_single, days, miles, receipts), len(days))
+    all_rate = _cases_per_second(lambda: [compute_column(name, days, miles, receipts) for name in bases],
+                                 len(days), repeats=1)
+    print(f"\nBatch throughput on {len(days)} cases: stack ({len(stack.bases)} bases) {stacked_rate:,.0f} cases/s, "
+          f"best single {single_rate:,.0f} cases/s, all {len(bases)} bases {all_rate:,.0f} cases/s")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and not sys.argv[1].startswith('--'):
+        print(calculate_reimbursement(int(sys.argv[1]), float(sys.argv[2]), float(sys.argv[3])))
+    else:
+        # python stacking.py [--train] [base solution names...]
+        train_and_report([arg for arg in sys.argv[1:] if not arg.startswith('--')])
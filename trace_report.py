@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Per-stage latency report for traced run.sh calls
+run.sh appends one JSON line per call when RUN_TRACE names a file, e.g.
+    RUN_TRACE=run_trace.jsonl ./eval.sh
+This aggregates those lines into p50/p95/p99 per stage. --run N traces N
+public cases directly instead of a full eval run.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import numpy as np
+
+TRACE_PATH = 'run_trace.jsonl'
+STAGE_ORDER = ['startup', 'import_pickle', 'import_numpy', 'unpickle_model', 'residual_lookup',
+               'engineer_features', 'predict', 'format_output']
+
+
+def load_traces(paths):
+    records = []
+    for path in paths:
+        with open(path, 'r') as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return records
+
+
+def stage_percentiles(records):
+    """{stage: {count, mean, p50, p95, p99}} in seconds, run.sh stage order first"""
+    durations = {}
+    for record in records:
+        for stage, seconds in record['stages'].items():
+            durations.setdefault(stage, []).append(seconds)
+        total = record.get('python_total', 0.0) + record['stages'].get('startup', 0.0)
+        durations.setdefault('total', []).append(total)
+    order = [s for s in STAGE_ORDER if s in durations] + sorted(set(durations) - set(STAGE_ORDER) - {'total'})
+    summary = {}
+    for stage in order + ['total']:
+        values = np.array(durations[stage])
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        summary[stage] = {'count': len(values), 'mean': float(values.mean()),
+                          'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+    return summary
+
+
+def heredoc_compile_seconds(script='run.sh', repeats=20):
+    """
+    Compile time of run.sh's Python heredoc, measured here: inside run.sh it is
+    part of 'startup' and cannot be timed from the script itself
+    """
+    with open(script, 'r') as f:
+        body = re.search(r"<< PYTHON_EOF\n(.*?)\nPYTHON_EOF", f.read(), re.S).group(1)
+    body = re.sub(r'\$\w+', '0', body)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        compile(body, '<stdin>', 'exec')
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def trace_public_cases(n, path=TRACE_PATH):
+    """Run run.sh on the first n public cases with tracing into path"""
+    with open('public_cases.json', 'r') as f:
+        cases = json.load(f)[:n]
+    env = dict(os.environ, RUN_TRACE=os.path.abspath(path))
+    for case in cases:
+        trip = case['input']
+        subprocess.run(['./run.sh', str(trip['trip_duration_days']), str(trip['miles_traveled']),
+                        str(trip['total_receipts_amount'])], env=env, check=True, capture_output=True)
+
+
+def print_report(summary, compile_seconds=None):
+    total = summary['total']
+    print(f"run.sh stage latency over {total['count']} traced calls (ms)")
+    print("=" * 72)
+    print(f"{'Stage':<20} {'Mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'Share':>7}")
+    for stage, stats in summary.items():
+        share = stats['mean'] / total['mean'] if total['mean'] else 0.0
+        print(f"{stage:<20} {stats['mean'] * 1000:>8.2f} {stats['p50'] * 1000:>8.2f} "
+              f"{stats['p95'] * 1000:>8.2f} {stats['p99'] * 1000:>8.2f} {share:>7.1%}")
+    if 'startup' not in summary:
+        print("(no startup stage: the tracing shell has no EPOCHREALTIME, bash < 5)")
+    if compile_seconds is not None:
+        print(f"\nHeredoc compile (measured outside run.sh, included in startup): {compile_seconds * 1000:.2f} ms")
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if '--run' in sys.argv:
+        # python trace_report.py --run N [trace file]
+        n, paths = int(args[0]), args[1:] or [TRACE_PATH]
+        if os.path.exists(paths[0]):
+            os.remove(paths[0])
+        trace_public_cases(n, paths[0])
+    else:
+        paths = args or [TRACE_PATH]
+    summary = stage_percentiles(load_traces(paths))
+    if '--json' in sys.argv:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_report(summary, heredoc_compile_seconds())
+
+
+if __name__ == "__main__":
+    main()
@@ -6,11 +6,42 @@ Goal: Achieve perfect score on public data while generalizing well
 """
 
 import json
+import sys
+import time
+import tracemalloc
 import numpy as np
 import pickle
-from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
-from sklearn.model_selection import KFold, cross_val_score
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.model_selection import KFold, cross_val_predict, cross_val_score
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+from training_cache import cached_run, print_metrics
+
+# Define GradientBoosting parameters
+# Balance between fitting training data perfectly and generalizing
+GB_PARAMS = {
+    'n_estimators': 500,  # Number of boosting stages
+    'learning_rate': 0.05,  # Shrinkage
+    'max_depth': 8,  # Depth of individual trees
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'subsample': 0.8,  # Fraction of samples for fitting individual trees
+    'max_features': 'sqrt',  # Number of features to consider when looking for best split
+    'loss': 'squared_error',
+    'random_state': 42,
+    'verbose': 1
+}
+
+# Random Forest trained alongside for the ensemble backup
+RF_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 10,
+    'min_samples_split': 5,
+    'min_samples_leaf': 2,
+    'random_state': 42,
+    'n_jobs': -1
+}
 
 def engineer_features(trip_duration_days, miles_traveled, total_receipts_amount):
     """Create comprehensive feature set"""
@@ -95,55 +126,179 @@ def create_residual_lookup(X_train, y_train, model):
     
     return lookup
 
-def main():
+def _staged_fold_errors(model, X, y, train_idx, val_idx):
+    """Fit one fold at the full stage count and score every prefix of the ensemble"""
+    model.fit(X[train_idx], y[train_idx])
+    y_val = y[val_idx]
+    abs_errors = np.array([np.abs(pred - y_val) for pred in model.staged_predict(X[val_idx])])
+    return abs_errors  # shape (n_stages, n_val)
+
+def staged_cv_curve(X, y, params, n_splits=5, random_state=42, n_jobs=-1):
+    """
+    Cross-validated error for every n_estimators up to params['n_estimators']
+    Each fold is fitted once at the maximum stage count (folds in parallel) and
+    staged_predict yields the predictions of every shorter ensemble for free
+    """
+    model = GradientBoostingRegressor(**{**params, 'verbose': 0})
+    folds = KFold(n_splits=n_splits, shuffle=True, random_state=random_state).split(X)
+    fold_errors = Parallel(n_jobs=n_jobs)(
+        delayed(_staged_fold_errors)(clone(model), X, y, train_idx, val_idx)
+        for train_idx, val_idx in folds
+    )
+    
+    # Pool out-of-fold errors per stage count
+    abs_errors = np.concatenate(fold_errors, axis=1)
+    n_estimators = np.arange(1, abs_errors.shape[0] + 1)
+    return {
+        'n_estimators': n_estimators,
+        'mae': abs_errors.mean(axis=1),
+        'rmse': np.sqrt((abs_errors ** 2).mean(axis=1)),
+        'exact_matches': (abs_errors < 0.01).sum(axis=1),
+        'close_matches': (abs_errors < 1.0).sum(axis=1),
+        'fold_mae': np.array([e.mean(axis=1) for e in fold_errors]),
+    }
+
+def load_training_data(path='public_cases.json'):
+    """Engineered features, targets and (days, miles, receipts) keys of the public cases"""
     print("Loading training data...")
-    with open('public_cases.json', 'r') as f:
+    with open(path, 'r') as f:
         data = json.load(f)
+    input_keys = [(case['input']['trip_duration_days'], case['input']['miles_traveled'],
+                   case['input']['total_receipts_amount']) for case in data]
+    X = np.array([engineer_features(*key) for key in input_keys])
+    y = np.array([case['expected_output'] for case in data])
+    return X, y, input_keys
+
+def tune_n_estimators(max_estimators=1000, n_splits=5):
+    """Print the CV error curve over n_estimators from a single staged pass"""
+    X, y, _ = load_training_data()
+    
+    params = {**GB_PARAMS, 'n_estimators': max_estimators}
+    
+    print(f"\nStaged {n_splits}-fold CV up to {max_estimators} stages (one fit per fold)...")
+    curve = staged_cv_curve(X, y, params, n_splits=n_splits)
+    
+    print(f"\n{'n_estimators':>12} {'CV MAE':>10} {'CV RMSE':>10} {'Exact':>6} {'Close':>6}")
+    checkpoints = sorted(set(range(50, max_estimators + 1, 50)) | {1, 10, 25, max_estimators})
+    for n in [n for n in checkpoints if n <= max_estimators]:
+        k = n - 1
+        print(f"{n:>12} {curve['mae'][k]:>10.2f} {curve['rmse'][k]:>10.2f} "
+              f"{curve['exact_matches'][k]:>6} {curve['close_matches'][k]:>6}")
+    
+    best = int(np.argmin(curve['mae']))
+    print(f"\nBest n_estimators by CV MAE: {curve['n_estimators'][best]} "
+          f"(MAE {curve['mae'][best]:.2f}, RMSE {curve['rmse'][best]:.2f})")
+    return curve
+
+def bin_features(X, max_bins=255):
+    """
+    Quantile-bin every feature column into uint8 codes (one byte per value)
+    Returns the codes and per-feature upper bin edges. engineer_features never
+    produces missing values (trips have at least one day and some miles), so
+    every code is a regular value bin and the model's missing-value bin stays empty
+    """
+    X = np.asarray(X, dtype=float)
+    edges = []
+    codes = np.empty(X.shape, dtype=np.uint8)
+    for j in range(X.shape[1]):
+        col = X[:, j]
+        distinct = np.unique(col)
+        if len(distinct) < max_bins:
+            # Few distinct values (days, flags, bins): one bin per value
+            col_edges = distinct
+        else:
+            col_edges = np.unique(np.quantile(col, np.linspace(0, 1, max_bins - 1)))
+        edges.append(col_edges)
+        codes[:, j] = apply_bins(col[:, None], [col_edges])[:, 0]
+    return codes, edges
+
+def apply_bins(X, edges):
+    """Map raw feature values to the uint8 bin codes learned by bin_features"""
+    X = np.asarray(X, dtype=float)
+    codes = np.empty(X.shape, dtype=np.uint8)
+    for j, col_edges in enumerate(edges):
+        idx = np.searchsorted(col_edges, X[:, j], side='left')
+        codes[:, j] = np.minimum(idx, len(col_edges) - 1)
+    return codes
+
+def _fit_and_measure(model, X, y):
+    """Fit a model and return (fit seconds, peak traced allocation in bytes)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    model.fit(X, y)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def compare_histogram_model(n_splits=5):
+    """Side-by-side report: exact-split GradientBoosting vs histogram-binned boosting"""
+    X, y, _ = load_training_data()
     
-    # Prepare features and targets
-    X = []
-    y = []
-    input_keys = []  # Store input keys for residual lookup
+    X_bins, _ = bin_features(X)
     
-    for case in data:
-        features = engineer_features(
-            case['input']['trip_duration_days'],
-            case['input']['miles_traveled'],
-            case['input']['total_receipts_amount']
-        )
-        X.append(features)
-        y.append(case['expected_output'])
-        
-        # Store input key
-        input_keys.append((
-            case['input']['trip_duration_days'],
-            case['input']['miles_traveled'],
-            case['input']['total_receipts_amount']
-        ))
+    exact_model = GradientBoostingRegressor(
+        n_estimators=500, learning_rate=0.05, max_depth=8, min_samples_split=5,
+        min_samples_leaf=2, subsample=0.8, max_features='sqrt', random_state=42
+    )
+    hist_model = HistGradientBoostingRegressor(
+        max_iter=500, learning_rate=0.05, max_depth=8, max_leaf_nodes=None,
+        min_samples_leaf=2, max_bins=255, early_stopping=False, random_state=42
+    )
     
-    X = np.array(X)
-    y = np.array(y)
+    kfold = KFold(n_splits=n_splits, shuffle=True, random_state=42)
+    rows = []
+    for name, model, X_train in [('GradientBoosting (exact)', exact_model, X),
+                                 ('HistGradientBoosting (uint8)', hist_model, X_bins)]:
+        print(f"\nFitting {name}...")
+        fit_seconds, peak_bytes = _fit_and_measure(model, X_train, y)
+        train_errors = np.abs(model.predict(X_train) - y)
+        cv_pred = cross_val_predict(clone(model), X_train, y, cv=kfold, n_jobs=-1)
+        cv_errors = np.abs(cv_pred - y)
+        rows.append({
+            'name': name,
+            'fit_seconds': fit_seconds,
+            'feature_bytes': X_train.nbytes,
+            'peak_fit_bytes': peak_bytes,
+            'model_bytes': len(pickle.dumps(model)),
+            'train_mae': train_errors.mean(),
+            'train_exact': int((train_errors < 0.01).sum()),
+            'cv_mae': cv_errors.mean(),
+            'cv_exact': int((cv_errors < 0.01).sum()),
+            'cv_close': int((cv_errors < 1.0).sum()),
+        })
+    
+    print("\n" + "=" * 80)
+    print("HISTOGRAM vs EXACT-SPLIT GRADIENT BOOSTING")
+    print("=" * 80)
+    print(f"{'Metric':<22}" + "".join(f"{r['name']:>30}" for r in rows))
+    report = [
+        ('Fit time (s)', 'fit_seconds', '{:.2f}'),
+        ('Feature matrix (KB)', 'feature_bytes', '{:.0f}', 1024),
+        ('Peak fit alloc (KB)', 'peak_fit_bytes', '{:.0f}', 1024),
+        ('Pickled model (KB)', 'model_bytes', '{:.0f}', 1024),
+        ('Train MAE', 'train_mae', '{:.2f}'),
+        ('Train exact (<$0.01)', 'train_exact', '{}'),
+        ('CV MAE', 'cv_mae', '{:.2f}'),
+        ('CV exact (<$0.01)', 'cv_exact', '{}'),
+        ('CV close (<$1.00)', 'cv_close', '{}'),
+    ]
+    for label, key, fmt, *scale in report:
+        divisor = scale[0] if scale else 1
+        values = [fmt.format(r[key] / divisor if divisor != 1 else r[key]) for r in rows]
+        print(f"{label:<22}" + "".join(f"{v:>30}" for v in values))
+    return rows
+
+def train_models():
+    """Train, report and save the GradientBoosting model and RF ensemble; returns metrics"""
+    # Input keys are kept for the residual lookup
+    X, y, input_keys = load_training_data()
     
     print(f"Training data shape: {X.shape}")
     print(f"Target shape: {y.shape}")
     
-    # Define GradientBoosting parameters
-    # Balance between fitting training data perfectly and generalizing
-    params = {
-        'n_estimators': 500,  # Number of boosting stages
-        'learning_rate': 0.05,  # Shrinkage
-        'max_depth': 8,  # Depth of individual trees
-        'min_samples_split': 5,
-        'min_samples_leaf': 2,
-        'subsample': 0.8,  # Fraction of samples for fitting individual trees
-        'max_features': 'sqrt',  # Number of features to consider when looking for best split
-        'loss': 'squared_error',
-        'random_state': 42,
-        'verbose': 1
-    }
-    
     # Create model
-    model = GradientBoostingRegressor(**params)
+    model = GradientBoostingRegressor(**GB_PARAMS)
     
     # Perform cross-validation
     print("\nPerforming 5-fold cross-validation...")
@@ -212,14 +367,7 @@ def main():
     
     # Also train a Random Forest as ensemble backup
     print("\nTraining Random Forest for ensemble...")
-    rf_model = RandomForestRegressor(
-        n_estimators=200,
-        max_depth=10,
-        min_samples_split=5,
-        min_samples_leaf=2,
-        random_state=42,
-        n_jobs=-1
-    )
+    rf_model = RandomForestRegressor(**RF_PARAMS)
     rf_model.fit(X, y)
     
     # Save ensemble
@@ -267,6 +415,35 @@ def main():
         print(f"  Case {i}: Predicted {pred:.2f}, Actual {actual:.2f}, Error {error:.2f}")
     
     print(f"\nPerfect matches in sample: {perfect_matches}/10")
+    
+    return {
+        'cv_rmse': float(cv_rmse.mean()),
+        'cv_rmse_std': float(cv_rmse.std()),
+        'train_rmse': float(train_rmse),
+        'train_mae': float(train_mae),
+        'max_train_error': float(max(errors)),
+        'perfect_matches_sample': perfect_matches
+    }
+
+def main(force=False):
+    # Reuse the saved models when data, features and parameters are unchanged
+    result = cached_run(
+        'train_gradient_boosting',
+        params={'gb': GB_PARAMS, 'rf': RF_PARAMS},
+        train_fn=train_models,
+        outputs=['gradient_boosting_model.pkl', 'ensemble_model.pkl'],
+        features=engineer_features,
+        force=force
+    )
+    if result['cache_hit']:
+        print_metrics(result['metrics'])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if '--hist' in sys.argv:
+        compare_histogram_model()
+    elif '--tune' in sys.argv:
+        # Usage: python3 train_gradient_boosting.py --tune [max_estimators]
+        args = [a for a in sys.argv[1:] if a != '--tune']
+        tune_n_estimators(int(args[0]) if args else 1000)
+    else:
+        main(force='--no-cache' in sys.argv)
\ No newline at end of file
@@ -7,9 +7,28 @@ Goal: Achieve perfect score on public data while generalizing well to private da
 import json
 import numpy as np
 import pickle
-from sklearn.model_selection import KFold, cross_val_score
+import time
+from joblib import Parallel, delayed
+from sklearn.model_selection import KFold, cross_val_score, train_test_split
 from sklearn.metrics import mean_squared_error
 import xgboost as xgb
+from training_cache import cached_run, print_metrics
+from xgb_scoring import INPUTS, compute_features
+
+# Define XGBoost parameters
+# Start with conservative parameters to avoid overfitting
+XGB_PARAMS = {
+    'objective': 'reg:squarederror',
+    'max_depth': 10,  # Moderate depth
+    'learning_rate': 0.1,
+    'n_estimators': 1000,
+    'subsample': 0.8,  # Use 80% of data for each tree
+    'colsample_bytree': 0.8,  # Use 80% of features for each tree
+    'reg_alpha': 0.1,  # L1 regularization
+    'reg_lambda': 1.0,  # L2 regularization
+    'random_state': 42,
+    'n_jobs': -1
+}
 
 def engineer_features(trip_duration_days, miles_traveled, total_receipts_amount):
     """Create comprehensive feature set"""
@@ -70,7 +89,40 @@ def engineer_features(trip_duration_days, miles_traveled, total_receipts_amount)
     
     return features
 
-def main():
+# Declarative copy of engineer_features for the portable export: evaluated
+# column-wise by xgb_scoring.compute_features at training and scoring time
+FEATURE_SPEC = [
+    {'name': 'trip_duration_days', 'op': 'input', 'args': ['trip_duration_days']},
+    {'name': 'miles_traveled', 'op': 'input', 'args': ['miles_traveled']},
+    {'name': 'total_receipts_amount', 'op': 'input', 'args': ['total_receipts_amount']},
+    {'name': 'miles_per_day', 'op': 'safe_div', 'args': ['miles_traveled', 'trip_duration_days']},
+    {'name': 'receipts_per_day', 'op': 'safe_div', 'args': ['total_receipts_amount', 'trip_duration_days']},
+    {'name': 'receipts_per_mile', 'op': 'safe_div', 'args': ['total_receipts_amount', 'miles_traveled']},
+    {'name': 'days_x_miles', 'op': 'mul', 'args': ['trip_duration_days', 'miles_traveled']},
+    {'name': 'days_x_receipts', 'op': 'mul', 'args': ['trip_duration_days', 'total_receipts_amount']},
+    {'name': 'miles_x_receipts', 'op': 'mul', 'args': ['miles_traveled', 'total_receipts_amount']},
+    {'name': 'log_miles', 'op': 'log1p', 'args': ['miles_traveled']},
+    {'name': 'log_receipts', 'op': 'log1p', 'args': ['total_receipts_amount']},
+    {'name': 'log_days', 'op': 'log1p', 'args': ['trip_duration_days']},
+    {'name': 'miles_to_receipts', 'op': 'offset_div', 'args': ['miles_traveled', 'total_receipts_amount'], 'offset': 1},
+    {'name': 'days_to_miles', 'op': 'offset_div', 'args': ['trip_duration_days', 'miles_traveled'], 'offset': 1},
+    {'name': 'days_to_receipts', 'op': 'offset_div', 'args': ['trip_duration_days', 'total_receipts_amount'], 'offset': 1},
+    {'name': 'days_squared', 'op': 'square', 'args': ['trip_duration_days']},
+    {'name': 'miles_squared', 'op': 'square', 'args': ['miles_traveled']},
+    {'name': 'receipts_squared', 'op': 'square', 'args': ['total_receipts_amount']},
+    {'name': 'miles_per_day_squared', 'op': 'square', 'args': ['miles_per_day']},
+    {'name': 'receipts_per_mile_squared', 'op': 'square', 'args': ['receipts_per_mile']},
+    {'name': 'receipt_ends_99', 'op': 'cents_equal', 'args': ['total_receipts_amount'], 'value': 0.99},
+    {'name': 'receipt_ends_49', 'op': 'cents_equal', 'args': ['total_receipts_amount'], 'value': 0.49},
+    {'name': 'receipt_ends_33', 'op': 'cents_equal', 'args': ['total_receipts_amount'], 'value': 0.33},
+    {'name': 'receipt_bin', 'op': 'bin', 'args': ['total_receipts_amount'], 'width': 200},
+    {'name': 'miles_bin', 'op': 'bin', 'args': ['miles_traveled'], 'width': 100},
+]
+
+PORTABLE_OUTPUTS = ['xgboost_model.json', 'xgboost_model.ubj', 'xgboost_features.json']
+
+def train_model():
+    """Train, report and save the XGBoost model; returns metrics"""
     print("Loading training data...")
     with open('public_cases.json', 'r') as f:
         data = json.load(f)
@@ -94,23 +146,8 @@ def main():
     print(f"Training data shape: {X.shape}")
     print(f"Target shape: {y.shape}")
     
-    # Define XGBoost parameters
-    # Start with conservative parameters to avoid overfitting
-    params = {
-        'objective': 'reg:squarederror',
-        'max_depth': 10,  # Moderate depth
-        'learning_rate': 0.1,
-        'n_estimators': 1000,
-        'subsample': 0.8,  # Use 80% of data for each tree
-        'colsample_bytree': 0.8,  # Use 80% of features for each tree
-        'reg_alpha': 0.1,  # L1 regularization
-        'reg_lambda': 1.0,  # L2 regularization
-        'random_state': 42,
-        'n_jobs': -1
-    }
-    
     # Create model
-    model = xgb.XGBRegressor(**params)
+    model = xgb.XGBRegressor(**XGB_PARAMS)
     
     # Perform cross-validation to check for overfitting
     print("\nPerforming 5-fold cross-validation...")
@@ -120,10 +157,10 @@ def main():
     
     # Train on full dataset
     print("\nTraining on full dataset...")
-    model.fit(X, y, 
+    # xgboost >= 2 takes the metric and early stopping as estimator parameters
+    model.set_params(eval_metric='rmse', early_stopping_rounds=50)
+    model.fit(X, y,
               eval_set=[(X, y)],
-              eval_metric='rmse',
-              early_stopping_rounds=50,
               verbose=100)
     
     # Check training performance
@@ -194,6 +231,133 @@ def main():
     if exact_matches < len(data):
         print("\nWarning: Model doesn't perfectly fit training data.")
         print("Consider increasing n_estimators or max_depth.")
+    
+    return {
+        'cv_rmse': float(cv_rmse.mean()),
+        'cv_rmse_std': float(cv_rmse.std()),
+        'train_rmse': float(train_rmse),
+        'train_mae': float(train_mae),
+        'exact_matches': exact_matches,
+        'max_error': float(max_error)
+    }
+
+def load_columns(path='public_cases.json'):
+    """Public cases as ({input name: array}, expected array)"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    columns = {name: np.array([case['input'][name] for case in data], dtype=float) for name in INPUTS}
+    y = np.array([case['expected_output'] for case in data], dtype=float)
+    return columns, y
+
+def _cv_fold(params, X, y, train_idx, val_idx):
+    """Fit one fold single-threaded; returns validation MAE"""
+    model = xgb.XGBRegressor(**{**params, 'n_jobs': 1})
+    model.fit(X[train_idx], y[train_idx])
+    return float(np.mean(np.abs(model.predict(X[val_idx]) - y[val_idx])))
+
+def train_portable(validation_size=0.2, early_stopping_rounds=50, n_splits=5):
+    """
+    Early-stopped training for the portable export: pick the number of trees on
+    a held-out validation split, cross-validate that size with folds in
+    parallel, refit on all cases and save the native model and feature spec.
+    """
+    columns, y = load_columns()
+    X = compute_features(FEATURE_SPEC, columns)
+    print(f"Training data shape: {X.shape}")
+
+    # Early stopping on a validation split
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=validation_size, random_state=XGB_PARAMS['random_state'])
+    model = xgb.XGBRegressor(**XGB_PARAMS, eval_metric='mae',
+                             early_stopping_rounds=early_stopping_rounds)
+    model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    n_trees = model.best_iteration + 1
+    print(f"\nEarly stopping: {n_trees} of {XGB_PARAMS['n_estimators']} trees, "
+          f"validation MAE ${model.best_score:.2f}")
+
+    # Cross-validate the early-stopped size, one fold per worker
+    params = {**XGB_PARAMS, 'n_estimators': n_trees}
+    folds = KFold(n_splits=n_splits, shuffle=True, random_state=XGB_PARAMS['random_state']).split(X)
+    fold_mae = Parallel(n_jobs=-1)(
+        delayed(_cv_fold)(params, X, y, train_idx, val_idx) for train_idx, val_idx in folds)
+    print(f"{n_splits}-fold CV MAE: ${np.mean(fold_mae):.2f} (+/- {np.std(fold_mae) * 2:.2f})")
+
+    # Refit on every case and export in XGBoost's native formats
+    final = xgb.XGBRegressor(**params)
+    final.fit(X, y)
+    booster = final.get_booster()
+    booster.feature_names = [f['name'] for f in FEATURE_SPEC]
+    booster.save_model(PORTABLE_OUTPUTS[0])
+    booster.save_model(PORTABLE_OUTPUTS[1])
+    with open(PORTABLE_OUTPUTS[2], 'w') as f:
+        json.dump({'inputs': INPUTS, 'features': FEATURE_SPEC, 'round_to_cents': True}, f, indent=2)
+    print(f"\nSaved {', '.join(PORTABLE_OUTPUTS)}")
+    in_memory = final.predict(X)
+    for path in PORTABLE_OUTPUTS[:2]:
+        exported = xgb.Booster(model_file=path).inplace_predict(X)
+        print(f"{path}: max |diff| vs in-memory estimator = {np.abs(exported - in_memory).max():.3e}")
+
+    train_mae = float(np.mean(np.abs(in_memory - y)))
+    print(f"Training MAE: ${train_mae:.2f}")
+    return {
+        'n_trees': n_trees,
+        'validation_mae': float(model.best_score),
+        'cv_mae': float(np.mean(fold_mae)),
+        'cv_mae_std': float(np.std(fold_mae)),
+        'train_mae': train_mae,
+    }
+
+def verify_export():
+    """
+    Check xgb_scoring scores each exported file like xgboost's own Booster
+    loaded from it, and time it (train_portable checks the files against the
+    in-memory estimator, which a cache hit does not have)
+    """
+    from xgb_scoring import XGBScorer, benchmark
+    columns, y = load_columns()
+    X = compute_features(FEATURE_SPEC, columns)
+    scalar = np.array([engineer_features(*row) for row in zip(*(columns[name] for name in INPUTS))])
+    print(f"Feature spec vs engineer_features: max |diff| = {np.abs(X - scalar).max():.3e}")
+
+    for path in PORTABLE_OUTPUTS[:2]:
+        scorer = XGBScorer(model_path=path)
+        reference = xgb.Booster(model_file=path).inplace_predict(X)
+        ours = scorer.predict(columns['trip_duration_days'], columns['miles_traveled'],
+                              columns['total_receipts_amount'])
+        print(f"{path}: max |diff| vs xgboost Booster on the file = {np.abs(ours - reference).max():.3e}, "
+              f"public MAE ${np.mean(np.abs(np.round(ours, 2) - y)):.2f}")
+    benchmark()
+
+def main_portable(force=False):
+    params = {**XGB_PARAMS, 'validation_size': 0.2, 'early_stopping_rounds': 50, 'cv_folds': 5}
+    result = cached_run(
+        'train_xgboost_portable',
+        params=params,
+        train_fn=train_portable,
+        outputs=PORTABLE_OUTPUTS,
+        features=json.dumps(FEATURE_SPEC, sort_keys=True),
+        force=force
+    )
+    if result['cache_hit']:
+        print_metrics(result['metrics'])
+    verify_export()
+
+def main(force=False):
+    # Reuse the saved model when data, features and parameters are unchanged
+    result = cached_run(
+        'train_xgboost',
+        params=XGB_PARAMS,
+        train_fn=train_model,
+        outputs=['xgboost_model.pkl', 'feature_engineering.pkl'],
+        features=engineer_features,
+        force=force
+    )
+    if result['cache_hit']:
+        print_metrics(result['metrics'])
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import sys
+    if '--portable' in sys.argv:
+        main_portable(force='--no-cache' in sys.argv)
+    else:
+        main(force='--no-cache' in sys.argv)
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Training run cache
+Keys each training run on a hash of the dataset, the feature pipeline version
+and the hyperparameters. On a hit the saved output files are restored and the
+recorded metrics returned without retraining; stale entries are garbage-collected.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+CACHE_DIR = '.training_cache'
+
+
+def file_hash(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feature_version(pipeline):
+    """
+    Version string for a feature pipeline: a function (hashed from its source,
+    so editing engineer_features invalidates the cache) or an explicit string
+    """
+    if callable(pipeline):
+        pipeline = inspect.getsource(pipeline)
+    return hashlib.sha256(str(pipeline).encode()).hexdigest()[:16]
+
+
+def is_source(path):
+    """Python sources are tracked in git and may be edited after generation, so they are never cached"""
+    return path.endswith('.py')
+
+
+def make_key(name, dataset_hash, feature_ver, params):
+    """Cache key for one training run"""
+    payload = json.dumps({
+        'name': name,
+        'dataset': dataset_hash,
+        'features': feature_ver,
+        'params': params,
+    }, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+class TrainingCache:
+    """Directory of cache entries: <cache_dir>/<key>/{meta.json, output files}"""
+
+    def __init__(self, cache_dir=CACHE_DIR, keep_per_name=3, max_age_days=30):
+        self.cache_dir = cache_dir
+        self.keep_per_name = keep_per_name
+        self.max_age_days = max_age_days
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def lookup(self, key):
+        """Return the entry's metadata, or None if missing, incomplete or holding source files"""
+        meta_path = os.path.join(self._entry_dir(key), 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if any(is_source(output) for output in meta['outputs']):
+            # Written before sources were excluded; restoring it would overwrite tracked code
+            return None
+        for output in meta['outputs']:
+            if not os.path.exists(os.path.join(self._entry_dir(key), os.path.basename(output))):
+                return None
+        return meta
+
+    def restore(self, key, meta):
+        """Copy the cached output files back to where the training script writes them"""
+        for output in meta['outputs']:
+            shutil.copy2(os.path.join(self._entry_dir(key), os.path.basename(output)), output)
+        meta['last_used'] = time.time()
+        with open(os.path.join(self._entry_dir(key), 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, default=float)
+
+    def store(self, key, name, params, outputs, metrics, seconds):
+        """Save the output files and metrics of a finished run"""
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir + '.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for output in outputs:
+            shutil.copy2(output, os.path.join(tmp_dir, os.path.basename(output)))
+        meta = {
+            'name': name,
+            'key': key,
+            'params': params,
+            'outputs': list(outputs),
+            'metrics': metrics,
+            'train_seconds': seconds,
+            'created': time.time(),
+            'last_used': time.time(),
+        }
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2, default=float)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        return meta
+
+    def entries(self):
+        """Metadata of every complete entry"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        found = []
+        for key in os.listdir(self.cache_dir):
+            meta = self.lookup(key)
+            if meta is not None:
+                found.append(meta)
+        return found
+
+    def gc(self):
+        """
+        Remove stale entries: anything older than max_age_days since last use,
+        beyond the keep_per_name most recently used per training script, and
+        leftover incomplete directories. Returns the removed keys.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        removed = []
+        live = {meta['key'] for meta in self.entries()}
+        for key in os.listdir(self.cache_dir):
+            if key not in live:
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                removed.append(key)
+
+        cutoff = time.time() - self.max_age_days * 86400
+        by_name = {}
+        for meta in self.entries():
+            by_name.setdefault(meta['name'], []).append(meta)
+        for metas in by_name.values():
+            metas.sort(key=lambda m: m['last_used'], reverse=True)
+            for i, meta in enumerate(metas):
+                if i >= self.keep_per_name or meta['last_used'] < cutoff:
+                    shutil.rmtree(self._entry_dir(meta['key']), ignore_errors=True)
+                    removed.append(meta['key'])
+        return removed
+
+
+def cached_run(name, params, train_fn, outputs, features, data_path='public_cases.json',
+               cache=None, force=False):
+    """
+    Run train_fn() unless an identical run is cached.
+    train_fn must write every path in outputs and return a JSON-able metrics dict.
+    outputs lists generated artifacts (model and weight files) only; source
+    files train_fn generates are left as they are on a cache hit.
+    Returns {'metrics', 'outputs', 'cache_hit', 'key'}.
+    """
+    sources = [output for output in outputs if is_source(output)]
+    if sources:
+        raise ValueError(f"cached_run outputs must be generated artifacts, not sources: {sources}")
+    cache = cache or TrainingCache()
+    key = make_key(name, file_hash(data_path), feature_version(features), params)
+
+    meta = None if force else cache.lookup(key)
+    if meta is not None:
+        cache.restore(key, meta)
+        print(f"Training cache hit for {name} ({key}): restored {', '.join(meta['outputs']) or 'metrics only'} "
+              f"(saved {meta['train_seconds']:.1f}s of training)")
+        return {'metrics': meta['metrics'], 'outputs': meta['outputs'], 'cache_hit': True, 'key': key}
+
+    start = time.perf_counter()
+    metrics = train_fn()
+    seconds = time.perf_counter() - start
+    cache.store(key, name, params, outputs, metrics or {}, seconds)
+    removed = cache.gc()
+    if removed:
+        print(f"Training cache: removed {len(removed)} stale entr{'y' if len(removed) == 1 else 'ies'}")
+    return {'metrics': metrics or {}, 'outputs': list(outputs), 'cache_hit': False, 'key': key}
+
+
+def print_metrics(metrics):
+    """Print a cached metrics dict"""
+    for name, value in metrics.items():
+        if isinstance(value, float):
+            print(f"  {name}: {value:.4f}")
+        else:
+            print(f"  {name}: {value}")
+
+
+if __name__ == "__main__":
+    import sys
+    cache = TrainingCache()
+    if '--gc' in sys.argv:
+        removed = cache.gc()
+        print(f"Removed {len(removed)} stale entries")
+    for meta in sorted(cache.entries(), key=lambda m: (m['name'], -m['last_used'])):
+        age_hours = (time.time() - meta['created']) / 3600
+        print(f"{meta['name']:<28} {meta['key']}  {age_hours:6.1f}h old  "
+              f"{meta['train_seconds']:7.1f}s train  -> {', '.join(meta['outputs'])}")
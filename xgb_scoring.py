@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Portable XGBoost scoring
+Loads the native JSON/UBJ model and declarative feature spec exported by
+train_xgboost.py --portable, builds the feature columns for a whole batch
+of trips and scores them with one DMatrix predict call. Needs only numpy
+and xgboost, not the training script.
+"""
+
+import json
+import sys
+import time
+import numpy as np
+import xgboost as xgb
+
+MODEL_PATH = 'xgboost_model.ubj'
+SPEC_PATH = 'xgboost_features.json'
+INPUTS = ['trip_duration_days', 'miles_traveled', 'total_receipts_amount']
+
+
+def _safe_div(a, b):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(b > 0, a / b, 0.0)
+
+
+# Each op takes the argument columns and the feature's spec entry
+FEATURE_OPS = {
+    'safe_div': lambda a, b, f: _safe_div(a, b),
+    'offset_div': lambda a, b, f: a / (b + f['offset']),
+    'mul': lambda a, b, f: a * b,
+    'log1p': lambda a, f: np.log1p(a),
+    'square': lambda a, f: a * a,
+    'cents_equal': lambda a, f: (np.abs(a - np.trunc(a) - f['value']) < 0.001).astype(np.float64),
+    'bin': lambda a, f: np.trunc(a / f['width']),
+}
+
+
+def compute_features(features, columns):
+    """
+    Evaluate a declarative feature list over columnar inputs.
+    features: [{'name', 'op', 'args', ...}], where op 'input' copies an input
+    column and other ops read inputs or earlier features by name.
+    columns: {input name: array}. Returns an (n, len(features)) float64 matrix.
+    """
+    values = {name: np.asarray(col, dtype=np.float64) for name, col in columns.items()}
+    out = []
+    for feature in features:
+        if feature['op'] == 'input':
+            value = values[feature['args'][0]]
+        else:
+            args = [values[arg] for arg in feature['args']]
+            value = FEATURE_OPS[feature['op']](*args, feature)
+        values[feature['name']] = value
+        out.append(value)
+    return np.column_stack(out)
+
+
+class XGBScorer:
+    """Native XGBoost booster plus its feature spec"""
+
+    def __init__(self, model_path=MODEL_PATH, spec_path=SPEC_PATH, nthread=None):
+        with open(spec_path, 'r') as f:
+            self.spec = json.load(f)
+        self.booster = xgb.Booster()
+        self.booster.load_model(model_path)
+        if nthread is not None:
+            self.booster.set_param({'nthread': nthread})
+        self.feature_names = [f['name'] for f in self.spec['features']]
+
+    def features(self, days, miles, receipts):
+        columns = dict(zip(self.spec['inputs'], (days, miles, receipts)))
+        return compute_features(self.spec['features'], columns)
+
+    def predict(self, days, miles, receipts):
+        """Unrounded predictions for arrays of trips, one DMatrix and one predict call"""
+        X = self.features(np.atleast_1d(days), np.atleast_1d(miles), np.atleast_1d(receipts))
+        return self.booster.predict(xgb.DMatrix(X, feature_names=self.feature_names))
+
+
+_scorer = None
+
+
+def _default_scorer():
+    global _scorer
+    if _scorer is None:
+        _scorer = XGBScorer()
+    return _scorer
+
+
+def calculate_reimbursement(days, miles, receipts):
+    """Reimbursement from the exported model, rounded to cents"""
+    return round(float(_default_scorer().predict(days, miles, receipts)[0]), 2)
+
+
+def calculate_reimbursement_batch(days, miles, receipts):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    return np.round(_default_scorer().predict(days, miles, receipts).astype(np.float64), 2)
+
+
+def benchmark(path='private_cases.json', repeats=5):
+    """Time loading the exported model and scoring every case in one batch"""
+    with open(path, 'r') as f:
+        cases = json.load(f)
+    days = np.array([c['trip_duration_days'] for c in cases], dtype=float)
+    miles = np.array([c['miles_traveled'] for c in cases], dtype=float)
+    receipts = np.array([c['total_receipts_amount'] for c in cases], dtype=float)
+
+    start = time.perf_counter()
+    scorer = XGBScorer()
+    load_ms = (time.perf_counter() - start) * 1000
+
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        scorer.predict(days, miles, receipts)
+        best = min(best, time.perf_counter() - start)
+
+    print(f"Load {MODEL_PATH} + {SPEC_PATH}: {load_ms:.1f} ms")
+    print(f"Score {len(cases)} cases: {best * 1000:.1f} ms ({len(cases) / best:,.0f} rows/s)")
+
+
+def main():
+    if '--bench' in sys.argv:
+        benchmark()
+        return
+
+    # Read input
+    if len(sys.argv) > 1:
+        # Command line arguments
+        days = int(sys.argv[1])
+        miles = float(sys.argv[2])
+        receipts = float(sys.argv[3])
+    else:
+        # Read from stdin (JSON format expected)
+        data = json.loads(sys.stdin.read())
+        days = data['trip_duration_days']
+        miles = data['miles_traveled']
+        receipts = data['total_receipts_amount']
+
+    print(f"{calculate_reimbursement(days, miles, receipts):.2f}")
+
+
+if __name__ == "__main__":
+    main()
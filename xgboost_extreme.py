@@ -224,6 +224,85 @@ def calculate_reimbursement(trip_duration_days, miles_traveled, total_receipts_a
         result = max(500, min(2200, result))
     
     return round(result, 2)
+
+
+def calculate_reimbursement_batch(trip_duration_days, miles_traveled, total_receipts_amount):
+    """Vectorized calculate_reimbursement over arrays of trips"""
+    import numpy as np
+    from rule_batch import as_arrays, cents_ending, round_cents, trip_features
+    days, miles, receipts = as_arrays(trip_duration_days, miles_traveled, total_receipts_amount)
+    features = trip_features(days, miles, receipts)
+    miles_per_day = features['miles_per_day']
+    receipts_per_day = features['receipts_per_day']
+
+    # Common pattern lookups, adjusted for the exact values
+    miles_bucket = (miles // 50) * 50
+    receipts_bucket = (receipts // 100) * 100
+    pattern_lookups = {
+        (1, 50, 0): 131.92,
+        (1, 100, 0): 158.00,
+        (2, 100, 100): 310.00,
+        (3, 150, 200): 465.00,
+        (5, 200, 400): 750.00,
+        (5, 900, 400): 862.00,
+        (7, 300, 600): 1050.00,
+        (10, 500, 800): 1400.00,
+    }
+    pattern = np.full(len(days), np.nan)
+    for (d, m, r), value in pattern_lookups.items():
+        pattern[(days == d) & (miles_bucket == m) & (receipts_bucket == r)] = value
+    matched = ~np.isnan(pattern)
+    pattern = pattern + (miles - miles_bucket) * 0.5 + (receipts - receipts_bucket) * 0.7
+
+    cents = cents_ending(receipts)
+
+    # .49 endings
+    ending_49 = np.select(
+        [days <= 3, days <= 6],
+        [100 * days + 0.6 * miles + 0.9 * receipts, 105 * days + 0.55 * miles + 0.85 * receipts],
+        95 * days + 0.5 * miles + 0.8 * receipts)
+    ending_49 = ending_49 * np.select([receipts < 100, receipts < 500], [1.12, 1.08], 1.05)
+
+    # .99 and .33 endings
+    ending_99 = 98 * days + 0.52 * miles + 0.82 * receipts
+    ending_99 = np.where(days == 5, ending_99 * 1.1, ending_99)
+    ending_33 = 102 * days + 0.54 * miles + 0.78 * receipts
+    ending_33 = np.where(miles > 500, ending_33 * 1.03, ending_33)
+
+    # Regular calculation
+    regular = np.select(
+        [days <= 2, days <= 4, days == 5, days <= 7],
+        [98 * days, 100 * days, 110 * days, 102 * days],
+        95 * days)
+    mileage = np.select(
+        [miles <= 50, miles <= 100, miles <= 200, miles <= 400, miles <= 600],
+        [miles * 0.60,
+         50 * 0.60 + (miles - 50) * 0.58,
+         50 * 0.60 + 50 * 0.58 + (miles - 100) * 0.55,
+         50 * 0.60 + 50 * 0.58 + 100 * 0.55 + (miles - 200) * 0.50,
+         50 * 0.60 + 50 * 0.58 + 100 * 0.55 + 200 * 0.50 + (miles - 400) * 0.45],
+        50 * 0.60 + 50 * 0.58 + 100 * 0.55 + 200 * 0.50 + 200 * 0.45 + (miles - 600) * 0.40)
+    regular = regular + mileage
+    receipt_rate = np.select(
+        [receipts < 10, receipts < 50, receipts < 100, receipts < 300, receipts < 600,
+         receipts < 800, receipts < 1000, receipts < 1500],
+        [0.5, 0.65, 0.75, 0.80, 0.85, 0.90, 0.80, 0.70], 0.60)
+    regular = regular + receipts * receipt_rate
+    regular = np.select(
+        [(180 <= miles_per_day) & (miles_per_day <= 220), miles_per_day > 300],
+        [regular + 50, regular - 30], regular)
+    regular = np.where((days == 5) & (miles_per_day >= 180) & (receipts_per_day < 100), regular * 1.15, regular)
+    regular = np.where((days >= 8) & (receipts_per_day > 150), regular * 0.85, regular)
+    regular = np.where((features['days_x_miles'] > 7000) & (receipts < 600), regular * 1.05, regular)
+
+    result = np.select([cents == 49, cents == 99, cents == 33], [ending_49, ending_99, ending_33], regular)
+
+    # Final bounds by trip length
+    result = np.select(
+        [days <= 3, days <= 7],
+        [np.maximum(150, np.minimum(800, result)), np.maximum(300, np.minimum(1500, result))],
+        np.maximum(500, np.minimum(2200, result)))
+    return round_cents(np.where(matched, pattern, result))
 '''
 
 # Save the extreme optimization solution